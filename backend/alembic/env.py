@@ -12,11 +12,12 @@ import app.models  # noqa: F401 — ensure all models are registered on Base
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option("sqlalchemy.url", DATABASE_URL)
+# Shards are migrated with their own URL (see app.shards.migrate)
+config.set_main_option("sqlalchemy.url", config.attributes.get("sqlalchemy.url", DATABASE_URL))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 target_metadata = Base.metadata
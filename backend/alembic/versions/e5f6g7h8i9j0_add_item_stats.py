@@ -0,0 +1,84 @@
+"""add item_stats
+
+Revision ID: e5f6g7h8i9j0
+Revises: d4e5f6g7h8i9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6g7h8i9j0'
+down_revision: Union[str, Sequence[str], None] = 'd4e5f6g7h8i9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EWMA_ALPHA = 0.3
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def upgrade() -> None:
+    item_stats = op.create_table(
+        'item_stats',
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('purchase_count', sa.Integer(), nullable=False),
+        sa.Column('last_purchased_at', sa.DateTime(), nullable=True),
+        sa.Column('ewma_interval_days', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('household_id', 'item_id'),
+    )
+
+    # Backfill from the completed session history, one row per (item, session)
+    history = op.get_bind().execute(sa.text(
+        """
+        SELECT items.household_id, session_items.item_id,
+               COUNT(session_items.id), MAX(session_items.checked_at)
+        FROM session_items
+        JOIN items ON items.id = session_items.item_id
+        JOIN shopping_sessions ON shopping_sessions.id = session_items.session_id
+        WHERE session_items.checked = 1 AND shopping_sessions.completed_at IS NOT NULL
+        GROUP BY session_items.item_id, session_items.session_id
+        ORDER BY session_items.item_id, MAX(session_items.checked_at)
+        """
+    ))
+
+    stats = {}
+    for household_id, item_id, count, checked_at in history:
+        checked_at = _as_datetime(checked_at)
+        stat = stats.get(item_id)
+        if stat is None:
+            stats[item_id] = {
+                'household_id': household_id,
+                'item_id': item_id,
+                'purchase_count': count,
+                'last_purchased_at': checked_at,
+                'ewma_interval_days': None,
+            }
+            continue
+        last = stat['last_purchased_at']
+        if checked_at is not None and last is not None and checked_at > last:
+            interval = (checked_at - last).total_seconds() / 86400
+            ewma = stat['ewma_interval_days']
+            stat['ewma_interval_days'] = interval if ewma is None else EWMA_ALPHA * interval + (1 - EWMA_ALPHA) * ewma
+        if checked_at is not None and (last is None or checked_at > last):
+            stat['last_purchased_at'] = checked_at
+        stat['purchase_count'] += count
+
+    if stats:
+        op.bulk_insert(item_stats, list(stats.values()))
+
+
+def downgrade() -> None:
+    op.drop_table('item_stats')
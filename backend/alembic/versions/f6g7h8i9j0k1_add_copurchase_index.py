@@ -0,0 +1,92 @@
+"""add item_pairs and item_neighbors
+
+Revision ID: f6g7h8i9j0k1
+Revises: e5f6g7h8i9j0
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6g7h8i9j0k1'
+down_revision: Union[str, Sequence[str], None] = 'e5f6g7h8i9j0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEIGHBORS_PER_ITEM = 20
+
+
+def upgrade() -> None:
+    item_pairs = op.create_table(
+        'item_pairs',
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('item_a', sa.Integer(), nullable=False),
+        sa.Column('item_b', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.ForeignKeyConstraint(['item_a'], ['items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['item_b'], ['items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('household_id', 'item_a', 'item_b'),
+    )
+    item_neighbors = op.create_table(
+        'item_neighbors',
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('household_id', 'item_id', 'neighbor_id'),
+    )
+
+    # Backfill from completed sessions
+    history = op.get_bind().execute(sa.text(
+        """
+        SELECT shopping_sessions.household_id, session_items.session_id, session_items.item_id
+        FROM session_items
+        JOIN shopping_sessions ON shopping_sessions.id = session_items.session_id
+        WHERE shopping_sessions.completed_at IS NOT NULL
+          AND session_items.checked = 1
+          AND session_items.item_id IS NOT NULL
+        """
+    ))
+    baskets = defaultdict(set)
+    for household_id, session_id, item_id in history:
+        baskets[(household_id, session_id)].add(item_id)
+
+    counts = Counter()
+    for (household_id, _), basket in baskets.items():
+        for a, b in combinations(sorted(basket), 2):
+            counts[(household_id, a, b)] += 1
+    if not counts:
+        return
+
+    op.bulk_insert(item_pairs, [
+        {'household_id': household_id, 'item_a': a, 'item_b': b, 'count': count}
+        for (household_id, a, b), count in counts.items()
+    ])
+
+    neighbors = defaultdict(list)
+    for (household_id, a, b), count in counts.items():
+        neighbors[(household_id, a)].append((count, b))
+        neighbors[(household_id, b)].append((count, a))
+    rows = []
+    for (household_id, item_id), candidates in neighbors.items():
+        candidates.sort(key=lambda n: (-n[0], n[1]))
+        rows.extend(
+            {'household_id': household_id, 'item_id': item_id, 'neighbor_id': neighbor_id, 'count': count}
+            for count, neighbor_id in candidates[:NEIGHBORS_PER_ITEM]
+        )
+    op.bulk_insert(item_neighbors, rows)
+
+
+def downgrade() -> None:
+    op.drop_table('item_neighbors')
+    op.drop_table('item_pairs')
@@ -0,0 +1,76 @@
+"""unique (household_id, item_id) on shopping_list_items
+
+Revision ID: g7h8i9j0k1l2
+Revises: f6g7h8i9j0k1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'g7h8i9j0k1l2'
+down_revision: Union[str, Sequence[str], None] = 'f6g7h8i9j0k1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # Fold duplicate rows into the oldest one before the unique index can be
+    # created. Later rows apply like consecutive adds: the same unit adds
+    # its quantity, a different unit replaces quantity and unit.
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        """
+        SELECT id, household_id, item_id, quantity, unit FROM shopping_list_items
+        WHERE (household_id, item_id) IN (
+            SELECT household_id, item_id FROM shopping_list_items
+            GROUP BY household_id, item_id HAVING COUNT(*) > 1
+        )
+        ORDER BY household_id, item_id, id
+        """
+    )).all()
+
+    folded: dict[tuple[int, int], dict] = {}
+    dropped: list[int] = []
+    replaced = 0
+    for row_id, household_id, item_id, quantity, unit in rows:
+        keep = folded.get((household_id, item_id))
+        if keep is None:
+            folded[(household_id, item_id)] = {"id": row_id, "quantity": quantity, "unit": unit}
+            continue
+        dropped.append(row_id)
+        if unit == keep["unit"]:
+            keep["quantity"] = (keep["quantity"] or 0) + (quantity or 0)
+        else:
+            keep.update(quantity=quantity, unit=unit)
+            replaced += 1
+
+    if folded:
+        conn.execute(
+            sa.text("UPDATE shopping_list_items SET quantity = :quantity, unit = :unit WHERE id = :id"),
+            list(folded.values()),
+        )
+        conn.execute(
+            sa.text("DELETE FROM shopping_list_items WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": dropped},
+        )
+        logger.warning(
+            "Folded %d duplicate shopping list rows into %d; %d of them replaced a quantity in another unit",
+            len(dropped), len(folded), replaced,
+        )
+
+    op.create_index(
+        'ix_shopping_list_items_household_item', 'shopping_list_items',
+        ['household_id', 'item_id'], unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_shopping_list_items_household_item', table_name='shopping_list_items')
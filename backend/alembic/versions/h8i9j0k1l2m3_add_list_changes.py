@@ -0,0 +1,55 @@
+"""add list_changes, list_change_floors and sync_clients
+
+Revision ID: h8i9j0k1l2m3
+Revises: g7h8i9j0k1l2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'h8i9j0k1l2m3'
+down_revision: Union[str, Sequence[str], None] = 'g7h8i9j0k1l2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'list_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('list_item_id', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_list_changes_household_id', 'list_changes', ['household_id', 'id'])
+    op.create_table(
+        'list_change_floors',
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.PrimaryKeyConstraint('household_id'),
+    )
+    op.create_table(
+        'sync_clients',
+        sa.Column('household_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('seen_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id']),
+        sa.PrimaryKeyConstraint('household_id', 'client_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sync_clients')
+    op.drop_table('list_change_floors')
+    op.drop_index('ix_list_changes_household_id', table_name='list_changes')
+    op.drop_table('list_changes')
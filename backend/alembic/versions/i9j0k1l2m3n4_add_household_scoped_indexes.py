@@ -0,0 +1,48 @@
+"""add household scoped indexes
+
+Revision ID: i9j0k1l2m3n4
+Revises: h8i9j0k1l2m3
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'i9j0k1l2m3n4'
+down_revision: Union[str, Sequence[str], None] = 'h8i9j0k1l2m3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_categories_household_id', 'categories', ['household_id']),
+    ('ix_items_household_id', 'items', ['household_id']),
+    ('ix_items_category_id', 'items', ['category_id']),
+    ('ix_shopping_list_items_item_id', 'shopping_list_items', ['item_id']),
+    ('ix_recipes_household_id', 'recipes', ['household_id']),
+    ('ix_recipe_items_recipe_id', 'recipe_items', ['recipe_id']),
+    ('ix_recipe_items_item_id', 'recipe_items', ['item_id']),
+    ('ix_shopping_sessions_household_completed', 'shopping_sessions', ['household_id', 'completed_at']),
+    ('ix_session_items_session_id', 'session_items', ['session_id']),
+    ('ix_session_items_item_checked', 'session_items', ['item_id', 'checked', 'checked_at']),
+    # The household-first primary keys don't help lookups by item alone,
+    # which is also what ON DELETE CASCADE from items does
+    ('ix_item_stats_item_id', 'item_stats', ['item_id']),
+    ('ix_item_pairs_item_a', 'item_pairs', ['item_a']),
+    ('ix_item_pairs_item_b', 'item_pairs', ['item_b']),
+    ('ix_item_neighbors_item_id', 'item_neighbors', ['item_id']),
+    ('ix_item_neighbors_neighbor_id', 'item_neighbors', ['neighbor_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
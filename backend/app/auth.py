@@ -4,10 +4,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 import secrets
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
-from .database import get_db
+from . import database
+from .auth_cache import CachedHousehold, auth_cache
+from .database import get_async_db
+from .shards import current_household_id
 from .models import Household
 from .schemas import TokenData
 
@@ -40,38 +43,47 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def get_current_household(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
-    db: Session = Depends(get_db)
-) -> Household:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def _authenticate(token: str, db: AsyncSession) -> CachedHousehold | None:
+    """The household a token belongs to, or None if the token is invalid."""
+    household = auth_cache.get(token)
+    if household is not None:
+        return household
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         household_id_str = payload.get("sub")
         if household_id_str is None:
-            raise credentials_exception
+            return None
         token_data = TokenData(household_id=int(household_id_str))
-    except JWTError:
-        raise credentials_exception
+    except (JWTError, ValueError):
+        return None
+
+    row = await db.get(Household, token_data.household_id)
+    if row is None:
+        return None
+    household = CachedHousehold(row.id, row.token, row.created_at)
+    auth_cache.set(token, household, payload.get("exp"))
+    return household
 
-    household = db.query(Household).filter(Household.id == token_data.household_id).first()
+
+async def get_current_household(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
+    db: AsyncSession = Depends(get_async_db)
+) -> CachedHousehold:
+    household = await _authenticate(credentials.credentials, db)
     if household is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Route the rest of the request's statements to the household's shard
+    current_household_id.set(household.id)
+    if database.shard_router is not None:
+        await database.shard_router.open(household.id)
     return household
 
 
-def get_household_from_jwt(token: str, db: Session) -> Household | None:
+async def get_household_from_jwt(token: str, db: AsyncSession) -> CachedHousehold | None:
     """Decode a JWT string and return the Household, or None."""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        household_id_str = payload.get("sub")
-        if household_id_str is None:
-            return None
-        household = db.query(Household).filter(Household.id == int(household_id_str)).first()
-        return household
-    except JWTError:
-        return None
+    return await _authenticate(token, db)
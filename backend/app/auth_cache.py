@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event
+
+from .models import Household
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class CachedHousehold:
+    """The columns of a household that authenticated requests need."""
+    id: int
+    token: str
+    created_at: datetime | None
+
+
+class AuthCache:
+    """LRU + TTL cache of verified access tokens and their household.
+
+    Keyed by a digest of the token, so verifying a token and loading its
+    household happens once per AUTH_CACHE_TTL seconds instead of on every
+    request. An entry never outlives the token's own `exp`, and deleting a
+    household drops every entry pointing at it.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, CachedHousehold]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> CachedHousehold | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, household = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return household
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, household: CachedHousehold, exp: float | None = None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, household)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_household(self, household_id: int):
+        with self._lock:
+            for key in [key for key, (_, household) in self._entries.items() if household.id == household_id]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+auth_cache = AuthCache()
+
+
+@event.listens_for(Household, "after_delete")
+def _forget_deleted_household(mapper, connection, target):
+    auth_cache.invalidate_household(target.id)
@@ -0,0 +1,391 @@
+"""Broadcast bus between API worker processes.
+
+Every worker only knows its own WebSocket connections. `broadcast_update`
+hands updates to the bus, which delivers them to this worker's sockets
+right away and, depending on BROADCAST_BUS, passes them on to the other
+workers, which deliver them to theirs:
+
+- "memory" (default): no other workers, updates stay in this process.
+- "sqlite": updates are appended to a small table in a separate SQLite
+  file (BROADCAST_BUS_URL, default sqlite:///./data/broadcast.db) that
+  every worker polls every BROADCAST_BUS_POLL_MS milliseconds. Needs no
+  extra service, for several workers on one machine.
+- "redis": updates are published on a Redis channel (BROADCAST_BUS_URL,
+  e.g. redis://:password@localhost:6379) every worker subscribes to. Any
+  server speaking the Redis protocol's PUBLISH/SUBSCRIBE works.
+
+Each bus tags its messages with a random origin id so a worker skips the
+updates it has already delivered itself. For updates from other workers
+the bus also calls `on_remote` with the household, so the worker can drop
+what it has cached about that household. Changes that are not broadcast
+still reach the other workers' caches: `invalidate` sends a message that
+only triggers `on_remote`.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BUS = os.getenv("BROADCAST_BUS", "memory")
+BROADCAST_BUS_URL = os.getenv("BROADCAST_BUS_URL", "")
+BROADCAST_BUS_POLL_MS = float(os.getenv("BROADCAST_BUS_POLL_MS", "50"))
+BROADCAST_BUS_CHANNEL = os.getenv("BROADCAST_BUS_CHANNEL", "nakupak:broadcast")
+
+Deliver = Callable[[int, str, dict], Awaitable[None]]
+
+# Update type of messages that only invalidate the other workers' caches
+INVALIDATE = "invalidate"
+
+
+class LocalBus:
+    """Delivers updates to this process's sockets only."""
+
+    backend = "memory"
+
+    def __init__(self, deliver: Deliver, on_remote: Callable[[int], None] | None = None):
+        self.deliver = deliver
+        self.on_remote = on_remote
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        # The event loop of a started bus that passes messages on
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._invalidations: set[asyncio.Future] = set()
+        self.published = 0
+        self.invalidated = 0
+        self.received = 0
+        self.failures = 0
+
+    async def publish(self, household_id: int, update_type: str, data: dict):
+        with self._lock:
+            self.published += 1
+        await self.deliver(household_id, update_type, data)
+        await self._send(self._encode(household_id, update_type, data))
+
+    async def _send(self, message: str):
+        """Pass an encoded message on to the other workers."""
+
+    def invalidate(self, household_id: int):
+        """Tell the other workers to drop what they cached about the household.
+
+        Called after every version bump, from request threads as well as
+        from the event loop, so the message is sent in the background.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._lock:
+            self.invalidated += 1
+        coro = self._send(self._encode(household_id, INVALIDATE, {}))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        try:
+            if running is loop:
+                future = loop.create_task(coro)
+            else:
+                future = asyncio.run_coroutine_threadsafe(coro, loop)
+        except RuntimeError:
+            # The loop stopped in the meantime
+            coro.close()
+            return
+        self._invalidations.add(future)
+        future.add_done_callback(self._invalidations.discard)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def _encode(self, household_id: int, update_type: str, data: dict) -> str:
+        return json.dumps({"origin": self.origin, "household_id": household_id, "type": update_type, "data": data})
+
+    async def _receive(self, origin: str, household_id: int, update_type: str, data: dict):
+        """Deliver an update that came in over the bus, unless we sent it."""
+        if origin == self.origin:
+            return
+        with self._lock:
+            self.received += 1
+        if self.on_remote is not None:
+            self.on_remote(household_id)
+        if update_type != INVALIDATE:
+            await self.deliver(household_id, update_type, data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "published": self.published,
+                "invalidated": self.invalidated,
+                "received": self.received,
+                "failures": self.failures,
+            }
+
+
+class SQLiteBus(LocalBus):
+    """Workers on one machine share updates through a polled SQLite table."""
+
+    backend = "sqlite"
+    # Messages only need to live until every worker has polled them
+    RETENTION_SECONDS = 60
+
+    def __init__(self, deliver: Deliver, path: str, poll_ms: float = BROADCAST_BUS_POLL_MS, on_remote=None):
+        super().__init__(deliver, on_remote)
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._last_id = 0
+        self._task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._db_lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA busy_timeout=5000")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS broadcast_messages ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, message TEXT NOT NULL)"
+                )
+                self._conn = conn
+            return self._conn
+
+    def _append(self, message: str):
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute(
+                "INSERT INTO broadcast_messages (created_at, message) VALUES (?, ?)", (time.time(), message)
+            )
+
+    def _fetch(self) -> list[tuple[int, str]]:
+        conn = self._connect()
+        with self._db_lock:
+            rows = conn.execute(
+                "SELECT id, message FROM broadcast_messages WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+            return rows
+
+    def _prune(self):
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute(
+                "DELETE FROM broadcast_messages WHERE created_at < ?", (time.time() - self.RETENTION_SECONDS,)
+            )
+
+    async def _send(self, message: str):
+        try:
+            await asyncio.to_thread(self._append, message)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            logger.exception("Could not append update to the broadcast bus")
+
+    async def start(self):
+        if self._task is not None:
+            return
+
+        def _skip_backlog():
+            conn = self._connect()
+            with self._db_lock:
+                self._last_id = conn.execute("SELECT coalesce(max(id), 0) FROM broadcast_messages").fetchone()[0]
+
+        await asyncio.to_thread(_skip_backlog)
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                rows = await asyncio.to_thread(self._fetch)
+                for _, message in rows:
+                    update = json.loads(message)
+                    await self._receive(update["origin"], update["household_id"], update["type"], update["data"])
+                polls += 1
+                if polls % 1000 == 0:
+                    await asyncio.to_thread(self._prune)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                logger.exception("Could not poll the broadcast bus")
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RespError(Exception):
+    """An error reply from the server."""
+
+
+class RespConnection:
+    """Just enough of a Redis protocol (RESP2) client for PUBLISH/SUBSCRIBE."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url: str) -> "RespConnection":
+        parts = urlsplit(url)
+        reader, writer = await asyncio.open_connection(parts.hostname or "localhost", parts.port or 6379)
+        conn = cls(reader, writer)
+        if parts.password:
+            args = [unquote(parts.username), unquote(parts.password)] if parts.username else [unquote(parts.password)]
+            await conn.command("AUTH", *args)
+        return conn
+
+    async def send(self, *args: str | bytes):
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.writer.write(b"".join(out))
+        await self.writer.drain()
+
+    async def read(self):
+        line = await self.reader.readuntil(b"\r\n")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [await self.read() for _ in range(length)]
+        raise RespError(f"Unexpected reply {line!r}")
+
+    async def command(self, *args: str | bytes):
+        await self.send(*args)
+        return await self.read()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class RedisBus(LocalBus):
+    """Workers share updates through a Redis pub/sub channel."""
+
+    backend = "redis"
+    RECONNECT_SECONDS = 1
+
+    def __init__(self, deliver: Deliver, url: str, channel: str = BROADCAST_BUS_CHANNEL, on_remote=None):
+        super().__init__(deliver, on_remote)
+        self.url = url
+        self.channel = channel
+        self._publisher: RespConnection | None = None
+        self._publish_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.subscribed = asyncio.Event()
+
+    async def _send(self, message: str):
+        async with self._publish_lock:
+            # One retry on a fresh connection if the old one went away
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = await RespConnection.open(self.url)
+                    await self._publisher.command("PUBLISH", self.channel, message)
+                    return
+                except (OSError, asyncio.IncompleteReadError, RespError):
+                    if self._publisher is not None:
+                        await self._publisher.close()
+                        self._publisher = None
+        with self._lock:
+            self.failures += 1
+        logger.warning("Could not publish update to the broadcast bus at %s", self.url)
+
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = await RespConnection.open(self.url)
+                await conn.command("SUBSCRIBE", self.channel)
+                self.subscribed.set()
+                while True:
+                    reply = await conn.read()
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        update = json.loads(reply[2])
+                        await self._receive(update["origin"], update["household_id"], update["type"], update["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.subscribed.clear()
+                with self._lock:
+                    self.failures += 1
+                logger.warning("Broadcast bus subscription to %s lost, reconnecting", self.url, exc_info=True)
+                await asyncio.sleep(self.RECONNECT_SECONDS)
+            finally:
+                if conn is not None:
+                    await conn.close()
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._publisher is not None:
+            await self._publisher.close()
+            self._publisher = None
+
+
+def create_bus(
+    deliver: Deliver,
+    backend: str = BROADCAST_BUS,
+    url: str = BROADCAST_BUS_URL,
+    on_remote: Callable[[int], None] | None = None,
+) -> LocalBus:
+    if backend == "memory":
+        return LocalBus(deliver, on_remote)
+    if backend == "sqlite":
+        url = url or "sqlite:///./data/broadcast.db"
+        return SQLiteBus(deliver, url.replace("sqlite:///", "", 1), on_remote=on_remote)
+    if backend == "redis":
+        return RedisBus(deliver, url or "redis://localhost:6379", on_remote=on_remote)
+    raise ValueError(f"Unknown BROADCAST_BUS {backend!r}, expected memory, sqlite or redis")
@@ -0,0 +1,208 @@
+"""Change log of shopping list rows for delta sync.
+
+Mutation handlers call `record_list_changes` in the same transaction as
+the change itself: an upsert for rows that were created or changed
+(including rows whose embedded item or category changed) and a
+tombstone for deleted rows. The autoincrement id of the newest entry is
+the household's list version; `GET /api/list/changes?since=<version>`
+replays everything after it.
+
+The entries a session records are also collected in `db.info` so that,
+after committing, the handler can broadcast them with `list_delta`.
+
+Clients identify themselves with a client id, and the version they ask
+for is remembered as their cursor. Compaction (run by the janitor)
+drops the entries every known client has moved past and records that
+point as the household's floor. A client asking for a version below
+the floor gets a full reset instead of a delta. Clients that have not
+been seen for SYNC_CLIENT_TTL_DAYS are forgotten.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
+
+from .models import Item, ListChange, ListChangeFloor, ShoppingListItem, SyncClient
+from .schemas import ShoppingListItemResponse
+
+SYNC_CLIENT_TTL_DAYS = float(os.getenv("SYNC_CLIENT_TTL_DAYS", "30"))
+
+
+def record_list_changes(db: Session, household_id: int, upserted=(), deleted=()):
+    """Log list rows that were created/changed and rows that were deleted."""
+    rows = [
+        {"household_id": household_id, "list_item_id": list_item_id, "deleted": False}
+        for list_item_id in dict.fromkeys(upserted)
+    ] + [
+        {"household_id": household_id, "list_item_id": list_item_id, "deleted": True}
+        for list_item_id in dict.fromkeys(deleted)
+    ]
+    if not rows:
+        return
+    change_ids = db.execute(insert(ListChange).returning(ListChange.id), rows).scalars().all()
+
+    first, last, latest = db.info.setdefault("list_changes", {}).get(household_id, (None, 0, {}))
+    for row in rows:
+        latest[row["list_item_id"]] = row["deleted"]
+    db.info["list_changes"][household_id] = (
+        min(change_ids) if first is None else min(first, *change_ids),
+        max(last, *change_ids),
+        latest,
+    )
+
+
+def delete_list_items(db: Session, household_id: int, *criteria) -> list[int]:
+    """Delete the household's list rows matching `criteria`, logging tombstones."""
+    deleted = db.execute(
+        delete(ShoppingListItem).where(
+            ShoppingListItem.household_id == household_id, *criteria
+        ).returning(ShoppingListItem.id),
+        execution_options={"synchronize_session": False},
+    ).scalars().all()
+    record_list_changes(db, household_id, deleted=deleted)
+    return deleted
+
+
+def touch_list_items(db: Session, household_id: int, *criteria):
+    """Log the household's list rows matching `criteria` as changed.
+
+    Used when data embedded in list rows (the item or its category) changes.
+    """
+    touched = [
+        list_item_id for (list_item_id,) in db.query(ShoppingListItem.id).filter(
+            ShoppingListItem.household_id == household_id, *criteria
+        )
+    ]
+    record_list_changes(db, household_id, upserted=touched)
+
+
+def floor(db: Session, household_id: int) -> int:
+    return db.query(ListChangeFloor.version).filter(
+        ListChangeFloor.household_id == household_id
+    ).scalar() or 0
+
+
+def list_version(db: Session, household_id: int) -> int:
+    """The id of the newest change, or the floor if everything was compacted."""
+    floor_version = db.query(ListChangeFloor.version).filter(
+        ListChangeFloor.household_id == household_id
+    ).scalar_subquery()
+    return db.query(func.coalesce(func.max(ListChange.id), floor_version, 0)).filter(
+        ListChange.household_id == household_id
+    ).scalar()
+
+
+def changes_since(db: Session, household_id: int, since: int) -> tuple[int, list[int], list[int]] | None:
+    """Collapse the log after `since` into (version, upserted ids, deleted ids).
+
+    Only the latest entry per row counts. Returns None if `since` has been
+    compacted away (or is from the future) and the client must resync.
+    """
+    version = list_version(db, household_id)
+    if since > version or since < floor(db, household_id):
+        return None
+
+    latest: dict[int, bool] = {}
+    for list_item_id, deleted in db.query(ListChange.list_item_id, ListChange.deleted).filter(
+        ListChange.household_id == household_id,
+        ListChange.id > since,
+    ).order_by(ListChange.id):
+        latest[list_item_id] = deleted
+    upserted = [list_item_id for list_item_id, deleted in latest.items() if not deleted]
+    deleted = [list_item_id for list_item_id, deleted in latest.items() if deleted]
+    return version, upserted, deleted
+
+
+def list_delta(db: Session, household_id: int) -> dict:
+    """Payload for a list_updated broadcast of what this session recorded.
+
+    Call after committing, or at the end of the transaction once the
+    changes are flushed (writer queue units do this). `from_version` is the version the changes
+    apply on top of; a client at another version should resync instead.
+    Returns an empty payload if nothing was recorded.
+    """
+    pending = db.info.get("list_changes", {}).pop(household_id, None)
+    if pending is None:
+        return {}
+    first, version, latest = pending
+
+    floor_version = db.query(ListChangeFloor.version).filter(
+        ListChangeFloor.household_id == household_id
+    ).scalar_subquery()
+    from_version = db.query(func.coalesce(func.max(ListChange.id), floor_version, 0)).filter(
+        ListChange.household_id == household_id,
+        ListChange.id < first,
+    ).scalar()
+
+    upserted_ids = [list_item_id for list_item_id, deleted in latest.items() if not deleted]
+    upserted = db.query(ShoppingListItem).join(ShoppingListItem.item).options(
+        joinedload(ShoppingListItem.item).joinedload(Item.category)
+    ).filter(
+        ShoppingListItem.household_id == household_id,
+        ShoppingListItem.id.in_(upserted_ids),
+    ).all() if upserted_ids else []
+    found = {row.id for row in upserted}
+    return {
+        "version": version,
+        "from_version": from_version,
+        "upserted": [ShoppingListItemResponse.model_validate(row).model_dump(mode="json") for row in upserted],
+        "deleted": [list_item_id for list_item_id in latest if list_item_id not in found],
+    }
+
+
+def touch_client(db: Session, household_id: int, client_id: str, version: int) -> bool:
+    """Remember that the client has everything up to `version`.
+
+    Polling without news doesn't write; the cursor only moves when the
+    version does (or to refresh a last-seen time older than an hour).
+    Returns whether anything was written.
+    """
+    current = db.query(SyncClient.version, SyncClient.seen_at).filter(
+        SyncClient.household_id == household_id,
+        SyncClient.client_id == client_id,
+    ).first()
+    if current is not None and current.version == version and current.seen_at > datetime.utcnow() - timedelta(hours=1):
+        return False
+
+    stmt = sqlite_insert(SyncClient).values(
+        household_id=household_id, client_id=client_id, version=version, seen_at=datetime.utcnow()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SyncClient.household_id, SyncClient.client_id],
+        set_={"version": stmt.excluded.version, "seen_at": stmt.excluded.seen_at},
+    ))
+    return True
+
+
+def compact(db: Session, client_ttl: timedelta = timedelta(days=SYNC_CLIENT_TTL_DAYS)) -> int:
+    """Drop log entries all known clients have seen. Returns entries removed.
+
+    The caller commits.
+    """
+    db.query(SyncClient).filter(
+        SyncClient.seen_at < datetime.utcnow() - client_ttl
+    ).delete(synchronize_session=False)
+
+    cursors = dict(db.query(SyncClient.household_id, func.min(SyncClient.version)).group_by(
+        SyncClient.household_id
+    ).all())
+    removed = 0
+    for household_id, newest in db.query(ListChange.household_id, func.max(ListChange.id)).group_by(
+        ListChange.household_id
+    ).all():
+        # Without any known client, nobody needs the history
+        cutoff = min(cursors.get(household_id, newest), newest)
+        if cutoff <= floor(db, household_id):
+            continue
+        removed += db.query(ListChange).filter(
+            ListChange.household_id == household_id,
+            ListChange.id <= cutoff,
+        ).delete(synchronize_session=False)
+        stmt = sqlite_insert(ListChangeFloor).values(household_id=household_id, version=cutoff)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ListChangeFloor.household_id],
+            set_={"version": stmt.excluded.version},
+        ))
+    return removed
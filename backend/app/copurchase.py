@@ -0,0 +1,208 @@
+"""Index of items that are frequently bought together.
+
+`item_pairs` counts, per household, how many completed shopping trips
+contained both items of a pair (stored once, with item_a < item_b).
+`item_neighbors` keeps the top NEIGHBORS_PER_ITEM partners of every item
+so suggestions are a short indexed lookup instead of a scan over the
+session history. Both are updated as trips complete.
+
+Rebuild from history with:
+
+    python -m app.copurchase [household_id ...]
+"""
+import sys
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .models import ItemNeighbor, ItemPair, SessionItem, ShoppingSession
+
+NEIGHBORS_PER_ITEM = 20
+
+
+def _pairs(item_ids) -> list[tuple[int, int]]:
+    return list(combinations(sorted(set(item_ids)), 2))
+
+
+def record_basket(db: Session, household_id: int, item_ids, sign: int = 1):
+    """Add (or with sign=-1, remove) one shopping trip's items to the index."""
+    pairs = _pairs(item_ids)
+    if not pairs:
+        return
+
+    stmt = insert(ItemPair)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ItemPair.household_id, ItemPair.item_a, ItemPair.item_b],
+            set_={"count": ItemPair.count + stmt.excluded.count},
+        ),
+        [
+            {"household_id": household_id, "item_a": a, "item_b": b, "count": sign}
+            for a, b in pairs
+        ],
+    )
+    if sign < 0:
+        db.query(ItemPair).filter(
+            ItemPair.household_id == household_id,
+            ItemPair.count <= 0,
+        ).delete(synchronize_session=False)
+
+    refresh_neighbors(db, household_id, {i for pair in pairs for i in pair})
+
+
+def refresh_neighbors(db: Session, household_id: int, item_ids):
+    """Recompute the top-K neighbor lists of the given items."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    db.query(ItemNeighbor).filter(
+        ItemNeighbor.household_id == household_id,
+        ItemNeighbor.item_id.in_(item_ids),
+    ).delete(synchronize_session=False)
+
+    wanted = set(item_ids)
+    candidates: dict[int, list[tuple[int, int]]] = defaultdict(list)
+    for a, b, count in db.query(ItemPair.item_a, ItemPair.item_b, ItemPair.count).filter(
+        ItemPair.household_id == household_id,
+        or_(ItemPair.item_a.in_(item_ids), ItemPair.item_b.in_(item_ids)),
+    ):
+        if a in wanted:
+            candidates[a].append((count, b))
+        if b in wanted:
+            candidates[b].append((count, a))
+
+    rows = []
+    for item_id, neighbors in candidates.items():
+        neighbors.sort(key=lambda n: (-n[0], n[1]))
+        rows.extend(
+            {"household_id": household_id, "item_id": item_id, "neighbor_id": neighbor_id, "count": count}
+            for count, neighbor_id in neighbors[:NEIGHBORS_PER_ITEM]
+        )
+    if rows:
+        db.execute(insert(ItemNeighbor), rows)
+
+
+def forget_items(db: Session, household_id: int, item_ids):
+    """Drop deleted items from the index and refill the lists they were in."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    affected = {
+        item_id for (item_id,) in db.query(ItemNeighbor.item_id).filter(
+            ItemNeighbor.household_id == household_id,
+            ItemNeighbor.neighbor_id.in_(item_ids),
+        )
+    } - set(item_ids)
+
+    db.query(ItemPair).filter(
+        ItemPair.household_id == household_id,
+        or_(ItemPair.item_a.in_(item_ids), ItemPair.item_b.in_(item_ids)),
+    ).delete(synchronize_session=False)
+    db.query(ItemNeighbor).filter(
+        ItemNeighbor.household_id == household_id,
+        ItemNeighbor.item_id.in_(item_ids),
+    ).delete(synchronize_session=False)
+    refresh_neighbors(db, household_id, affected)
+
+
+def _baskets(db: Session, household_id: int, session_ids=None) -> dict[int, set[int]]:
+    history = db.query(SessionItem.session_id, SessionItem.item_id).join(
+        ShoppingSession, ShoppingSession.id == SessionItem.session_id
+    ).filter(
+        ShoppingSession.household_id == household_id,
+        ShoppingSession.completed_at != None,
+        SessionItem.checked == True,
+        SessionItem.item_id != None,
+    )
+    if session_ids is not None:
+        history = history.filter(SessionItem.session_id.in_(session_ids))
+
+    baskets: dict[int, set[int]] = defaultdict(set)
+    for session_id, item_id in history:
+        baskets[session_id].add(item_id)
+    return baskets
+
+
+def rebuild_copurchase(db: Session, household_id: int, item_ids=None) -> int:
+    """Recompute the index from the session history.
+
+    With `item_ids`, only pairs involving those items are recomputed.
+    Returns the number of pairs written.
+    """
+    pairs = db.query(ItemPair).filter(ItemPair.household_id == household_id)
+    if item_ids is not None:
+        item_ids = set(item_ids)
+        if not item_ids:
+            return 0
+        pairs = pairs.filter(or_(ItemPair.item_a.in_(item_ids), ItemPair.item_b.in_(item_ids)))
+        session_ids = db.query(SessionItem.session_id).filter(SessionItem.item_id.in_(item_ids))
+        baskets = _baskets(db, household_id, session_ids)
+    else:
+        baskets = _baskets(db, household_id)
+    pairs.delete(synchronize_session=False)
+
+    counts: Counter[tuple[int, int]] = Counter()
+    for basket in baskets.values():
+        for pair in _pairs(basket):
+            if item_ids is None or pair[0] in item_ids or pair[1] in item_ids:
+                counts[pair] += 1
+
+    if counts:
+        db.execute(insert(ItemPair), [
+            {"household_id": household_id, "item_a": a, "item_b": b, "count": count}
+            for (a, b), count in counts.items()
+        ])
+
+    if item_ids is None:
+        db.query(ItemNeighbor).filter(
+            ItemNeighbor.household_id == household_id
+        ).delete(synchronize_session=False)
+        touched = {i for pair in counts for i in pair}
+    else:
+        touched = set(item_ids) | {i for pair in counts for i in pair} | {
+            item_id for (item_id,) in db.query(ItemNeighbor.item_id).filter(
+                ItemNeighbor.household_id == household_id,
+                ItemNeighbor.neighbor_id.in_(item_ids),
+            )
+        }
+    refresh_neighbors(db, household_id, touched)
+    return len(counts)
+
+
+def suggest(db: Session, household_id: int, item_ids, limit: int) -> list[tuple[int, int]]:
+    """Top items bought together with `item_ids`, as (item id, score) pairs."""
+    item_ids = set(item_ids)
+    if not item_ids:
+        return []
+
+    scores: Counter[int] = Counter()
+    for neighbor_id, count in db.query(ItemNeighbor.neighbor_id, ItemNeighbor.count).filter(
+        ItemNeighbor.household_id == household_id,
+        ItemNeighbor.item_id.in_(item_ids),
+    ):
+        if neighbor_id not in item_ids:
+            scores[neighbor_id] += count
+    return sorted(scores.items(), key=lambda s: (-s[1], s[0]))[:limit]
+
+
+def main(argv: list[str]):
+    from .database import SessionLocal
+    from .models import Household
+
+    db = SessionLocal()
+    try:
+        household_ids = [int(hid) for hid in argv] or [h.id for h in db.query(Household.id)]
+        written = sum(rebuild_copurchase(db, hid) for hid in household_ids)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {written} item pairs")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,9 +1,62 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
 
+from .shards import CATALOG_TABLES, DATABASE_SHARDS_DIR, ShardRouter, current_household_id
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/nakupak.db")
 
+# Pragmas applied to every new SQLite connection, selected with
+# SQLITE_PROFILE. "wal" lets readers run alongside a writer and only syncs
+# at checkpoints (a power loss can lose the last commits, never corrupt);
+# "durable" keeps WAL but syncs every commit; "off" leaves SQLite's
+# defaults. Single pragmas can be overridden with SQLITE_PRAGMAS, e.g.
+# "cache_size=-64000,mmap_size=0".
+SQLITE_PROFILES = {
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+        "cache_size": "-20000",
+        "mmap_size": "268435456",
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": "5000",
+        "foreign_keys": "ON",
+    },
+    "off": {},
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "wal")
+
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE, overrides: str = os.getenv("SQLITE_PRAGMAS", "")) -> dict[str, str]:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}, expected one of {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for override in filter(None, (o.strip() for o in overrides.split(","))):
+        name, _, value = override.partition("=")
+        pragmas[name.strip()] = value.strip()
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict[str, str]):
+    """Run the pragmas on every connection the engine opens."""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
 # Ensure the directory for the SQLite database exists
 if DATABASE_URL.startswith("sqlite:///"):
     db_path = DATABASE_URL.replace("sqlite:///", "", 1)
@@ -13,8 +66,61 @@ engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 )
+if engine.dialect.name == "sqlite":
+    apply_sqlite_pragmas(engine, sqlite_pragmas())
+
+# With DATABASE_SHARDS_DIR set, the database above is only the catalog of
+# households and each household's data lives in its own file (app.shards)
+shard_router = ShardRouter(DATABASE_SHARDS_DIR, catalog_engine=engine) if DATABASE_SHARDS_DIR else None
+
+
+class RoutingSession(Session):
+    """Sends statements to the current household's shard when sharding is on.
+
+    The shard is looked up once per session and household and kept in
+    `info`, so a transaction stays on one engine even if the router evicts
+    that shard in the meantime.
+    """
+
+    def _shard(self, mapper):
+        if shard_router is None:
+            return None
+        household_id = current_household_id.get()
+        if household_id is None or (mapper is not None and mapper.local_table.name in CATALOG_TABLES):
+            return None
+        shards = self.info.setdefault("shards", {})
+        shard = shards.get(household_id)
+        if shard is None:
+            shard = shards[household_id] = shard_router.shard(household_id)
+        return shard
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        shard = self._shard(mapper)
+        return shard.engine if shard is not None else super().get_bind(mapper, clause=clause, **kw)
+
+
+class AsyncRoutingSession(RoutingSession):
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        shard = self._shard(mapper)
+        return shard.async_engine.sync_engine if shard is not None else Session.get_bind(self, mapper, clause=clause, **kw)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+
+# Read endpoints, authentication and the WebSocket run on the event loop
+# through an async engine on the same database (aiosqlite for SQLite).
+# Writes stay on the sync engine: SQLite has a single writer either way.
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if DATABASE_URL.startswith("sqlite://") else DATABASE_URL,
+)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+if async_engine.dialect.name == "sqlite":
+    apply_sqlite_pragmas(async_engine.sync_engine, sqlite_pragmas())
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, expire_on_commit=False, autoflush=False, sync_session_class=AsyncRoutingSession
+)
 
 Base = declarative_base()
 
@@ -25,3 +131,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """For handlers that must not hold a session for their whole lifetime."""
+    return AsyncSessionLocal
@@ -0,0 +1,35 @@
+"""JSON encoding for responses and WebSocket frames.
+
+Uses orjson when it is installed (`uv sync --extra speedups`) and the
+standard library otherwise; both produce compact UTF-8 JSON.
+"""
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def dumps(obj) -> str:
+    return dumps_bytes(obj).decode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps_bytes`.
+
+    Routes with a response_model are serialized by Pydantic directly as long
+    as the app's default response class stays a `Default(...)` placeholder,
+    so this only renders the routes that return plain dicts and lists.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps_bytes(content)
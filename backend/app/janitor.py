@@ -0,0 +1,152 @@
+"""Periodic cleanup of rows the request handlers leave behind.
+
+Runs in the background for the lifetime of the app so that read
+endpoints never have to write. Each sweep removes
+
+- shopping list rows whose item no longer exists,
+- shopping sessions that were started but never completed and have been
+  idle for longer than JANITOR_STALE_SESSION_HOURS, and
+- list change log entries every known sync client has moved past.
+
+Set JANITOR_INTERVAL=0 to disable the background task.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from .changes import compact, record_list_changes
+from .models import Item, SessionItem, ShoppingListItem, ShoppingSession
+from .shards import current_household_id
+
+logger = logging.getLogger(__name__)
+
+JANITOR_INTERVAL = float(os.getenv("JANITOR_INTERVAL", "600"))
+JANITOR_STALE_SESSION_HOURS = float(os.getenv("JANITOR_STALE_SESSION_HOURS", "24"))
+
+
+def sweep(db: Session, stale_after: timedelta) -> dict[str, int]:
+    """Run all cleanups in one transaction and commit."""
+    orphaned = db.execute(
+        delete(ShoppingListItem).where(
+            ~ShoppingListItem.item_id.in_(db.query(Item.id))
+        ).returning(ShoppingListItem.household_id, ShoppingListItem.id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    tombstones: dict[int, list[int]] = {}
+    for household_id, list_item_id in orphaned:
+        tombstones.setdefault(household_id, []).append(list_item_id)
+    for household_id, list_item_ids in tombstones.items():
+        record_list_changes(db, household_id, deleted=list_item_ids)
+
+    # Idle means neither started nor checked off anything since the cutoff
+    cutoff = datetime.utcnow() - stale_after
+    stale = db.query(ShoppingSession.id).filter(
+        ShoppingSession.completed_at == None,
+        ShoppingSession.started_at < cutoff,
+        ~ShoppingSession.session_items.any(SessionItem.checked_at >= cutoff),
+    )
+    db.query(SessionItem).filter(
+        SessionItem.session_id.in_(stale)
+    ).delete(synchronize_session=False)
+    stale_sessions = db.query(ShoppingSession).filter(
+        ShoppingSession.id.in_(stale)
+    ).delete(synchronize_session=False)
+
+    compacted = compact(db)
+
+    db.commit()
+    return {
+        "orphaned_list_items": len(orphaned),
+        "stale_sessions": stale_sessions,
+        "compacted_list_changes": compacted,
+    }
+
+
+class Janitor:
+    def __init__(
+        self,
+        interval: float = JANITOR_INTERVAL,
+        stale_session_hours: float = JANITOR_STALE_SESSION_HOURS,
+    ):
+        self.interval = interval
+        self.stale_after = timedelta(hours=stale_session_hours)
+        self._task: asyncio.Task | None = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.removed = {"orphaned_list_items": 0, "stale_sessions": 0, "compacted_list_changes": 0}
+        self.last_run_at: datetime | None = None
+
+    def run_once(self, session_factory=None) -> dict[str, int]:
+        """Run one sweep in its own session and record the outcome.
+
+        With sharding on, every household shard is swept in turn.
+        """
+        from . import database
+        if session_factory is None:
+            session_factory = database.SessionLocal
+        shard_router = database.shard_router
+
+        removed = dict.fromkeys(self.removed, 0)
+        for household_id in shard_router.household_ids() if shard_router is not None else [None]:
+            token = current_household_id.set(household_id)
+            db = session_factory()
+            try:
+                for key, count in sweep(db, self.stale_after).items():
+                    removed[key] += count
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self.failures += 1
+                raise
+            finally:
+                db.close()
+                current_household_id.reset(token)
+
+        with self._lock:
+            self.runs += 1
+            self.last_run_at = datetime.utcnow()
+            for key, count in removed.items():
+                self.removed[key] += count
+        if any(removed.values()):
+            logger.info("Janitor removed %s", removed)
+        return removed
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("Janitor sweep failed")
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "failures": self.failures,
+                "removed": dict(self.removed),
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            }
+
+
+janitor = Janitor()
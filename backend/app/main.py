@@ -1,17 +1,26 @@
 from pathlib import Path
 
+import asyncio
 import os
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect, Query
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import FileResponse
 from contextlib import asynccontextmanager
 
-from .database import engine, SessionLocal
-from .websocket import manager
+from . import database
+from .database import async_engine, engine, get_async_sessionmaker
+from .fastjson import FastJSONResponse
+from .websocket import bus, manager
 from .auth import get_household_from_jwt
 from .llm_worker_manager import llm_worker_manager
+from .pool_cache import pool_cache
+from .auth_cache import auth_cache
+from .janitor import janitor
+from .maintenance import db_maintenance
+from .writer import writer
 from .routers import auth, items, list, recipes, sessions, import_recipe
 
 
@@ -52,10 +61,21 @@ _uploads_dir.mkdir(parents=True, exist_ok=True)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     _run_alembic_migrations()
+    janitor.start()
+    db_maintenance.start()
+    await bus.start()
     yield
+    await bus.stop()
+    await janitor.stop()
+    await asyncio.to_thread(writer.stop)
+    await db_maintenance.stop()
+    await async_engine.dispose()
+    if database.shard_router is not None:
+        database.shard_router.close()
 
 
-app = FastAPI(title="Nákupák API", lifespan=lifespan)
+# Default() keeps Pydantic's direct serialization for routes with a response_model
+app = FastAPI(title="Nákupák API", lifespan=lifespan, default_response_class=Default(FastJSONResponse))
 
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +83,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-List-Version"],
 )
 
 app.include_router(auth.router)
@@ -74,16 +95,18 @@ app.include_router(import_recipe.router)
 
 
 @app.websocket("/api/ws")
-async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: str = Query(None),
+    session_factory=Depends(get_async_sessionmaker),
+):
     if not token:
         await websocket.close(code=1008)
         return
 
-    db = SessionLocal()
-    try:
-        household = get_household_from_jwt(token, db)
-    finally:
-        db.close()
+    # Only for the lookup; the socket can stay open for hours
+    async with session_factory() as db:
+        household = await get_household_from_jwt(token, db)
 
     if not household:
         await websocket.close(code=1008)
@@ -95,6 +118,9 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
         while True:
             data = await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
+        # No-op if a failed send already dropped the socket
         manager.disconnect(websocket, household_id)
 
 
@@ -122,6 +148,20 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+def metrics():
+    return {
+        "pool_cache": pool_cache.stats(),
+        "auth_cache": auth_cache.stats(),
+        "janitor": janitor.stats(),
+        "db_maintenance": db_maintenance.stats(),
+        "websocket": manager.stats(),
+        "bus": bus.stats(),
+        "writer": writer.stats(),
+        "shards": database.shard_router.stats() if database.shard_router is not None else None,
+    }
+
+
 # Serve uploaded files
 app.mount("/api/uploads", StaticFiles(directory=_uploads_dir), name="uploads")
 
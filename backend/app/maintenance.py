@@ -0,0 +1,101 @@
+"""Periodic SQLite housekeeping.
+
+Every DB_MAINTENANCE_INTERVAL seconds (default 3600, 0 disables) runs
+`PRAGMA optimize`, which refreshes the query planner's statistics where
+they have drifted, and a passive WAL checkpoint so the -wal file doesn't
+keep growing while readers are around. On shutdown it runs both once more
+with a truncating checkpoint.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DB_MAINTENANCE_INTERVAL = float(os.getenv("DB_MAINTENANCE_INTERVAL", "3600"))
+
+
+def run_maintenance(engine, checkpoint: str = "PASSIVE") -> dict[str, int]:
+    """Optimize and checkpoint; returns the checkpoint's outcome."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        # (0, -1, -1) when the database is not in WAL mode
+        busy, wal_frames, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({checkpoint})").one()
+    return {"busy": busy, "wal_frames": wal_frames, "checkpointed": checkpointed}
+
+
+class DatabaseMaintenance:
+    def __init__(self, interval: float = DB_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.last_checkpoint: dict[str, int] | None = None
+        self.last_run_at: datetime | None = None
+
+    def run_once(self, engine=None, checkpoint: str = "PASSIVE") -> dict[str, int]:
+        if engine is None:
+            from .database import engine
+        if engine.dialect.name != "sqlite":
+            return {}
+
+        try:
+            result = run_maintenance(engine, checkpoint)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        with self._lock:
+            self.runs += 1
+            self.last_checkpoint = result
+            self.last_run_at = datetime.utcnow()
+        if result["busy"]:
+            logger.info("WAL checkpoint could not finish, readers active: %s", result)
+        return result
+
+    def run_all(self, checkpoint: str = "PASSIVE"):
+        """Run on the main database and, with sharding on, every open shard."""
+        from .database import engine, shard_router
+        for target in [engine] + (shard_router.engines() if shard_router is not None else []):
+            self.run_once(target, checkpoint)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_all)
+            except Exception:
+                logger.exception("Database maintenance failed")
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await asyncio.to_thread(self.run_all, "TRUNCATE")
+        except Exception:
+            logger.exception("Database maintenance failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "failures": self.failures,
+                "last_checkpoint": self.last_checkpoint,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            }
+
+
+db_maintenance = DatabaseMaintenance()
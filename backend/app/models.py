@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -25,7 +25,7 @@ class Category(Base):
     name = Column(String, nullable=False)
     sort_order = Column(Integer, default=0)
     color = Column(String, default="#6b7280")
-    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False, index=True)
 
     household = relationship("Household", back_populates="categories")
     items = relationship("Item", back_populates="category")
@@ -36,8 +36,8 @@ class Item(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
-    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
 
     household = relationship("Household", back_populates="items")
@@ -45,13 +45,18 @@ class Item(Base):
     shopping_list_items = relationship("ShoppingListItem", back_populates="item", cascade="all, delete-orphan")
     recipe_items = relationship("RecipeItem", back_populates="item", cascade="all, delete-orphan")
     session_items = relationship("SessionItem", back_populates="item")
+    stats = relationship("ItemStat", back_populates="item", uselist=False, cascade="all, delete-orphan")
 
 
 class ShoppingListItem(Base):
     __tablename__ = "shopping_list_items"
+    __table_args__ = (
+        # One row per item on a household's list; adds merge into it
+        Index("ix_shopping_list_items_household_item", "household_id", "item_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False, index=True)
     quantity = Column(Float, default=1)
     unit = Column(String, default="x")
     added_at = Column(DateTime, server_default=func.now())
@@ -71,7 +76,7 @@ class Recipe(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     image_url = Column(String, nullable=True)
-    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
 
     household = relationship("Household", back_populates="recipes")
@@ -82,8 +87,8 @@ class RecipeItem(Base):
     __tablename__ = "recipe_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
-    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False, index=True)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False, index=True)
     quantity = Column(Float, default=1)
     unit = Column(String, default="x")
 
@@ -93,6 +98,10 @@ class RecipeItem(Base):
 
 class ShoppingSession(Base):
     __tablename__ = "shopping_sessions"
+    __table_args__ = (
+        # The active session is the one with completed_at NULL
+        Index("ix_shopping_sessions_household_completed", "household_id", "completed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     started_at = Column(DateTime, server_default=func.now())
@@ -105,9 +114,13 @@ class ShoppingSession(Base):
 
 class SessionItem(Base):
     __tablename__ = "session_items"
+    __table_args__ = (
+        # Purchase history per item for the stats
+        Index("ix_session_items_item_checked", "item_id", "checked", "checked_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("shopping_sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("shopping_sessions.id"), nullable=False, index=True)
     item_id = Column(Integer, ForeignKey("items.id", ondelete="SET NULL"), nullable=True)
     item_name = Column(String, nullable=False)
     quantity = Column(Float, default=1)
@@ -117,3 +130,75 @@ class SessionItem(Base):
 
     session = relationship("ShoppingSession", back_populates="session_items")
     item = relationship("Item", back_populates="session_items")
+
+
+class ItemStat(Base):
+    """Purchase statistics per item, maintained alongside the session history."""
+
+    __tablename__ = "item_stats"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    purchase_count = Column(Integer, nullable=False, default=0)
+    last_purchased_at = Column(DateTime, nullable=True)
+    ewma_interval_days = Column(Float, nullable=True)
+
+    item = relationship("Item", back_populates="stats")
+
+
+class ItemPair(Base):
+    """How many completed shopping trips contained both items (item_a < item_b)."""
+
+    __tablename__ = "item_pairs"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    item_a = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    item_b = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ItemNeighbor(Base):
+    """Precomputed top co-purchased items for each item."""
+
+    __tablename__ = "item_neighbors"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    neighbor_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    count = Column(Integer, nullable=False)
+
+
+class ListChange(Base):
+    """Change log of shopping list rows; the id doubles as the list version."""
+
+    __tablename__ = "list_changes"
+    # AUTOINCREMENT so ids are never reused after compaction
+    __table_args__ = (
+        Index("ix_list_changes_household_id", "household_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    household_id = Column(Integer, ForeignKey("households.id"), nullable=False)
+    list_item_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+
+class ListChangeFloor(Base):
+    """Highest list version compacted away; older cursors must resync."""
+
+    __tablename__ = "list_change_floors"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+class SyncClient(Base):
+    """Last list version each client has caught up to."""
+
+    __tablename__ = "sync_clients"
+
+    household_id = Column(Integer, ForeignKey("households.id"), primary_key=True)
+    client_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    seen_at = Column(DateTime, nullable=False)
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+POOL_CACHE_SIZE = int(os.getenv("POOL_CACHE_SIZE", "1024"))
+POOL_CACHE_TTL = float(os.getenv("POOL_CACHE_TTL", "300"))
+
+
+class PoolCache:
+    """LRU + TTL cache of the scored pool per household.
+
+    Every household has a version that mutations bump via `invalidate`.
+    A reader grabs the version before computing the pool and stores the
+    result under it; if a mutation committed in the meantime, the stale
+    result is discarded instead of being cached.
+    """
+
+    def __init__(self, max_entries: int = POOL_CACHE_SIZE, ttl: float = POOL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[int, float, list]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def version(self, household_id: int) -> int:
+        with self._lock:
+            return self._versions.get(household_id, 0)
+
+    def get(self, household_id: int) -> list | None:
+        with self._lock:
+            entry = self._entries.get(household_id)
+            if entry is not None:
+                version, expires_at, value = entry
+                if version == self._versions.get(household_id, 0) and expires_at > time.monotonic():
+                    self._entries.move_to_end(household_id)
+                    self.hits += 1
+                    return value
+                del self._entries[household_id]
+            self.misses += 1
+            return None
+
+    def set(self, household_id: int, version: int, value: list):
+        with self._lock:
+            if version != self._versions.get(household_id, 0):
+                return
+            self._entries[household_id] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(household_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, household_id: int):
+        with self._lock:
+            self._versions[household_id] = self._versions.get(household_id, 0) + 1
+            self._entries.pop(household_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+pool_cache = PoolCache()
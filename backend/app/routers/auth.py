@@ -1,8 +1,10 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import Household
 from ..schemas import HouseholdJoin, HouseholdResponse, Token
 from ..auth import (
@@ -10,33 +12,41 @@ from ..auth import (
     generate_household_token,
     get_current_household,
 )
+from ..auth_cache import CachedHousehold
+from ..writer import WriteQueue, get_writer
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-@router.post("/create", response_model=Token)
-def create_household(db: Session = Depends(get_db)):
-    token = generate_household_token()
+def _create_household(db: Session, token: str) -> int:
+    """Write unit for the writer queue: returns the new household's id."""
     household = Household(token=token)
     db.add(household)
-    db.commit()
-    db.refresh(household)
-    access_token = create_access_token(data={"sub": str(household.id)})
+    db.flush()
+    return household.id
+
+
+@router.post("/create", response_model=Token)
+async def create_household(writer: WriteQueue = Depends(get_writer)):
+    household_id = await writer.run(_create_household, generate_household_token())
+    access_token = create_access_token(data={"sub": str(household_id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/join", response_model=Token)
-def join_household(data: HouseholdJoin, db: Session = Depends(get_db)):
-    household = db.query(Household).filter(Household.token == data.token.upper().strip()).first()
-    if not household:
+async def join_household(data: HouseholdJoin, db: AsyncSession = Depends(get_async_db)):
+    household_id = await db.scalar(
+        select(Household.id).where(Household.token == data.token.upper().strip())
+    )
+    if household_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Household not found"
         )
-    access_token = create_access_token(data={"sub": str(household.id)})
+    access_token = create_access_token(data={"sub": str(household_id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=HouseholdResponse)
-def get_me(current_household: Annotated[Household, Depends(get_current_household)]):
+async def get_me(current_household: Annotated[CachedHousehold, Depends(get_current_household)]):
     return current_household
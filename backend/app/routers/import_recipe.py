@@ -9,8 +9,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from ..auth import get_current_household
+from ..auth_cache import CachedHousehold
 from ..llm import extract_recipe
-from ..models import Household
 
 _uploads_dir = Path(__file__).resolve().parent.parent.parent.parent / "data" / "uploads"
 
@@ -133,7 +133,7 @@ async def _fetch_html(url: str) -> str:
 @router.post("/import", response_model=ImportResponse)
 async def import_recipe(
     req: ImportRequest,
-    household: Household = Depends(get_current_household),
+    household: CachedHousehold = Depends(get_current_household),
 ):
     logger.info("Import request: url=%s, text=%s", req.url, bool(req.text))
 
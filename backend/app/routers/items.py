@@ -1,58 +1,79 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
-from ..database import get_db
-from ..models import Household, Category, Item, ShoppingListItem, RecipeItem, SessionItem, ShoppingSession
+from ..database import get_async_db
+from ..models import Category, Item, ItemStat, ShoppingListItem, Recipe, RecipeItem, SessionItem, ShoppingSession
 from ..schemas import (
     CategoryCreate, CategoryUpdate, CategoryResponse,
     ItemCreate, ItemUpdate, ItemResponse, MergeItemsRequest,
     BulkIdsRequest, BulkSetCategoryRequest
 )
 from ..auth import get_current_household
+from ..auth_cache import CachedHousehold
+from ..stats import rebuild_item_stats
+from ..copurchase import forget_items, rebuild_copurchase
+from ..pool_cache import pool_cache
+from ..changes import delete_list_items, list_delta, record_list_changes, touch_list_items
+from ..versions import ALL, CATEGORIES, ITEM_DATA, ITEMS, SESSIONS, check_etag, versions
 from ..utils import sort_key
 from ..websocket import broadcast_update
+from ..writer import WriteQueue, get_writer
 
 router = APIRouter(prefix="/api", tags=["items"])
 
 
+def _delta(model, rows=(), deleted=()) -> dict:
+    """Broadcast payload carrying changed rows and deleted ids."""
+    return {
+        "upserted": [model.model_validate(row).model_dump(mode="json") for row in rows],
+        "deleted": list(deleted),
+    }
+
+
 @router.get("/categories", response_model=list[CategoryResponse])
-def list_categories(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def list_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    return sorted(
-        db.query(Category).filter(Category.household_id == household.id).all(),
-        key=lambda c: sort_key(c.name)
-    )
+    not_modified = check_etag(request, response, household.id, CATEGORIES)
+    if not_modified:
+        return not_modified
+    categories = await db.scalars(select(Category).where(Category.household_id == household.id))
+    return sorted(categories, key=lambda c: sort_key(c.name))
+
+
+def _create_category(db: Session, household_id: int, category: CategoryCreate) -> CategoryResponse:
+    """Write unit for the writer queue."""
+    db_category = Category(**category.model_dump(), household_id=household_id)
+    db.add(db_category)
+    db.flush()
+    return CategoryResponse.model_validate(db_category)
 
 
 @router.post("/categories", response_model=CategoryResponse)
-def create_category(
+async def create_category(
     category: CategoryCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    db_category = Category(**category.model_dump(), household_id=household.id)
-    db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
-    background_tasks.add_task(broadcast_update, household.id, "categories_updated", {})
-    return db_category
+    household_id = household.id
+    created = await writer.run(_create_category, household_id, category)
+    versions.bump(household_id, CATEGORIES)
+    background_tasks.add_task(broadcast_update, household_id, "categories_updated", _delta(CategoryResponse, [created]))
+    return created
 
 
-@router.put("/categories/{category_id}", response_model=CategoryResponse)
-def update_category(
-    category_id: int,
-    category: CategoryUpdate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
+def _update_category(db: Session, household_id: int, category_id: int, category: CategoryUpdate):
+    """Write unit for the writer queue: returns the response and the list delta."""
     db_category = db.query(Category).filter(
         Category.id == category_id,
-        Category.household_id == household.id
+        Category.household_id == household_id
     ).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -60,83 +81,122 @@ def update_category(
     update_data = category.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_category, key, value)
-
-    db.commit()
-    db.refresh(db_category)
-    background_tasks.add_task(broadcast_update, household.id, "categories_updated", {})
-    return db_category
+    touch_list_items(db, household_id, ShoppingListItem.item.has(Item.category_id == category_id))
+    db.flush()
+    return CategoryResponse.model_validate(db_category), list_delta(db, household_id)
 
 
-@router.delete("/categories/{category_id}")
-def delete_category(
+@router.put("/categories/{category_id}", response_model=CategoryResponse)
+async def update_category(
     category_id: int,
+    category: CategoryUpdate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    updated, delta = await writer.run(_update_category, household_id, category_id, category)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ALL)
+    background_tasks.add_task(broadcast_update, household_id, "categories_updated", _delta(CategoryResponse, [updated]))
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return updated
+
+
+def _delete_category(db: Session, household_id: int, category_id: int) -> dict:
+    """Write unit for the writer queue: returns the list delta."""
     db_category = db.query(Category).filter(
         Category.id == category_id,
-        Category.household_id == household.id
+        Category.household_id == household_id
     ).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
 
+    touch_list_items(db, household_id, ShoppingListItem.item.has(Item.category_id == category_id))
     db.delete(db_category)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "categories_updated", {})
+    db.flush()
+    return list_delta(db, household_id)
+
+
+@router.delete("/categories/{category_id}")
+async def delete_category(
+    category_id: int,
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    delta = await writer.run(_delete_category, household_id, category_id)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ALL)
+    background_tasks.add_task(
+        broadcast_update, household_id, "categories_updated", _delta(CategoryResponse, deleted=[category_id])
+    )
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return {"ok": True}
 
 
 @router.get("/items", response_model=list[ItemResponse])
-def list_items(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def list_items(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    return sorted(
-        db.query(Item).filter(Item.household_id == household.id).all(),
-        key=lambda i: sort_key(i.name)
+    not_modified = check_etag(request, response, household.id, ITEMS)
+    if not_modified:
+        return not_modified
+    items = await db.scalars(
+        select(Item).options(joinedload(Item.category)).where(Item.household_id == household.id)
     )
+    return sorted(items.unique(), key=lambda i: sort_key(i.name))
 
 
-@router.post("/items", response_model=ItemResponse)
-def create_item(
-    item: ItemCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
-    db_item = Item(**item.model_dump(), household_id=household.id)
+def _create_item(db: Session, household_id: int, item: ItemCreate) -> ItemResponse:
+    """Write unit for the writer queue."""
+    db_item = Item(**item.model_dump(), household_id=household_id)
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    db.flush()
 
     # Re-link orphaned session items with matching name to the new item
-    db.query(SessionItem).filter(
+    relinked = db.query(SessionItem).filter(
         SessionItem.item_id == None,
         SessionItem.item_name == db_item.name,
         SessionItem.session_id.in_(
             db.query(ShoppingSession.id).filter(
-                ShoppingSession.household_id == household.id
+                ShoppingSession.household_id == household_id
             )
         )
     ).update({"item_id": db_item.id}, synchronize_session=False)
-    db.commit()
-
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    return db_item
+    if relinked:
+        rebuild_item_stats(db, household_id, [db_item.id])
+        rebuild_copurchase(db, household_id, [db_item.id])
+        db.flush()
+    return ItemResponse.model_validate(db_item)
 
 
-@router.put("/items/{item_id}", response_model=ItemResponse)
-def update_item(
-    item_id: int,
-    item: ItemUpdate,
+@router.post("/items", response_model=ItemResponse)
+async def create_item(
+    item: ItemCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    created = await writer.run(_create_item, household_id, item)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, ITEMS, SESSIONS)
+    background_tasks.add_task(broadcast_update, household_id, "items_updated", _delta(ItemResponse, [created]))
+    return created
+
+
+def _update_item(db: Session, household_id: int, item_id: int, item: ItemUpdate):
+    """Write unit for the writer queue: returns the response and the list delta."""
     db_item = db.query(Item).filter(
         Item.id == item_id,
-        Item.household_id == household.id
+        Item.household_id == household_id
     ).first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -144,113 +204,221 @@ def update_item(
     update_data = item.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_item, key, value)
-
-    db.commit()
+    touch_list_items(db, household_id, ShoppingListItem.item_id == item_id)
+    db.flush()
+    # category_id may have changed under a loaded category
     db.refresh(db_item)
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    return db_item
+    return ItemResponse.model_validate(db_item), list_delta(db, household_id)
 
 
-@router.delete("/items/{item_id}")
-def delete_item(
+@router.put("/items/{item_id}", response_model=ItemResponse)
+async def update_item(
     item_id: int,
+    item: ItemUpdate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    updated, delta = await writer.run(_update_item, household_id, item_id, item)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ITEM_DATA)
+    background_tasks.add_task(broadcast_update, household_id, "items_updated", _delta(ItemResponse, [updated]))
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return updated
+
+
+def _delete_item(db: Session, household_id: int, item_id: int) -> dict:
+    """Write unit for the writer queue: returns the list delta."""
     db_item = db.query(Item).filter(
         Item.id == item_id,
-        Item.household_id == household.id
+        Item.household_id == household_id
     ).first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
 
+    forget_items(db, household_id, [db_item.id])
+    delete_list_items(db, household_id, ShoppingListItem.item_id == item_id)
     db.delete(db_item)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return {"ok": True}
+    db.flush()
+    return list_delta(db, household_id)
 
 
-@router.post("/items/set-category")
-def bulk_set_category(
-    request: BulkSetCategoryRequest,
+@router.delete("/items/{item_id}")
+async def delete_item(
+    item_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    delta = await writer.run(_delete_item, household_id, item_id)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ITEM_DATA)
+    background_tasks.add_task(broadcast_update, household_id, "items_updated", _delta(ItemResponse, deleted=[item_id]))
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return {"ok": True}
+
+
+def _bulk_set_category(db: Session, household_id: int, request: BulkSetCategoryRequest):
+    """Write unit for the writer queue: returns the count, changed items and the list delta."""
     if request.category_id is not None:
         category = db.query(Category).filter(
             Category.id == request.category_id,
-            Category.household_id == household.id
+            Category.household_id == household_id
         ).first()
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
     updated = db.query(Item).filter(
         Item.id.in_(request.item_ids),
-        Item.household_id == household.id
+        Item.household_id == household_id
     ).update({"category_id": request.category_id}, synchronize_session=False)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    return {"ok": True, "updated": updated}
+    touch_list_items(db, household_id, ShoppingListItem.item_id.in_(request.item_ids))
+    db.flush()
+    changed = db.query(Item).options(joinedload(Item.category)).filter(
+        Item.id.in_(request.item_ids),
+        Item.household_id == household_id
+    ).all()
+    return updated, [ItemResponse.model_validate(item) for item in changed], list_delta(db, household_id)
 
 
-@router.post("/items/delete")
-def bulk_delete_items(
-    request: BulkIdsRequest,
+@router.post("/items/set-category")
+async def bulk_set_category(
+    request: BulkSetCategoryRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    # Delete associated shopping list items and recipe items first to avoid orphans
-    db.query(ShoppingListItem).filter(ShoppingListItem.item_id.in_(request.ids)).delete(synchronize_session=False)
-    db.query(RecipeItem).filter(RecipeItem.item_id.in_(request.ids)).delete(synchronize_session=False)
-    db.query(SessionItem).filter(SessionItem.item_id.in_(request.ids)).delete(synchronize_session=False)
+    household_id = household.id
+    updated, changed, delta = await writer.run(_bulk_set_category, household_id, request)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ITEM_DATA)
+    background_tasks.add_task(broadcast_update, household_id, "items_updated", _delta(ItemResponse, changed))
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return {"ok": True, "updated": updated}
+
 
-    deleted = db.query(Item).filter(
-        Item.id.in_(request.ids),
-        Item.household_id == household.id
+def _bulk_delete_items(db: Session, household_id: int, ids: list[int]):
+    """Write unit for the writer queue: returns the deleted ids and the list delta."""
+    # Delete associated shopping list items and recipe items first to avoid orphans
+    delete_list_items(db, household_id, ShoppingListItem.item_id.in_(ids))
+    db.query(RecipeItem).filter(RecipeItem.item_id.in_(ids)).delete(synchronize_session=False)
+    db.query(SessionItem).filter(SessionItem.item_id.in_(ids)).delete(synchronize_session=False)
+    db.query(ItemStat).filter(
+        ItemStat.item_id.in_(ids),
+        ItemStat.household_id == household_id
     ).delete(synchronize_session=False)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return {"ok": True, "deleted": deleted}
+    forget_items(db, household_id, ids)
 
+    deleted = db.execute(
+        delete(Item).where(
+            Item.id.in_(ids),
+            Item.household_id == household_id
+        ).returning(Item.id),
+        execution_options={"synchronize_session": False},
+    ).scalars().all()
+    db.flush()
+    return deleted, list_delta(db, household_id)
 
-@router.post("/items/{target_id}/merge", response_model=ItemResponse)
-def merge_items(
-    target_id: int,
-    request: MergeItemsRequest,
+
+@router.post("/items/delete")
+async def bulk_delete_items(
+    request: BulkIdsRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    deleted, delta = await writer.run(_bulk_delete_items, household_id, request.ids)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ITEM_DATA)
+    background_tasks.add_task(broadcast_update, household_id, "items_updated", _delta(ItemResponse, deleted=deleted))
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return {"ok": True, "deleted": len(deleted)}
+
+
+def _merge_items(db: Session, household_id: int, target_id: int, source_ids: list[int]):
+    """Write unit for the writer queue: returns the merged item and the list delta."""
     target_item = db.query(Item).filter(
         Item.id == target_id,
-        Item.household_id == household.id
+        Item.household_id == household_id
     ).first()
     if not target_item:
         raise HTTPException(status_code=404, detail="Target item not found")
-
-    source_ids = [sid for sid in request.source_ids if sid != target_id]
     if not source_ids:
-        return target_item
+        return ItemResponse.model_validate(target_item), {}
+    sources = db.query(Item.id).filter(
+        Item.id.in_(source_ids),
+        Item.household_id == household_id
+    ).all()
+    if len(sources) != len(source_ids):
+        raise HTTPException(status_code=404, detail="Source item not found")
+    source_ids = [item_id for item_id, in sources]
+
+    # A household lists each item at most once, so fold the sources' list
+    # rows into a single row for the target instead of re-pointing them.
+    list_rows = db.query(ShoppingListItem).filter(
+        ShoppingListItem.household_id == household_id,
+        ShoppingListItem.item_id.in_([target_id, *source_ids])
+    ).order_by(ShoppingListItem.item_id != target_id, ShoppingListItem.id).all()
+    if list_rows:
+        keep, *rest = list_rows
+        for row in rest:
+            if row.unit == keep.unit:
+                keep.quantity += row.quantity
+            db.delete(row)
+        keep.item_id = target_id
+        db.flush()
+        record_list_changes(db, household_id, upserted=[keep.id], deleted=[row.id for row in rest])
+
+    db.query(RecipeItem).filter(
+        RecipeItem.item_id.in_(source_ids),
+        RecipeItem.recipe_id.in_(select(Recipe.id).where(Recipe.household_id == household_id))
+    ).update({"item_id": target_id}, synchronize_session=False)
+    db.query(SessionItem).filter(
+        SessionItem.item_id.in_(source_ids),
+        SessionItem.session_id.in_(select(ShoppingSession.id).where(ShoppingSession.household_id == household_id))
+    ).update({"item_id": target_id}, synchronize_session=False)
+
+    db.query(ItemStat).filter(
+        ItemStat.item_id.in_(source_ids),
+        ItemStat.household_id == household_id
+    ).delete(synchronize_session=False)
+    db.query(Item).filter(
+        Item.id.in_(source_ids),
+        Item.household_id == household_id
+    ).delete(synchronize_session=False)
+    rebuild_item_stats(db, household_id, [target_id])
+    forget_items(db, household_id, source_ids)
+    rebuild_copurchase(db, household_id, [target_id])
+    db.flush()
+    return ItemResponse.model_validate(target_item), list_delta(db, household_id)
 
-    db.query(ShoppingListItem).filter(ShoppingListItem.item_id.in_(source_ids)).update(
-        {"item_id": target_id}, synchronize_session=False
-    )
-    db.query(RecipeItem).filter(RecipeItem.item_id.in_(source_ids)).update(
-        {"item_id": target_id}, synchronize_session=False
-    )
-    db.query(SessionItem).filter(SessionItem.item_id.in_(source_ids)).update(
-        {"item_id": target_id}, synchronize_session=False
-    )
 
-    db.query(Item).filter(Item.id.in_(source_ids)).delete(synchronize_session=False)
+@router.post("/items/{target_id}/merge", response_model=ItemResponse)
+async def merge_items(
+    target_id: int,
+    request: MergeItemsRequest,
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    source_ids = list(dict.fromkeys(sid for sid in request.source_ids if sid != target_id))
+    merged, delta = await writer.run(_merge_items, household_id, target_id, source_ids)
+    if not source_ids:
+        return merged
 
-    db.commit()
-    db.refresh(target_item)
-    background_tasks.add_task(broadcast_update, household.id, "items_updated", {})
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return target_item
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, *ITEM_DATA)
+    background_tasks.add_task(
+        broadcast_update, household_id, "items_updated", _delta(ItemResponse, [merged], deleted=source_ids)
+    )
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return merged
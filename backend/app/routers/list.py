@@ -1,90 +1,194 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
-
-from ..database import get_db
-from ..models import Household, Item, ShoppingListItem, Recipe, RecipeItem, SessionItem, ShoppingSession
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import DateTime, case, func, insert, literal, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import numpy as np
+from datetime import datetime
+
+from ..database import get_async_db
+from ..models import Item, ItemStat, ShoppingListItem, Recipe, RecipeItem, SessionItem, ShoppingSession
 from ..schemas import (
     ShoppingListItemCreate, ShoppingListItemUpdate, ShoppingListItemResponse,
-    AddItemsRequest, BulkIdsRequest, PoolItemResponse, ItemResponse, ShoppingSessionResponse
+    ListChangesResponse, AddItemsRequest, AddPlanRequest, BulkIdsRequest, PoolItemResponse, ItemResponse, ShoppingSessionResponse,
+    SuggestionResponse, BatchRequest, BatchResponse, BatchResult
 )
 from ..auth import get_current_household
+from ..auth_cache import CachedHousehold
 from ..websocket import broadcast_update
+from ..stats import record_purchases
+from ..copurchase import record_basket, suggest
+from ..pool_cache import pool_cache
+from ..changes import changes_since, delete_list_items, list_delta, list_version, record_list_changes, touch_client
+from ..versions import LIST, SESSIONS, check_etag, versions
+from ..writer import WriteQueue, get_writer
+from .. import scoring
+from .sessions import load_session
 
 router = APIRouter(prefix="/api", tags=["list"])
 
+_LIST_ITEM_GRAPH = joinedload(ShoppingListItem.item).joinedload(Item.category)
+
 
 @router.get("/list", response_model=list[ShoppingListItemResponse])
-def get_shopping_list(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def get_shopping_list(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    # Clean up any orphaned shopping list items (item was deleted via bulk operation)
-    db.query(ShoppingListItem).filter(
-        ShoppingListItem.household_id == household.id,
-        ~ShoppingListItem.item_id.in_(
-            db.query(Item.id)
-        )
-    ).delete(synchronize_session=False)
-    db.commit()
+    household_id = household.id
+    not_modified = check_etag(request, response, household_id, LIST)
+    if not_modified:
+        return not_modified
+    # Read before the rows so the version never claims more than they hold
+    version = await db.run_sync(list_version, household_id)
+    response.headers["X-List-Version"] = str(version)
+    return await db.run_sync(_list_rows, household_id)
+
+
+def _list_rows(db: Session, household_id: int, list_item_ids=None) -> list[ShoppingListItem]:
+    # Orphaned rows (item deleted behind the ORM's back) are skipped here
+    # and removed by the janitor
+    rows = db.query(ShoppingListItem).join(
+        ShoppingListItem.item
+    ).options(
+        contains_eager(ShoppingListItem.item).joinedload(Item.category)
+    ).filter(
+        ShoppingListItem.household_id == household_id
+    )
+    if list_item_ids is not None:
+        rows = rows.filter(ShoppingListItem.id.in_(list_item_ids))
+    return rows.all()
+
+
+def _list_changes(db: Session, household_id: int, since: int) -> ListChangesResponse:
+    delta = changes_since(db, household_id, since)
+    if delta is None:
+        version = list_version(db, household_id)
+        return ListChangesResponse(version=version, reset=True, upserted=_list_rows(db, household_id), deleted=[])
+    version, upserted_ids, deleted_ids = delta
+    upserted = _list_rows(db, household_id, upserted_ids) if upserted_ids else []
+    # Rows that vanished without a tombstone (orphans) are gone all the same
+    found = {row.id for row in upserted}
+    deleted_ids += [list_item_id for list_item_id in upserted_ids if list_item_id not in found]
+    return ListChangesResponse(version=version, upserted=upserted, deleted=deleted_ids)
+
+
+@router.get("/list/changes", response_model=ListChangesResponse)
+async def get_list_changes(
+    since: int = Query(..., ge=0),
+    client_id: str | None = Query(None, max_length=64),
+    db: AsyncSession = Depends(get_async_db),
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    """List rows changed and deleted after version `since`.
+
+    If `since` is older than the compacted history, `reset` is set and
+    `upserted` holds the whole list instead. The client's cursor is
+    written through the writer queue.
+    """
+    household_id = household.id
+    result = await db.run_sync(_list_changes, household_id, since)
+    if client_id:
+        await writer.run(touch_client, household_id, client_id, since)
+    return result
+
+
+def _upsert_list_items(db: Session, household_id: int, rows: list[dict]):
+    """Insert list rows, merging into existing ones in the same statement.
+
+    Relies on the unique (household_id, item_id) index: an existing row
+    gets the quantity added when the unit matches and replaced otherwise.
+    Rows flagged with "replace" always overwrite quantity and unit.
+    Touched rows are logged in the change log. Returns their ids.
+    """
+    ids = []
+    merge, replace = [], []
+    for row in rows:
+        row = dict(row, household_id=household_id)
+        (replace if row.pop("replace", False) else merge).append(row)
+
+    for batch, merge_quantity in ((merge, True), (replace, False)):
+        if not batch:
+            continue
+        stmt = sqlite_insert(ShoppingListItem)
+        quantity = stmt.excluded.quantity
+        if merge_quantity:
+            quantity = case(
+                (ShoppingListItem.unit == stmt.excluded.unit, ShoppingListItem.quantity + stmt.excluded.quantity),
+                else_=stmt.excluded.quantity,
+            )
+        set_ = {"quantity": quantity, "unit": stmt.excluded.unit}
+        if "from_recipe_id" in batch[0]:
+            set_["from_recipe_id"] = stmt.excluded.from_recipe_id
+        upserted = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ShoppingListItem.household_id, ShoppingListItem.item_id],
+                set_=set_,
+            ).returning(ShoppingListItem.id),
+            batch,
+        ).scalars().all()
+        record_list_changes(db, household_id, upserted=upserted)
+        ids += upserted
+    return ids
+
+
+def _add_items(db: Session, household_id: int, request: AddItemsRequest):
+    """Write unit for the writer queue: returns the added rows and the delta."""
+    # Collapse repeated items in the request the same way they would merge
+    # into the list one after another, then upsert everything at once.
+    pending: dict[int, dict] = {}
+    for item_data in request.items:
+        row = pending.get(item_data.item_id)
+        if row is None:
+            pending[item_data.item_id] = {
+                "item_id": item_data.item_id,
+                "quantity": item_data.quantity,
+                "unit": item_data.unit,
+            }
+        elif row["unit"] == item_data.unit:
+            row["quantity"] += item_data.quantity
+        else:
+            # A unit change wipes whatever was on the list before
+            row.update(quantity=item_data.quantity, unit=item_data.unit, replace=True)
 
-    return db.query(ShoppingListItem).filter(
-        ShoppingListItem.household_id == household.id
-    ).all()
+    if pending:
+        _upsert_list_items(db, household_id, list(pending.values()))
+
+    rows = {
+        li.item_id: ShoppingListItemResponse.model_validate(li)
+        for li in db.query(ShoppingListItem).options(_LIST_ITEM_GRAPH).filter(
+            ShoppingListItem.household_id == household_id,
+            ShoppingListItem.item_id.in_(pending)
+        )
+    }
+    added = [rows[item_data.item_id] for item_data in request.items if item_data.item_id in rows]
+    return added, list_delta(db, household_id)
 
 
 @router.post("/list/add", response_model=list[ShoppingListItemResponse])
-def add_items_to_list(
+async def add_items_to_list(
     request: AddItemsRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    added_items = []
-    for item_data in request.items:
-        existing = db.query(ShoppingListItem).filter(
-            ShoppingListItem.item_id == item_data.item_id,
-            ShoppingListItem.household_id == household.id
-        ).first()
-
-        if existing:
-            if existing.unit == item_data.unit:
-                existing.quantity += item_data.quantity
-            else:
-                existing.quantity = item_data.quantity
-                existing.unit = item_data.unit
-            db.commit()
-            db.refresh(existing)
-            added_items.append(existing)
-        else:
-            new_item = ShoppingListItem(
-                item_id=item_data.item_id,
-                quantity=item_data.quantity,
-                unit=item_data.unit,
-                household_id=household.id
-            )
-            db.add(new_item)
-            db.commit()
-            db.refresh(new_item)
-            added_items.append(new_item)
-
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return added_items
+    household_id = household.id
+    added, delta = await writer.run(_add_items, household_id, request)
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return added
 
 
-@router.put("/list/{list_item_id}", response_model=ShoppingListItemResponse)
-def update_list_item(
-    list_item_id: int,
-    update: ShoppingListItemUpdate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
-    item = db.query(ShoppingListItem).filter(
+def _update_list_item(db: Session, household_id: int, list_item_id: int, update: ShoppingListItemUpdate):
+    """Write unit for the writer queue: returns the response and the delta."""
+    item = db.query(ShoppingListItem).options(_LIST_ITEM_GRAPH).filter(
         ShoppingListItem.id == list_item_id,
-        ShoppingListItem.household_id == household.id
+        ShoppingListItem.household_id == household_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="List item not found")
@@ -92,138 +196,319 @@ def update_list_item(
     item.quantity = update.quantity
     if update.unit is not None:
         item.unit = update.unit
-    db.commit()
-    db.refresh(item)
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return item
+    record_list_changes(db, household_id, upserted=[list_item_id])
+    db.flush()
+    return ShoppingListItemResponse.model_validate(item), list_delta(db, household_id)
 
 
-@router.delete("/list/{list_item_id}")
-def remove_from_list(
+@router.put("/list/{list_item_id}", response_model=ShoppingListItemResponse)
+async def update_list_item(
     list_item_id: int,
+    update: ShoppingListItemUpdate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    item, delta = await writer.run(_update_list_item, household_id, list_item_id, update)
+    versions.bump(household_id, LIST)
+    background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return item
+
+
+def _remove_from_list(db: Session, household_id: int, list_item_id: int) -> dict:
+    """Write unit for the writer queue: returns the delta."""
     item = db.query(ShoppingListItem).filter(
         ShoppingListItem.id == list_item_id,
-        ShoppingListItem.household_id == household.id
+        ShoppingListItem.household_id == household_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="List item not found")
 
     db.delete(item)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
+    record_list_changes(db, household_id, deleted=[list_item_id])
+    db.flush()
+    return list_delta(db, household_id)
+
+
+@router.delete("/list/{list_item_id}")
+async def remove_from_list(
+    list_item_id: int,
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    delta = await writer.run(_remove_from_list, household_id, list_item_id)
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return {"ok": True}
 
 
+def _remove_list_items(db: Session, household_id: int, ids: list[int] | None):
+    """Write unit for the writer queue: removes the rows (all if `ids` is None)."""
+    criteria = () if ids is None else (ShoppingListItem.id.in_(ids),)
+    deleted = delete_list_items(db, household_id, *criteria)
+    db.flush()
+    return len(deleted), list_delta(db, household_id)
+
+
 @router.post("/list/remove")
-def bulk_remove_from_list(
+async def bulk_remove_from_list(
     request: BulkIdsRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    deleted = db.query(ShoppingListItem).filter(
-        ShoppingListItem.id.in_(request.ids),
-        ShoppingListItem.household_id == household.id
-    ).delete(synchronize_session=False)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
+    household_id = household.id
+    deleted, delta = await writer.run(_remove_list_items, household_id, request.ids)
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return {"ok": True, "deleted": deleted}
 
 
 @router.delete("/list")
-def clear_list(
+async def clear_list(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    deleted = db.query(ShoppingListItem).filter(
-        ShoppingListItem.household_id == household.id
-    ).delete(synchronize_session=False)
-    db.commit()
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
+    household_id = household.id
+    deleted, delta = await writer.run(_remove_list_items, household_id, None)
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return {"ok": True, "deleted": deleted}
 
 
+def _add_recipes(db: Session, household_id: int, plan: list[tuple[int, float]]):
+    """Add the ingredients of several recipes to the list in one go.
+
+    `plan` is a list of (recipe id, servings multiplier). All recipe items
+    are loaded in one query, quantities are summed per (item, unit) and the
+    result is upserted into the list. Raises 404 if a recipe is missing.
+    Write unit for the writer queue: returns the added rows and the delta.
+    """
+    recipe_ids = {recipe_id for recipe_id, _ in plan}
+    found = {
+        recipe_id for (recipe_id,) in db.query(Recipe.id).filter(
+            Recipe.id.in_(recipe_ids),
+            Recipe.household_id == household_id
+        )
+    }
+    if found != recipe_ids:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+
+    ingredients: dict[int, list[tuple[int, float, str]]] = {}
+    for recipe_id, item_id, quantity, unit in db.query(
+        RecipeItem.recipe_id, RecipeItem.item_id, RecipeItem.quantity, RecipeItem.unit
+    ).join(Item, Item.id == RecipeItem.item_id).filter(
+        RecipeItem.recipe_id.in_(recipe_ids)
+    ).order_by(RecipeItem.id):
+        ingredients.setdefault(recipe_id, []).append((item_id, quantity, unit))
+
+    totals: dict[tuple[int, str], dict] = {}
+    for recipe_id, servings in plan:
+        for item_id, quantity, unit in ingredients.get(recipe_id, []):
+            total = totals.setdefault((item_id, unit), {"item_id": item_id, "quantity": 0, "unit": unit})
+            total["quantity"] += quantity * servings
+            total["from_recipe_id"] = recipe_id
+
+    # The list holds one row per item; if recipes ask for the same item in
+    # different units, they merge like consecutive adds (the last unit wins).
+    rows: dict[int, dict] = {}
+    for total in totals.values():
+        if total["item_id"] in rows:
+            total["replace"] = True
+        rows[total["item_id"]] = total
+
+    if rows:
+        _upsert_list_items(db, household_id, list(rows.values()))
+
+    added = db.query(ShoppingListItem).options(_LIST_ITEM_GRAPH).filter(
+        ShoppingListItem.household_id == household_id,
+        ShoppingListItem.item_id.in_(rows)
+    ).all()
+    return [ShoppingListItemResponse.model_validate(li) for li in added], list_delta(db, household_id)
+
+
 @router.post("/list/add-recipe/{recipe_id}", response_model=list[ShoppingListItemResponse])
-def add_recipe_to_list(
+async def add_recipe_to_list(
     recipe_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    recipe = db.query(Recipe).filter(
-        Recipe.id == recipe_id,
-        Recipe.household_id == household.id
-    ).first()
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    added_items = []
-    for recipe_item in recipe.recipe_items:
-        if not recipe_item.item:
-            continue
-        existing = db.query(ShoppingListItem).filter(
-            ShoppingListItem.item_id == recipe_item.item_id,
-            ShoppingListItem.household_id == household.id
-        ).first()
-
-        if existing:
-            existing.quantity += recipe_item.quantity
-            existing.unit = recipe_item.unit
-            existing.from_recipe_id = recipe_id
-            db.commit()
-            db.refresh(existing)
-            added_items.append(existing)
-        else:
-            new_item = ShoppingListItem(
-                item_id=recipe_item.item_id,
-                quantity=recipe_item.quantity,
-                unit=recipe_item.unit,
-                household_id=household.id,
-                from_recipe_id=recipe_id
-            )
-            db.add(new_item)
-            db.commit()
-            db.refresh(new_item)
-            added_items.append(new_item)
-
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
+    household_id = household.id
+    added_items, delta = await writer.run(_add_recipes, household_id, [(recipe_id, 1)])
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return added_items
 
 
-@router.put("/list/{list_item_id}/check")
-def toggle_check(
-    list_item_id: int,
+@router.post("/list/add-plan", response_model=list[ShoppingListItemResponse])
+async def add_plan_to_list(
+    request: AddPlanRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    added_items, delta = await writer.run(
+        _add_recipes, household_id, [(planned.recipe_id, planned.servings) for planned in request.recipes]
+    )
+    versions.bump(household_id, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return added_items
+
+
+def _toggle_check(db: Session, household_id: int, list_item_id: int):
+    """Write unit for the writer queue: returns the new state and the delta."""
     item = db.query(ShoppingListItem).filter(
         ShoppingListItem.id == list_item_id,
-        ShoppingListItem.household_id == household.id
+        ShoppingListItem.household_id == household_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="List item not found")
 
     item.checked = not item.checked
-    db.commit()
-    db.refresh(item)
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
-    return {"checked": item.checked}
+    record_list_changes(db, household_id, upserted=[list_item_id])
+    db.flush()
+    return item.checked, list_delta(db, household_id)
 
 
-@router.post("/list/purchase", response_model=ShoppingSessionResponse)
-def purchase_checked(
+@router.put("/list/{list_item_id}/check")
+async def toggle_check(
+    list_item_id: int,
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    checked, delta = await writer.run(_toggle_check, household_id, list_item_id)
+    versions.bump(household_id, LIST)
+    background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return {"checked": checked}
+
+
+def _log_batch_changes(db: Session, household_id: int, upserted: list[int], deleted: list[int]):
+    """Log the rows changed and removed so far in one insert and reset the lists."""
+    gone = set(deleted)
+    record_list_changes(db, household_id, upserted=[i for i in upserted if i not in gone], deleted=deleted)
+    upserted.clear()
+    deleted.clear()
+
+
+def _apply_batch(db: Session, household_id: int, operations: list) -> tuple[list[BatchResult], dict]:
+    """Write unit for the writer queue: returns the results and the delta."""
+
+    list_item_ids = {op.list_item_id for op in operations if op.op in ("check", "update", "remove")}
+    list_rows = {
+        li.id: li for li in db.query(ShoppingListItem).filter(
+            ShoppingListItem.household_id == household_id,
+            ShoppingListItem.id.in_(list_item_ids)
+        )
+    } if list_item_ids else {}
+    session_item_ids = {op.session_item_id for op in operations if op.op == "session_check"}
+    session_rows = {
+        si.id: si for si in db.query(SessionItem).join(ShoppingSession).filter(
+            ShoppingSession.household_id == household_id,
+            SessionItem.id.in_(session_item_ids)
+        )
+    } if session_item_ids else {}
+    item_ids = {op.item_id for op in operations if op.op == "add"}
+    known_items = {
+        item_id for (item_id,) in db.query(Item.id).filter(
+            Item.household_id == household_id,
+            Item.id.in_(item_ids)
+        )
+    } if item_ids else set()
+
+    upserted: list[int] = []
+    deleted: list[int] = []
+    results = []
+    for op in operations:
+        if op.op in ("check", "update", "remove"):
+            li = list_rows.get(op.list_item_id)
+            if li is None:
+                results.append(BatchResult(status=404, detail="List item not found"))
+                continue
+            if op.op == "check":
+                li.checked = not li.checked if op.checked is None else op.checked
+                data = {"checked": li.checked}
+            elif op.op == "update":
+                li.quantity = op.quantity
+                if op.unit is not None:
+                    li.unit = op.unit
+                data = {"quantity": li.quantity, "unit": li.unit}
+            else:
+                del list_rows[op.list_item_id]
+                db.delete(li)
+                deleted.append(li.id)
+                data = None
+            if op.op != "remove":
+                upserted.append(li.id)
+        elif op.op == "add":
+            if op.item_id not in known_items:
+                results.append(BatchResult(status=404, detail="Item not found"))
+                continue
+            # Earlier operations may touch the same row (SQLite also reuses
+            # the id of a removed row), so write and log them first
+            db.flush()
+            _log_batch_changes(db, household_id, upserted, deleted)
+            (list_item_id,) = _upsert_list_items(
+                db, household_id, [{"item_id": op.item_id, "quantity": op.quantity, "unit": op.unit}]
+            )
+            if list_item_id in list_rows:
+                db.expire(list_rows[list_item_id])
+            data = {"list_item_id": list_item_id}
+        else:
+            si = session_rows.get(op.session_item_id)
+            if si is None:
+                results.append(BatchResult(status=404, detail="Session item not found"))
+                continue
+            si.checked = not si.checked if op.checked is None else op.checked
+            si.checked_at = (si.checked_at or datetime.utcnow()) if si.checked else None
+            data = {"checked": si.checked, "checked_at": si.checked_at.isoformat() if si.checked_at else None}
+        results.append(BatchResult(status=200, data=data))
+
+    _log_batch_changes(db, household_id, upserted, deleted)
+    db.flush()
+    return results, list_delta(db, household_id)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def apply_batch(
+    request: BatchRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    checked_items = db.query(ShoppingListItem).filter(
-        ShoppingListItem.household_id == household.id,
+    """Apply queued mutations in order, in one transaction.
+
+    Meant for replaying the offline queue. Every operation gets its own
+    result; one that can't be applied (say, the row was deleted meanwhile)
+    reports its error status and the rest go on. Rows are loaded up front,
+    everything is committed once and one list delta is broadcast.
+    """
+    household_id = household.id
+    results, delta = await writer.run(_apply_batch, household_id, request.operations)
+    if delta:
+        versions.bump(household_id, LIST)
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return BatchResponse(results=results)
+
+
+def _purchase_checked(db: Session, household_id: int):
+    """Write unit for the writer queue: returns the session and the delta."""
+    checked_items = db.query(ShoppingListItem.id, ShoppingListItem.item_id).join(
+        Item, Item.id == ShoppingListItem.item_id
+    ).filter(
+        ShoppingListItem.household_id == household_id,
         ShoppingListItem.checked == True
     ).all()
 
@@ -231,72 +516,134 @@ def purchase_checked(
         raise HTTPException(status_code=400, detail="No checked items")
 
     now = datetime.utcnow()
-    session = ShoppingSession(household_id=household.id, completed_at=now)
+    session = ShoppingSession(household_id=household_id, completed_at=now)
     db.add(session)
     db.flush()
 
-    for list_item in checked_items:
-        session_item = SessionItem(
-            session_id=session.id,
-            item_id=list_item.item_id,
-            item_name=list_item.item.name,
-            quantity=list_item.quantity,
-            unit=list_item.unit,
-            checked=True,
-            checked_at=now,
-        )
-        db.add(session_item)
+    # Copy the checked rows in one statement, names copied from the items
+    list_item_ids = [list_item_id for list_item_id, _ in checked_items]
+    db.execute(insert(SessionItem).from_select(
+        ["session_id", "item_id", "item_name", "quantity", "unit", "checked", "checked_at"],
+        select(
+            literal(session.id), ShoppingListItem.item_id, Item.name, ShoppingListItem.quantity,
+            ShoppingListItem.unit, literal(True), literal(now, DateTime),
+        ).join(Item, Item.id == ShoppingListItem.item_id).where(
+            ShoppingListItem.id.in_(list_item_ids)
+        ).order_by(ShoppingListItem.id)
+    ))
+
+    purchases: dict[int, tuple[int, datetime]] = {}
+    for _, item_id in checked_items:
+        count = purchases.get(item_id, (0, now))[0]
+        purchases[item_id] = (count + 1, now)
+    record_purchases(db, household_id, purchases)
+    record_basket(db, household_id, purchases)
+
+    delete_list_items(db, household_id, ShoppingListItem.id.in_(list_item_ids))
+
+    session_id = session.id
+    db.flush()
+    return load_session(db, session_id), list_delta(db, household_id)
 
-    db.query(ShoppingListItem).filter(
-        ShoppingListItem.id.in_([i.id for i in checked_items]),
-        ShoppingListItem.household_id == household.id
-    ).delete(synchronize_session=False)
 
-    db.commit()
-    db.refresh(session)
-    background_tasks.add_task(broadcast_update, household.id, "list_updated", {})
+@router.post("/list/purchase", response_model=ShoppingSessionResponse)
+async def purchase_checked(
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    session, delta = await writer.run(_purchase_checked, household_id)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, LIST, SESSIONS)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return session
 
 
 @router.get("/pool", response_model=list[PoolItemResponse])
-def get_pool(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def get_pool(
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    now = datetime.utcnow()
-    thirty_days_ago = now - timedelta(days=30)
-
-    items = db.query(Item).filter(Item.household_id == household.id).all()
-    pool_items = []
-
-    for item in items:
-        frequency = db.query(SessionItem).filter(
-            SessionItem.item_id == item.id,
-            SessionItem.checked == True
-        ).count()
-
-        last_session_item = db.query(SessionItem).filter(
-            SessionItem.item_id == item.id,
-            SessionItem.checked_at != None
-        ).order_by(SessionItem.checked_at.desc()).first()
-
-        last_added = last_session_item.checked_at if last_session_item else None
-
-        recency_score = 0.0
-        if last_added and last_added > thirty_days_ago:
-            days_ago = (now - last_added).days
-            recency_score = max(0, (30 - days_ago) / 30)
-
-        frequency_score = min(frequency / 10, 1.0)
-        score = (recency_score * 0.4) + (frequency_score * 0.6)
-
-        if frequency > 0 or last_added:
-            pool_items.append(PoolItemResponse(
-                item=ItemResponse.model_validate(item),
-                score=score,
-                frequency=frequency,
-                last_added=last_added
-            ))
-
-    pool_items.sort(key=lambda x: x.score, reverse=True)
-    return pool_items[:50]
+    cached = pool_cache.get(household.id)
+    if cached is not None:
+        return cached
+    return await db.run_sync(_compute_pool, household.id)
+
+
+def _compute_pool(db: Session, household_id: int) -> list[PoolItemResponse]:
+    version = pool_cache.version(household_id)
+
+    # Fetch the last purchase time as epoch seconds so scoring never has
+    # to materialise a datetime for items that don't make the cut.
+    stats = db.query(
+        ItemStat.item_id,
+        ItemStat.purchase_count,
+        (func.julianday(ItemStat.last_purchased_at) - 2440587.5) * 86400.0,
+    ).filter(
+        ItemStat.household_id == household_id,
+        or_(ItemStat.purchase_count > 0, ItemStat.last_purchased_at != None),
+    ).all()
+    if not stats:
+        pool_cache.set(household_id, version, [])
+        return []
+
+    item_ids, frequencies, last_purchased = zip(*stats)
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    scores = scoring.score(frequencies, np.asarray(last_purchased, dtype=np.float64), datetime.utcnow())
+    winners = scoring.top_k(scores, scoring.POOL_SIZE)
+
+    winner_ids = [item_ids[i] for i in winners]
+    rows = db.query(Item, ItemStat.last_purchased_at).join(
+        ItemStat, ItemStat.item_id == Item.id
+    ).options(joinedload(Item.category)).filter(
+        ItemStat.household_id == household_id,
+        Item.id.in_(winner_ids),
+    )
+    items = {item.id: (item, last_added) for item, last_added in rows}
+    pool_items = [
+        PoolItemResponse(
+            item=ItemResponse.model_validate(items[item_ids[i]][0]),
+            score=float(scores[i]),
+            frequency=int(frequencies[i]),
+            last_added=items[item_ids[i]][1]
+        )
+        for i in winners
+        if item_ids[i] in items
+    ]
+    pool_cache.set(household_id, version, pool_items)
+    return pool_items
+
+
+@router.get("/list/suggestions", response_model=list[SuggestionResponse])
+async def get_suggestions(
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    return await db.run_sync(_suggestions, household.id, limit)
+
+
+def _suggestions(db: Session, household_id: int, limit: int) -> list[SuggestionResponse]:
+    list_item_ids = [
+        item_id for (item_id,) in db.query(ShoppingListItem.item_id).filter(
+            ShoppingListItem.household_id == household_id
+        )
+    ]
+    suggestions = suggest(db, household_id, list_item_ids, limit)
+    if not suggestions:
+        return []
+
+    items = {
+        item.id: item
+        for item in db.query(Item).options(joinedload(Item.category)).filter(
+            Item.id.in_([item_id for item_id, _ in suggestions]),
+            Item.household_id == household_id
+        )
+    }
+    return [
+        SuggestionResponse(item=ItemResponse.model_validate(items[item_id]), score=score)
+        for item_id, score in suggestions
+        if item_id in items
+    ]
@@ -2,24 +2,33 @@ import uuid
 from pathlib import Path
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from ..database import get_db
-from ..models import Household, Recipe, RecipeItem
+from ..database import get_async_db
+from ..models import Item, Recipe, RecipeItem, ShoppingListItem
 from ..schemas import RecipeCreate, RecipeUpdate, RecipeResponse, RecipeItemBase
 from ..auth import get_current_household
+from ..auth_cache import CachedHousehold
 from ..utils import sort_key
+from ..changes import list_delta, touch_list_items
+from ..versions import LIST, RECIPES, check_etag, versions
+from ..websocket import broadcast_update
+from ..writer import WriteQueue, get_writer
 
 router = APIRouter(prefix="/api/recipes", tags=["recipes"])
 
+_RECIPE_GRAPH = selectinload(Recipe.recipe_items).joinedload(RecipeItem.item).joinedload(Item.category)
+
 _uploads_dir = Path(__file__).resolve().parent.parent.parent.parent / "data" / "uploads"
 
 
 @router.post("/upload-image")
 async def upload_image(
     file: UploadFile,
-    household: Household = Depends(get_current_household),
+    household: CachedHousehold = Depends(get_current_household),
 ):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
@@ -32,52 +41,62 @@ async def upload_image(
     return {"image_url": f"/api/uploads/{filename}"}
 
 
+def _load_recipe(db: Session, recipe_id: int) -> RecipeResponse:
+    recipe = db.query(Recipe).options(_RECIPE_GRAPH).populate_existing().filter(Recipe.id == recipe_id).one()
+    return RecipeResponse.model_validate(recipe)
+
+
 @router.get("", response_model=list[RecipeResponse])
-def list_recipes(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def list_recipes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    return sorted(
-        db.query(Recipe).filter(Recipe.household_id == household.id).all(),
-        key=lambda p: sort_key(p.name)
-    )
+    not_modified = check_etag(request, response, household.id, RECIPES)
+    if not_modified:
+        return not_modified
+    recipes = await db.scalars(select(Recipe).options(_RECIPE_GRAPH).where(Recipe.household_id == household.id))
+    return sorted(recipes, key=lambda p: sort_key(p.name))
 
 
-@router.post("", response_model=RecipeResponse)
-def create_recipe(
-    recipe: RecipeCreate,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
-    db_recipe = Recipe(name=recipe.name, description=recipe.description, image_url=recipe.image_url, household_id=household.id)
+def _create_recipe(db: Session, household_id: int, recipe: RecipeCreate) -> RecipeResponse:
+    """Write unit for the writer queue."""
+    db_recipe = Recipe(name=recipe.name, description=recipe.description, image_url=recipe.image_url, household_id=household_id)
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    db.flush()
+    recipe_id = db_recipe.id
 
     for item in recipe.items:
         recipe_item = RecipeItem(
-            recipe_id=db_recipe.id,
+            recipe_id=recipe_id,
             item_id=item.item_id,
             quantity=item.quantity,
             unit=item.unit,
         )
         db.add(recipe_item)
 
-    db.commit()
-    db.refresh(db_recipe)
-    return db_recipe
+    db.flush()
+    return _load_recipe(db, recipe_id)
 
 
-@router.put("/{recipe_id}", response_model=RecipeResponse)
-def update_recipe(
-    recipe_id: int,
-    recipe: RecipeUpdate,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+@router.post("", response_model=RecipeResponse)
+async def create_recipe(
+    recipe: RecipeCreate,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    created = await writer.run(_create_recipe, household_id, recipe)
+    versions.bump(household_id, RECIPES)
+    return created
+
+
+def _update_recipe(db: Session, household_id: int, recipe_id: int, recipe: RecipeUpdate) -> RecipeResponse:
+    """Write unit for the writer queue."""
     db_recipe = db.query(Recipe).filter(
         Recipe.id == recipe_id,
-        Recipe.household_id == household.id
+        Recipe.household_id == household_id
     ).first()
     if not db_recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
@@ -100,24 +119,53 @@ def update_recipe(
             )
             db.add(recipe_item)
 
-    db.commit()
-    db.refresh(db_recipe)
-    return db_recipe
+    db.flush()
+    return _load_recipe(db, recipe_id)
 
 
-@router.delete("/{recipe_id}")
-def delete_recipe(
+@router.put("/{recipe_id}", response_model=RecipeResponse)
+async def update_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+    recipe: RecipeUpdate,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    updated = await writer.run(_update_recipe, household_id, recipe_id, recipe)
+    versions.bump(household_id, RECIPES)
+    return updated
+
+
+def _delete_recipe(db: Session, household_id: int, recipe_id: int) -> dict:
+    """Write unit for the writer queue: returns the list delta."""
     db_recipe = db.query(Recipe).filter(
         Recipe.id == recipe_id,
-        Recipe.household_id == household.id
+        Recipe.household_id == household_id
     ).first()
     if not db_recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
+    # List rows added from the recipe stay, without the reference
+    touch_list_items(db, household_id, ShoppingListItem.from_recipe_id == recipe_id)
+    db.query(ShoppingListItem).filter(
+        ShoppingListItem.household_id == household_id,
+        ShoppingListItem.from_recipe_id == recipe_id
+    ).update({ShoppingListItem.from_recipe_id: None}, synchronize_session=False)
     db.delete(db_recipe)
-    db.commit()
+    db.flush()
+    return list_delta(db, household_id)
+
+
+@router.delete("/{recipe_id}")
+async def delete_recipe(
+    recipe_id: int,
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    delta = await writer.run(_delete_recipe, household_id, recipe_id)
+    versions.bump(household_id, RECIPES, LIST)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
     return {"ok": True}
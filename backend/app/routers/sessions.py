@@ -1,74 +1,91 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from ..database import get_db
-from ..models import Household, ShoppingSession, SessionItem, ShoppingListItem
+from ..database import get_async_db
+from ..models import Item, ShoppingSession, SessionItem, ShoppingListItem
 from ..schemas import ShoppingSessionResponse, SessionItemResponse
 from ..auth import get_current_household
+from ..auth_cache import CachedHousehold
+from ..stats import record_purchases, rebuild_item_stats
+from ..copurchase import record_basket
+from ..pool_cache import pool_cache
+from ..changes import delete_list_items, list_delta
+from ..websocket import broadcast_update
+from ..versions import LIST, SESSIONS, check_etag, versions
+from ..writer import WriteQueue, get_writer
 
 router = APIRouter(prefix="/api", tags=["sessions"])
 
+_SESSION_GRAPH = selectinload(ShoppingSession.session_items).joinedload(SessionItem.item).joinedload(Item.category)
 
-@router.post("/session/start", response_model=ShoppingSessionResponse)
-def start_session(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
-    active = db.query(ShoppingSession).filter(
-        ShoppingSession.household_id == household.id,
+
+def load_session(db: Session, session_id: int) -> ShoppingSessionResponse:
+    session = db.query(ShoppingSession).options(_SESSION_GRAPH).populate_existing().filter(
+        ShoppingSession.id == session_id
+    ).one()
+    return ShoppingSessionResponse.model_validate(session)
+
+
+def _start_session(db: Session, household_id: int) -> ShoppingSessionResponse:
+    """Write unit for the writer queue."""
+    active = db.query(ShoppingSession).options(_SESSION_GRAPH).filter(
+        ShoppingSession.household_id == household_id,
         ShoppingSession.completed_at == None,
     ).first()
     if active:
-        return active
+        return ShoppingSessionResponse.model_validate(active)
 
-    session = ShoppingSession(household_id=household.id)
+    session = ShoppingSession(household_id=household_id)
     db.add(session)
     db.flush()
+    session_id = session.id
+
+    # Snapshot the list in one statement, names copied from the items
+    db.execute(insert(SessionItem).from_select(
+        ["session_id", "item_id", "item_name", "quantity", "unit"],
+        select(
+            literal(session_id), ShoppingListItem.item_id, Item.name, ShoppingListItem.quantity, ShoppingListItem.unit
+        ).join(Item, Item.id == ShoppingListItem.item_id).where(
+            ShoppingListItem.household_id == household_id
+        ).order_by(ShoppingListItem.id)
+    ))
 
-    list_items = db.query(ShoppingListItem).filter(
-        ShoppingListItem.household_id == household.id
-    ).all()
-    for li in list_items:
-        si = SessionItem(
-            session_id=session.id,
-            item_id=li.item_id,
-            item_name=li.item.name,
-            quantity=li.quantity,
-            unit=li.unit,
-        )
-        db.add(si)
-
-    db.commit()
-    db.refresh(session)
-    return session
+    db.flush()
+    return load_session(db, session_id)
+
+
+@router.post("/session/start", response_model=ShoppingSessionResponse)
+async def start_session(
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    return await writer.run(_start_session, household.id)
 
 
 @router.get("/session/active")
-def get_active_session(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def get_active_session(
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    active = db.query(ShoppingSession).filter(
+    active = await db.scalar(select(ShoppingSession).options(_SESSION_GRAPH).where(
         ShoppingSession.household_id == household.id,
         ShoppingSession.completed_at == None,
-    ).first()
+    ).limit(1))
     if active is None:
         return JSONResponse(content=None)
     return ShoppingSessionResponse.model_validate(active).model_dump(mode="json")
 
 
-@router.put("/session/check/{session_item_id}")
-def toggle_session_check(
-    session_item_id: int,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
-):
+def _toggle_session_check(db: Session, household_id: int, session_item_id: int) -> dict:
+    """Write unit for the writer queue."""
     si = db.query(SessionItem).join(ShoppingSession).filter(
         SessionItem.id == session_item_id,
-        ShoppingSession.household_id == household.id,
+        ShoppingSession.household_id == household_id,
     ).first()
     if not si:
         raise HTTPException(status_code=404, detail="Session item not found")
@@ -79,48 +96,70 @@ def toggle_session_check(
     else:
         si.checked = True
         si.checked_at = datetime.utcnow()
-
-    db.commit()
-    db.refresh(si)
     return {"checked": si.checked, "checked_at": si.checked_at.isoformat() if si.checked_at else None}
 
 
-@router.post("/session/complete", response_model=ShoppingSessionResponse)
-def complete_session(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+@router.put("/session/check/{session_item_id}")
+async def toggle_session_check(
+    session_item_id: int,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    return await writer.run(_toggle_session_check, household.id, session_item_id)
+
+
+def _complete_session(db: Session, household_id: int):
+    """Write unit for the writer queue: returns the session and the list delta."""
     active = db.query(ShoppingSession).filter(
-        ShoppingSession.household_id == household.id,
+        ShoppingSession.household_id == household_id,
         ShoppingSession.completed_at == None,
     ).first()
     if not active:
         raise HTTPException(status_code=404, detail="No active session")
 
+    active_id = active.id
     active.completed_at = datetime.utcnow()
 
     checked_item_ids = [
         si.item_id for si in active.session_items
         if si.checked and si.item_id is not None
     ]
+
+    purchases: dict[int, tuple[int, datetime]] = {}
+    for si in active.session_items:
+        if not si.checked or si.item_id is None:
+            continue
+        checked_at = si.checked_at or active.completed_at
+        count, last = purchases.get(si.item_id, (0, checked_at))
+        purchases[si.item_id] = (count + 1, max(last, checked_at))
+    record_purchases(db, household_id, purchases)
+    record_basket(db, household_id, purchases)
     if checked_item_ids:
-        db.query(ShoppingListItem).filter(
-            ShoppingListItem.item_id.in_(checked_item_ids),
-            ShoppingListItem.household_id == household.id,
-        ).delete(synchronize_session=False)
+        delete_list_items(db, household_id, ShoppingListItem.item_id.in_(checked_item_ids))
 
-    db.commit()
-    db.refresh(active)
-    return active
+    db.flush()
+    return load_session(db, active_id), list_delta(db, household_id)
 
 
-@router.delete("/session/active")
-def abort_session(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+@router.post("/session/complete", response_model=ShoppingSessionResponse)
+async def complete_session(
+    background_tasks: BackgroundTasks,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    household_id = household.id
+    session, delta = await writer.run(_complete_session, household_id)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, LIST, SESSIONS)
+    if delta:
+        background_tasks.add_task(broadcast_update, household_id, "list_updated", delta)
+    return session
+
+
+def _abort_session(db: Session, household_id: int):
+    """Write unit for the writer queue."""
     active = db.query(ShoppingSession).filter(
-        ShoppingSession.household_id == household.id,
+        ShoppingSession.household_id == household_id,
         ShoppingSession.completed_at == None,
     ).first()
     if not active:
@@ -128,35 +167,64 @@ def abort_session(
 
     db.query(SessionItem).filter(SessionItem.session_id == active.id).delete()
     db.delete(active)
-    db.commit()
-    return {"ok": True}
 
 
-@router.delete("/sessions/{session_id}")
-def delete_session(
-    session_id: int,
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+@router.delete("/session/active")
+async def abort_session(
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
 ):
+    await writer.run(_abort_session, household.id)
+    return {"ok": True}
+
+
+def _delete_session(db: Session, household_id: int, session_id: int):
+    """Write unit for the writer queue."""
     session = db.query(ShoppingSession).filter(
         ShoppingSession.id == session_id,
-        ShoppingSession.household_id == household.id
+        ShoppingSession.household_id == household_id
     ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    rows = db.query(SessionItem.item_id, SessionItem.checked).filter(
+        SessionItem.session_id == session.id,
+        SessionItem.item_id != None,
+    ).all()
+    item_ids = {item_id for item_id, _ in rows}
+    if session.completed_at is not None:
+        record_basket(db, household_id, [item_id for item_id, checked in rows if checked], sign=-1)
     db.query(SessionItem).filter(SessionItem.session_id == session.id).delete()
     db.delete(session)
-    db.commit()
+    db.flush()
+    rebuild_item_stats(db, household_id, item_ids)
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: int,
+    writer: WriteQueue = Depends(get_writer),
+    household: CachedHousehold = Depends(get_current_household)
+):
+    household_id = household.id
+    await writer.run(_delete_session, household_id, session_id)
+    pool_cache.invalidate(household_id)
+    versions.bump(household_id, SESSIONS)
     return {"ok": True}
 
 
 @router.get("/sessions", response_model=list[ShoppingSessionResponse])
-def list_sessions(
-    db: Session = Depends(get_db),
-    household: Household = Depends(get_current_household)
+async def list_sessions(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    household: CachedHousehold = Depends(get_current_household)
 ):
-    return db.query(ShoppingSession).filter(
+    not_modified = check_etag(request, response, household.id, SESSIONS)
+    if not_modified:
+        return not_modified
+    sessions = await db.scalars(select(ShoppingSession).options(_SESSION_GRAPH).where(
         ShoppingSession.completed_at != None,
         ShoppingSession.household_id == household.id
-    ).order_by(ShoppingSession.completed_at.desc()).all()
+    ).order_by(ShoppingSession.completed_at.desc()))
+    return sessions.all()
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 
 
 class Token(BaseModel):
@@ -101,6 +101,13 @@ class ShoppingListItemResponse(BaseModel):
         from_attributes = True
 
 
+class ListChangesResponse(BaseModel):
+    version: int
+    reset: bool = False
+    upserted: list[ShoppingListItemResponse]
+    deleted: list[int]
+
+
 class RecipeItemBase(BaseModel):
     item_id: int
     quantity: float = 1
@@ -178,10 +185,24 @@ class PoolItemResponse(BaseModel):
         from_attributes = True
 
 
+class SuggestionResponse(BaseModel):
+    item: ItemResponse
+    score: int
+
+
 class AddItemsRequest(BaseModel):
     items: list[ShoppingListItemCreate]
 
 
+class PlannedRecipe(BaseModel):
+    recipe_id: int
+    servings: float = Field(1, gt=0)
+
+
+class AddPlanRequest(BaseModel):
+    recipes: list[PlannedRecipe]
+
+
 class MergeItemsRequest(BaseModel):
     source_ids: list[int]
 
@@ -195,6 +216,58 @@ class BulkSetCategoryRequest(BaseModel):
     category_id: int | None = None
 
 
+class BatchCheck(BaseModel):
+    op: Literal["check"]
+    list_item_id: int
+    # None toggles, like PUT /list/{id}/check
+    checked: bool | None = None
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    list_item_id: int
+    quantity: float
+    unit: str | None = None
+
+
+class BatchAdd(BaseModel):
+    op: Literal["add"]
+    item_id: int
+    quantity: float = 1
+    unit: str = "x"
+
+
+class BatchRemove(BaseModel):
+    op: Literal["remove"]
+    list_item_id: int
+
+
+class BatchSessionCheck(BaseModel):
+    op: Literal["session_check"]
+    session_item_id: int
+    checked: bool | None = None
+
+
+BatchOperation = Annotated[
+    Union[BatchCheck, BatchUpdate, BatchAdd, BatchRemove, BatchSessionCheck],
+    Field(discriminator="op"),
+]
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(max_length=500)
+
+
+class BatchResult(BaseModel):
+    status: int
+    detail: str | None = None
+    data: dict | None = None
+
+
+class BatchResponse(BaseModel):
+    results: list[BatchResult]
+
+
 class WSMessage(BaseModel):
     type: str
     data: dict
@@ -0,0 +1,61 @@
+"""Vectorized recency/frequency scoring for the item pool.
+
+An item's score is a weighted sum of
+  - recency:   1 for something bought today, decaying linearly (per whole
+               day) to 0 at the end of the window, and
+  - frequency: purchase count divided by `frequency_cap`, capped at 1.
+"""
+from datetime import datetime
+
+import numpy as np
+
+RECENCY_WEIGHT = 0.4
+FREQUENCY_WEIGHT = 0.6
+RECENCY_WINDOW_DAYS = 30
+FREQUENCY_CAP = 10
+POOL_SIZE = 50
+
+_SECONDS_PER_DAY = 86400.0
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamps(values) -> np.ndarray:
+    """Convert naive UTC datetimes (or None) to float seconds, NaN for None."""
+    return np.fromiter(
+        ((v - _EPOCH).total_seconds() if v is not None else np.nan for v in values),
+        dtype=np.float64,
+    )
+
+
+def score(
+    frequency: np.ndarray,
+    last_purchased: np.ndarray,
+    now: datetime,
+    recency_weight: float = RECENCY_WEIGHT,
+    frequency_weight: float = FREQUENCY_WEIGHT,
+    window_days: float = RECENCY_WINDOW_DAYS,
+    frequency_cap: float = FREQUENCY_CAP,
+) -> np.ndarray:
+    """Score items given purchase counts and last purchase timestamps.
+
+    `last_purchased` holds seconds since the epoch, NaN if never bought.
+    """
+    now_ts = (now - _EPOCH).total_seconds()
+    age = now_ts - last_purchased
+    days_ago = np.floor(age / _SECONDS_PER_DAY)
+    with np.errstate(invalid="ignore"):
+        in_window = age < window_days * _SECONDS_PER_DAY
+    recency = np.where(in_window, np.clip((window_days - days_ago) / window_days, 0.0, None), 0.0)
+    frequency_score = np.minimum(frequency / frequency_cap, 1.0)
+    return recency * recency_weight + frequency_score * frequency_weight
+
+
+def top_k(scores: np.ndarray, k: int = POOL_SIZE) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if scores.size > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
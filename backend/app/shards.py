@@ -0,0 +1,241 @@
+"""Optional per-household SQLite shards.
+
+With DATABASE_SHARDS_DIR set, each household's data lives in its own
+SQLite file, `household-<id>.db` in that directory, so a heavy import or
+purge in one household never holds the write lock for the others. The
+main database (DATABASE_URL) stays the catalog: it is the only place
+households and their tokens are looked up.
+
+`get_current_household` records the household in `current_household_id`;
+sessions created from `SessionLocal`/`AsyncSessionLocal` then send every
+statement except those on catalog tables to that household's shard. A
+shard is opened on first use: its schema is migrated to head and the
+household's catalog row is copied in as the target of the foreign keys.
+Open shards are kept in an LRU of at most SHARD_CACHE_SIZE engines, the
+least recently used one is disposed when another is needed.
+
+Existing single-file databases are split with
+
+    python -m app.shards <source database url> <shards directory>
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+DATABASE_SHARDS_DIR = os.getenv("DATABASE_SHARDS_DIR", "")
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "32"))
+
+# Tables that stay in the catalog database when sharding is on
+CATALOG_TABLES = {"households"}
+# Tables without a household_id column and the foreign key of the
+# household-scoped row they belong to
+CHILD_TABLE_PARENTS = {"session_items": "session_id", "recipe_items": "recipe_id"}
+
+current_household_id: ContextVar[int | None] = ContextVar("current_household_id", default=None)
+
+_SHARD_FILE = re.compile(r"household-(\d+)\.db$")
+
+
+def migrate(url: str):
+    """Upgrade the database at `url` to the latest Alembic revision."""
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+    alembic_cfg.attributes["sqlalchemy.url"] = url
+    alembic_cfg.attributes["configure_logger"] = False
+    command.upgrade(alembic_cfg, "head")
+
+
+class Shard(NamedTuple):
+    engine: object
+    async_engine: AsyncEngine
+
+
+class ShardRouter:
+    def __init__(self, directory: str, cache_size: int = SHARD_CACHE_SIZE, catalog_engine=None):
+        self.directory = Path(directory)
+        self.cache_size = cache_size
+        self.catalog_engine = catalog_engine
+        self._shards: OrderedDict[int, Shard] = OrderedDict()
+        self._migrated: set[int] = set()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def url(self, household_id: int) -> str:
+        return f"sqlite:///{self.directory / f'household-{household_id}.db'}"
+
+    def household_ids(self) -> list[int]:
+        """Households that have a shard file, opened or not."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            int(match.group(1))
+            for match in map(_SHARD_FILE.match, os.listdir(self.directory))
+            if match
+        )
+
+    def engines(self) -> list:
+        """Sync engines of the shards currently open."""
+        with self._lock:
+            return [shard.engine for shard in self._shards.values()]
+
+    def is_open(self, household_id: int) -> bool:
+        with self._lock:
+            return household_id in self._shards
+
+    def shard(self, household_id: int) -> Shard:
+        """The household's shard, opening (and migrating) it if needed."""
+        with self._lock:
+            shard = self._shards.get(household_id)
+            if shard is not None:
+                self._shards.move_to_end(household_id)
+                self.hits += 1
+                return shard
+
+        # Opening can migrate, which must not run twice for one file
+        with self._open_lock:
+            with self._lock:
+                shard = self._shards.get(household_id)
+            if shard is None:
+                shard = self._open(household_id)
+                evicted = []
+                with self._lock:
+                    self.misses += 1
+                    self._shards[household_id] = shard
+                    while len(self._shards) > self.cache_size:
+                        evicted.append(self._shards.popitem(last=False)[1])
+                        self.evictions += 1
+                for old in evicted:
+                    old.engine.dispose()
+        return shard
+
+    async def open(self, household_id: int) -> Shard:
+        """`shard` for the event loop: opening a shard blocks, so it runs in a thread."""
+        if self.is_open(household_id):
+            return self.shard(household_id)
+        return await asyncio.to_thread(self.shard, household_id)
+
+    def _open(self, household_id: int) -> Shard:
+        from .database import apply_sqlite_pragmas, sqlite_pragmas
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        url = self.url(household_id)
+        if household_id not in self._migrated:
+            migrate(url)
+            self._migrated.add(household_id)
+
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        apply_sqlite_pragmas(engine, sqlite_pragmas())
+        # Pooled aiosqlite connections can only be closed from the event
+        # loop, so shards open one per session and eviction stays synchronous
+        async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1), poolclass=NullPool)
+        apply_sqlite_pragmas(async_engine.sync_engine, sqlite_pragmas())
+
+        if self.catalog_engine is not None:
+            with self.catalog_engine.connect() as catalog:
+                rows = catalog.execute(
+                    text("SELECT * FROM households WHERE id = :id"), {"id": household_id}
+                ).mappings().all()
+            if rows:
+                columns = ", ".join(rows[0].keys())
+                values = ", ".join(f":{column}" for column in rows[0].keys())
+                with engine.begin() as conn:
+                    conn.execute(text(f"INSERT OR IGNORE INTO households ({columns}) VALUES ({values})"), dict(rows[0]))
+        return Shard(engine, async_engine)
+
+    def close(self):
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), OrderedDict()
+        for shard in shards:
+            shard.engine.dispose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._shards),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def split_database(source_url: str, directory: str) -> dict[int, int]:
+    """Copy every household's rows from a single database into its shard.
+
+    The source is left untouched and stays usable as the catalog. Returns
+    the number of rows copied per household. Shards that already exist are
+    migrated but not emptied, so run this against an empty directory.
+    """
+    from .database import Base
+    from . import models  # noqa: F401 - registers the tables on Base
+
+    source = create_engine(source_url)
+    source_path = source.url.database
+    router = ShardRouter(directory, cache_size=1, catalog_engine=source)
+
+    copied: dict[int, int] = {}
+    with source.connect() as conn:
+        household_ids = conn.execute(text("SELECT id FROM households ORDER BY id")).scalars().all()
+
+    for household_id in household_ids:
+        engine = router.shard(household_id).engine
+        count = 0
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS source", (source_path,))
+            for table in Base.metadata.sorted_tables:
+                if table.name in CATALOG_TABLES:
+                    continue
+                if "household_id" in table.c:
+                    condition = "household_id = :household_id"
+                else:
+                    # Child rows follow their parent, never an optional
+                    # reference such as session_items.item_id
+                    if table.name not in CHILD_TABLE_PARENTS:
+                        raise RuntimeError(f"Don't know which household {table.name} rows belong to")
+                    (fk,) = table.c[CHILD_TABLE_PARENTS[table.name]].foreign_keys
+                    condition = (
+                        f"{fk.parent.name} IN (SELECT {fk.column.name} FROM source.{fk.column.table.name} "
+                        "WHERE household_id = :household_id)"
+                    )
+                columns = ", ".join(column.name for column in table.c)
+                count += conn.execute(text(
+                    f"INSERT INTO main.{table.name} ({columns}) "
+                    f"SELECT {columns} FROM source.{table.name} WHERE {condition}"
+                ), {"household_id": household_id}).rowcount
+            conn.commit()
+            conn.exec_driver_sql("DETACH DATABASE source")
+            conn.commit()
+        copied[household_id] = count
+        logger.info("Household %d: copied %d rows", household_id, count)
+
+    router.close()
+    source.dispose()
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a single Nákupák database into per-household shards.")
+    parser.add_argument("source", help="SQLAlchemy URL of the existing database, e.g. sqlite:///./data/nakupak.db")
+    parser.add_argument("directory", help="Directory for the shards (DATABASE_SHARDS_DIR)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for household_id, rows in split_database(args.source, args.directory).items():
+        print(f"household {household_id}: {rows} rows")
@@ -0,0 +1,143 @@
+"""Incrementally maintained per-item purchase statistics.
+
+`item_stats` holds, per household and item, how many times the item was
+bought, when it was last bought and an exponentially weighted moving
+average of the interval between purchases. The routers update it in the
+same transaction as the session history it summarises, so the pool can
+be read without scanning `session_items`.
+
+Rebuild from history with:
+
+    python -m app.stats [household_id ...]
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import Item, ItemStat, SessionItem, ShoppingSession
+
+# Weight of the newest interval in the moving average.
+EWMA_ALPHA = 0.3
+
+
+def _update_ewma(ewma: float | None, last: datetime | None, purchased_at: datetime) -> float | None:
+    if last is None or purchased_at <= last:
+        return ewma
+    interval = (purchased_at - last).total_seconds() / 86400
+    if ewma is None:
+        return interval
+    return EWMA_ALPHA * interval + (1 - EWMA_ALPHA) * ewma
+
+
+def record_purchases(db: Session, household_id: int, purchases: dict[int, tuple[int, datetime]]):
+    """Fold one completed shopping trip into the stats.
+
+    `purchases` maps item id to (number of checked rows, latest checked_at).
+    """
+    if not purchases:
+        return
+
+    existing = {
+        stat.item_id: stat
+        for stat in db.query(ItemStat).filter(
+            ItemStat.household_id == household_id,
+            ItemStat.item_id.in_(purchases),
+        )
+    }
+
+    for item_id, (count, purchased_at) in purchases.items():
+        stat = existing.get(item_id)
+        if stat is None:
+            db.add(ItemStat(
+                household_id=household_id,
+                item_id=item_id,
+                purchase_count=count,
+                last_purchased_at=purchased_at,
+            ))
+            continue
+
+        stat.ewma_interval_days = _update_ewma(stat.ewma_interval_days, stat.last_purchased_at, purchased_at)
+        stat.purchase_count += count
+        if stat.last_purchased_at is None or purchased_at > stat.last_purchased_at:
+            stat.last_purchased_at = purchased_at
+
+
+def rebuild_item_stats(db: Session, household_id: int | None = None, item_ids=None) -> int:
+    """Recompute stats from the session history.
+
+    Scoped to one household and/or a set of items when given, otherwise
+    rebuilds everything. Returns the number of stats rows written.
+    """
+    if item_ids is not None:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+
+    delete = db.query(ItemStat)
+    if household_id is not None:
+        delete = delete.filter(ItemStat.household_id == household_id)
+    if item_ids is not None:
+        delete = delete.filter(ItemStat.item_id.in_(item_ids))
+    delete.delete(synchronize_session=False)
+
+    # One row per (item, session): a trip counts once for the interval
+    # average, but every checked row counts towards the purchase count.
+    history = db.query(
+        Item.household_id,
+        SessionItem.item_id,
+        func.count(SessionItem.id),
+        func.max(SessionItem.checked_at),
+    ).join(Item, Item.id == SessionItem.item_id).join(
+        ShoppingSession, ShoppingSession.id == SessionItem.session_id
+    ).filter(
+        SessionItem.checked == True,
+        ShoppingSession.completed_at != None,
+    )
+    if household_id is not None:
+        history = history.filter(Item.household_id == household_id)
+    if item_ids is not None:
+        history = history.filter(SessionItem.item_id.in_(item_ids))
+    history = history.group_by(
+        SessionItem.item_id, SessionItem.session_id
+    ).order_by(SessionItem.item_id, func.max(SessionItem.checked_at))
+
+    stats: dict[int, ItemStat] = {}
+    for row_household_id, item_id, count, checked_at in history:
+        stat = stats.get(item_id)
+        if stat is None:
+            stats[item_id] = ItemStat(
+                household_id=row_household_id,
+                item_id=item_id,
+                purchase_count=count,
+                last_purchased_at=checked_at,
+            )
+            continue
+        if checked_at is not None:
+            stat.ewma_interval_days = _update_ewma(stat.ewma_interval_days, stat.last_purchased_at, checked_at)
+            if stat.last_purchased_at is None or checked_at > stat.last_purchased_at:
+                stat.last_purchased_at = checked_at
+        stat.purchase_count += count
+
+    db.add_all(stats.values())
+    return len(stats)
+
+
+def main(argv: list[str]):
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if argv:
+            written = sum(rebuild_item_stats(db, int(hid)) for hid in argv)
+        else:
+            written = rebuild_item_stats(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {written} item stats rows")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
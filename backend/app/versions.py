@@ -0,0 +1,83 @@
+"""Per-household data versions used as ETags on read endpoints.
+
+Every mutation bumps the version of the collections it changed, after
+its commit. Read endpoints read the version *before* querying, send it
+as a weak ETag and answer If-None-Match hits with 304 without touching
+the database for the payload. Reading the version first means a response
+can only ever be labelled older than its data, never newer, so a client
+never keeps a stale copy.
+
+Versions live in memory (like the WebSocket connections). The ETag
+includes a per-process epoch, so tags from before a restart never match.
+Every bump is passed to `listeners`, which is how other worker processes
+learn that their versions are stale.
+
+ETags are therefore only reliable per worker. Each worker has its own
+epoch and counters, so a client whose requests land on different workers
+rarely gets a 304. A worker also learns about another worker's writes
+only when the bus message arrives (within the poll interval for the
+SQLite bus); until then it may still answer 304 for changed data. With
+several workers, route each client to one worker if revalidation matters.
+"""
+import threading
+import uuid
+from typing import Callable
+
+from fastapi import Request, Response
+
+LIST = "list"
+ITEMS = "items"
+CATEGORIES = "categories"
+RECIPES = "recipes"
+SESSIONS = "sessions"
+
+# Collections whose responses embed item (and category) data
+ITEM_DATA = (LIST, ITEMS, RECIPES, SESSIONS)
+ALL = ITEM_DATA + (CATEGORIES,)
+
+
+class DataVersions:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: dict[tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+        # Called with the household id after each bump, from any thread
+        self.listeners: list[Callable[[int], None]] = []
+
+    def get(self, household_id: int, collection: str) -> int:
+        with self._lock:
+            return self._versions.get((household_id, collection), 0)
+
+    def bump(self, household_id: int, *collections: str, notify: bool = True):
+        with self._lock:
+            for collection in collections:
+                key = (household_id, collection)
+                self._versions[key] = self._versions.get(key, 0) + 1
+        if notify:
+            for listener in self.listeners:
+                listener(household_id)
+
+    def etag(self, household_id: int, collection: str) -> str:
+        return f'W/"{self.epoch}-{self.get(household_id, collection)}"'
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+versions = DataVersions()
+
+
+def check_etag(request: Request, response: Response, household_id: int, collection: str) -> Response | None:
+    """Tag the response with the collection's version.
+
+    Returns a ready 304 response if the client already has this version,
+    otherwise None and the caller goes on to build the payload.
+    """
+    etag = versions.etag(household_id, collection)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
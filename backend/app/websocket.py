@@ -1,35 +1,273 @@
+"""Household WebSocket connections and update broadcasts.
+
+Updates are not sent right away but buffered per household for
+WS_COALESCE_MS milliseconds (default 50, 0 sends immediately). Updates of
+the same type that arrive within the window are merged into one message,
+so a burst of mutations reaches every socket as a single message per type.
+
+Each socket has its own outbox of at most WS_QUEUE_SIZE messages (default
+32), drained by a writer task, so broadcasting never waits for a client.
+A socket that fails or does not take a message within WS_SEND_TIMEOUT
+seconds (default 5) is closed and dropped. When a slow client's outbox
+overflows, WS_OVERFLOW_POLICY decides: "refetch" (default) replaces the
+queued updates with one empty update per type, which makes the client
+refetch that data, and "disconnect" closes the socket so the client
+reconnects and resyncs.
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 
+from .bus import create_bus
+from .fastjson import dumps
+from .pool_cache import pool_cache
+from .versions import ALL, versions
+
+WS_COALESCE_MS = float(os.getenv("WS_COALESCE_MS", "50"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "refetch")
+OVERFLOW_POLICIES = ("refetch", "disconnect")
+
+
+def merge_updates(first: dict, second: dict) -> dict | None:
+    """Merge two payloads of the same update type, second applied after first.
+
+    Deltas (`upserted` rows and `deleted` ids) are collapsed row by row.
+    Versioned deltas are only merged if one continues where the other
+    ends. An empty payload (a plain refetch ping) absorbs the other.
+    Returns None if the payloads can't be merged.
+    """
+    if not first or not second:
+        return {}
+    if first == second:
+        return first
+    if "upserted" not in first or "upserted" not in second:
+        return None
+    if "version" in first or "version" in second:
+        if second.get("from_version") == first.get("version"):
+            pass
+        elif first.get("from_version") == second.get("version"):
+            first, second = second, first
+        else:
+            return None
+
+    upserted = {row["id"]: row for row in first["upserted"]}
+    deleted = dict.fromkeys(first["deleted"])
+    for row_id in second["deleted"]:
+        upserted.pop(row_id, None)
+        deleted[row_id] = None
+    for row in second["upserted"]:
+        deleted.pop(row["id"], None)
+        upserted[row["id"]] = row
+
+    merged = {"upserted": list(upserted.values()), "deleted": list(deleted)}
+    if "version" in first:
+        merged = {"version": second["version"], "from_version": first["from_version"], **merged}
+    return merged
+
+
+class Connection:
+    """A socket and its outbox; the writer task starts with the first message."""
+
+    def __init__(self, websocket: WebSocket, household_id: int):
+        self.websocket = websocket
+        self.household_id = household_id
+        # (update type, encoded message) pairs
+        self.outbox: deque[tuple[str, str]] = deque()
+        self.ready = asyncio.Event()
+        self.writer: asyncio.Task | None = None
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, list[WebSocket]] = {}
+    def __init__(
+        self,
+        coalesce_ms: float = WS_COALESCE_MS,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        queue_size: int = WS_QUEUE_SIZE,
+        overflow_policy: str = WS_OVERFLOW_POLICY,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WS_OVERFLOW_POLICY {overflow_policy!r}, expected one of {', '.join(OVERFLOW_POLICIES)}")
+        self.active_connections: dict[int, dict[WebSocket, Connection]] = {}
+        self.coalesce_window = coalesce_ms / 1000
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self._pending: dict[int, list[tuple[str, dict]]] = {}
+        self._flushers: dict[int, asyncio.Task] = {}
+        self._closing: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.pruned = 0
+        self.dropped = 0
+        self.overflow_disconnects = 0
 
     async def connect(self, websocket: WebSocket, household_id: int):
         await websocket.accept()
-        if household_id not in self.active_connections:
-            self.active_connections[household_id] = []
-        self.active_connections[household_id].append(websocket)
+        self.active_connections.setdefault(household_id, {})[websocket] = Connection(websocket, household_id)
 
     def disconnect(self, websocket: WebSocket, household_id: int):
-        if household_id in self.active_connections:
-            self.active_connections[household_id] = [
-                ws for ws in self.active_connections[household_id] if ws != websocket
-            ]
-            if not self.active_connections[household_id]:
-                del self.active_connections[household_id]
+        connections = self.active_connections.get(household_id)
+        if connections is None:
+            return
+        connection = connections.pop(websocket, None)
+        if not connections:
+            del self.active_connections[household_id]
+        if connection is not None and connection.writer is not None:
+            try:
+                current = asyncio.current_task()
+            except RuntimeError:
+                current = None
+            if connection.writer is not current:
+                connection.writer.cancel()
+
+    async def _send_one(self, websocket: WebSocket, text: str) -> bool:
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _drop(self, connection: Connection, code: int = 1011):
+        self.disconnect(connection.websocket, connection.household_id)
+        await self._close(connection, code)
+
+    async def _close(self, connection: Connection, code: int):
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _write(self, connection: Connection):
+        while True:
+            while not connection.outbox:
+                connection.ready.clear()
+                await connection.ready.wait()
+            _, text = connection.outbox.popleft()
+            if not await self._send_one(connection.websocket, text):
+                with self._lock:
+                    self.pruned += 1
+                await self._drop(connection)
+                return
+
+    def _enqueue(self, connection: Connection, update_type: str, text: str):
+        outbox = connection.outbox
+        if len(outbox) >= self.queue_size:
+            if self.overflow_policy == "disconnect":
+                with self._lock:
+                    self.overflow_disconnects += 1
+                    self.dropped += len(outbox) + 1
+                outbox.clear()
+                # Unregister now so later broadcasts skip the socket
+                self.disconnect(connection.websocket, connection.household_id)
+                task = asyncio.create_task(self._close(connection, code=1013))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+                return
+            # An empty update makes the client refetch that data
+            update_types = dict.fromkeys(queued_type for queued_type, _ in outbox)
+            update_types[update_type] = None
+            with self._lock:
+                self.dropped += len(outbox) + 1 - len(update_types)
+            outbox.clear()
+            outbox.extend((queued_type, dumps({"type": queued_type, "data": {}})) for queued_type in update_types)
+        else:
+            outbox.append((update_type, text))
+
+        connection.ready.set()
+        if connection.writer is None:
+            connection.writer = asyncio.create_task(self._write(connection))
 
     async def broadcast(self, household_id: int, message: dict):
-        for connection in self.active_connections.get(household_id, []):
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+        """Queue the message on every socket of the household.
+
+        The message is encoded once and the same text goes to every socket.
+        """
+        connections = list(self.active_connections.get(household_id, {}).values())
+        if not connections:
+            return
+        text = dumps(message)
+        for connection in connections:
+            self._enqueue(connection, message.get("type"), text)
+
+    async def publish(self, household_id: int, update_type: str, data: dict):
+        """Queue an update for the household's sockets, merging it into a
+        pending update of the same type if possible."""
+        if household_id not in self.active_connections:
+            return
+        with self._lock:
+            self.published += 1
+        if self.coalesce_window <= 0:
+            await self._send(household_id, update_type, data)
+            return
+
+        pending = self._pending.setdefault(household_id, [])
+        for i in range(len(pending) - 1, -1, -1):
+            if pending[i][0] == update_type:
+                merged = merge_updates(pending[i][1], data)
+                if merged is not None:
+                    pending[i] = (update_type, merged)
+                    with self._lock:
+                        self.coalesced += 1
+                    break
+        else:
+            pending.append((update_type, data))
+
+        if household_id not in self._flushers:
+            self._flushers[household_id] = asyncio.create_task(self._flush_later(household_id))
+
+    async def _flush_later(self, household_id: int):
+        try:
+            await asyncio.sleep(self.coalesce_window)
+        finally:
+            del self._flushers[household_id]
+            pending = self._pending.pop(household_id, [])
+        for update_type, data in pending:
+            await self._send(household_id, update_type, data)
+
+    async def _send(self, household_id: int, update_type: str, data: dict):
+        with self._lock:
+            self.sent += 1
+        await self.broadcast(household_id, {"type": update_type, "data": data})
+
+    def stats(self) -> dict:
+        connections = [c for household in self.active_connections.values() for c in household.values()]
+        with self._lock:
+            return {
+                "coalesce_ms": self.coalesce_window * 1000,
+                "published": self.published,
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "pruned": self.pruned,
+                "dropped": self.dropped,
+                "overflow_disconnects": self.overflow_disconnects,
+                "connections": len(connections),
+                "queued": sum(len(c.outbox) for c in connections),
+                "max_queued": max((len(c.outbox) for c in connections), default=0),
+            }
 
 
 manager = ConnectionManager()
 
 
+def _forget_cached(household_id: int):
+    """Another worker changed the household's data; drop what we cached."""
+    versions.bump(household_id, *ALL, notify=False)
+    pool_cache.invalidate(household_id)
+
+
+# Carries updates to the sockets held by other worker processes, and tells
+# them about every version bump, including changes that are not broadcast
+bus = create_bus(manager.publish, on_remote=_forget_cached)
+versions.listeners.append(bus.invalidate)
+
+
 async def broadcast_update(household_id: int, update_type: str, data: dict):
-    await manager.broadcast(household_id, {"type": update_type, "data": data})
+    await bus.publish(household_id, update_type, data)
@@ -0,0 +1,190 @@
+"""Single-writer queue that commits writes in groups.
+
+SQLite has one writer at a time, and every commit costs a sync. Instead of
+each request committing on its own, hot mutation endpoints hand a write
+unit - a function taking a Session - to the writer. A dedicated thread
+collects up to WRITER_MAX_BATCH units, waiting at most WRITER_MAX_WAIT_MS
+for more to arrive, runs them in one session and commits once. Each
+caller's future resolves with its unit's return value after that commit.
+
+Each unit runs in a savepoint: one that raises (say, a 404) is rolled back
+alone and its caller gets the exception, while the rest of the group still
+commits together. Only if the commit itself fails are the units rerun one
+transaction each. Units may therefore run more than once and must only
+touch the database; return plain data, not ORM objects, since the
+session is closed once the group is done. Units run in the context of
+the request that submitted them. With sharding, a batch is split into one
+group per household, so every commit goes to exactly one shard.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from sqlalchemy import event
+
+from .shards import current_household_id
+
+logger = logging.getLogger(__name__)
+
+WRITER_MAX_BATCH = int(os.getenv("WRITER_MAX_BATCH", "64"))
+WRITER_MAX_WAIT_MS = float(os.getenv("WRITER_MAX_WAIT_MS", "2"))
+
+_STOP = object()
+
+
+def _begin_sqlite(session, transaction, connection):
+    """Open the transaction with BEGIN so savepoints nest inside it.
+
+    pysqlite only begins before DML on its own, so the first SAVEPOINT
+    would start the transaction and releasing it would commit.
+    """
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        session_factory=None,
+        max_batch: int = WRITER_MAX_BATCH,
+        max_wait_ms: float = WRITER_MAX_WAIT_MS,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.units = 0
+        self.failures = 0
+        self.retried_batches = 0
+        self.largest_batch = 0
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        """Queue `fn(db, *args)`; the future resolves after its commit."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((fn, args, future, contextvars.copy_context()))
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stop(self):
+        """Apply everything queued so far, then end the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            unit = self._queue.get()
+            if unit is _STOP:
+                return
+            batch = [unit]
+            while len(batch) < self.max_batch:
+                try:
+                    unit = self._queue.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                if unit is _STOP:
+                    stopping = True
+                    break
+                batch.append(unit)
+
+            batch = [unit for unit in batch if unit[2].set_running_or_notify_cancel()]
+            for group in self._by_shard(batch):
+                self._apply(group)
+
+    @staticmethod
+    def _by_shard(batch: list) -> list[list]:
+        """Split the batch so that no group commits to more than one shard."""
+        from .database import shard_router
+
+        if shard_router is None:
+            return [batch] if batch else []
+        groups: dict[int | None, list] = {}
+        for unit in batch:
+            groups.setdefault(unit[3].run(current_household_id.get), []).append(unit)
+        return list(groups.values())
+
+    def _apply(self, batch: list[tuple[Callable, tuple, Future, contextvars.Context]]):
+        session_factory = self.session_factory
+        if session_factory is None:
+            from .database import SessionLocal
+            session_factory = SessionLocal
+
+        db = session_factory()
+        event.listen(db, "after_begin", _begin_sqlite)
+        try:
+            outcomes = []
+            for fn, args, _, context in batch:
+                try:
+                    with db.begin_nested():
+                        result = context.run(fn, db, *args)
+                        # Flush while the unit's household decides the bind
+                        context.run(db.flush)
+                except Exception as exc:
+                    outcomes.append((False, exc))
+                else:
+                    outcomes.append((True, result))
+                # Units update rows in bulk, so none may see another's loaded objects
+                db.expunge_all()
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            db.close()
+            if len(batch) > 1:
+                logger.debug("Commit of a write group of %d failed, applying units one by one", len(batch))
+                with self._lock:
+                    self.retried_batches += 1
+                for unit in batch:
+                    self._apply([unit])
+                return
+            with self._lock:
+                self.failures += 1
+            batch[0][2].set_exception(exc)
+            return
+        db.close()
+
+        with self._lock:
+            self.batches += 1
+            self.units += len(batch)
+            self.failures += sum(not ok for ok, _ in outcomes)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, _, future, _), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "units": self.units,
+                "failures": self.failures,
+                "retried_batches": self.retried_batches,
+                "largest_batch": self.largest_batch,
+                "average_batch": round(self.units / self.batches, 2) if self.batches else 0,
+            }
+
+
+writer = WriteQueue()
+
+
+def get_writer() -> WriteQueue:
+    return writer
@@ -0,0 +1,145 @@
+"""Benchmark encoding of broadcast messages and JSON responses.
+
+Broadcasts a list_updated delta of 500 list rows to 1k sockets of one
+household, comparing one json.dumps per socket (what send_json does) with
+ConnectionManager.broadcast, which encodes once. Also times rendering the
+same payload as an HTTP response with Starlette's JSONResponse and with
+FastJSONResponse, with orjson and with the standard library fallback.
+
+    cd backend
+    python -m benchmarks.bench_broadcast [--sockets 1000] [--rows 500] [--rounds 20]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+
+from app import fastjson
+from app.fastjson import FastJSONResponse
+from app.websocket import ConnectionManager
+
+
+class FakeSocket:
+    """Counts what would go over the wire."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.messages = 0
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        # What Starlette's WebSocket.send_json does before sending
+        self.bytes_sent += len(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+        self.messages += 1
+
+    async def send_text(self, text):
+        self.bytes_sent += len(text)
+        self.messages += 1
+
+
+def payload(rows: int) -> dict:
+    return {
+        "type": "list_updated",
+        "data": {
+            "version": 1001,
+            "from_version": 1000,
+            "upserted": [
+                {
+                    "id": i,
+                    "item_id": 10_000 + i,
+                    "quantity": 1.5,
+                    "unit": "ks",
+                    "checked": i % 3 == 0,
+                    "added_at": "2026-10-17T08:30:00",
+                    "from_recipe_id": None,
+                    "item": {
+                        "id": 10_000 + i,
+                        "name": f"Položka {i}",
+                        "category_id": i % 12,
+                        "category": {"id": i % 12, "name": f"Kategorie {i % 12}", "sort_order": i % 12},
+                    },
+                }
+                for i in range(rows)
+            ],
+            "deleted": list(range(rows, rows + 20)),
+        },
+    }
+
+
+def _time(fn, rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_broadcast(n_sockets: int, message: dict, rounds: int) -> dict[str, list[float]]:
+    loop = asyncio.new_event_loop()
+    manager = ConnectionManager(coalesce_ms=0, queue_size=rounds + 1)
+    sockets = [FakeSocket() for _ in range(n_sockets)]
+    for ws in sockets:
+        loop.run_until_complete(manager.connect(ws, 1))
+
+    async def per_socket():
+        await asyncio.gather(*(ws.send_json(message) for ws in sockets))
+
+    async def encode_once():
+        await manager.broadcast(1, message)
+        # Until every socket's writer has sent it and is waiting again
+        while any(c.ready.is_set() for c in manager.active_connections[1].values()):
+            await asyncio.sleep(0)
+
+    results = {
+        "send_json per socket": _time(lambda: loop.run_until_complete(per_socket()), rounds),
+        "broadcast, encoded once": _time(lambda: loop.run_until_complete(encode_once()), rounds),
+    }
+    writers = asyncio.all_tasks(loop)
+    for task in writers:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*writers, return_exceptions=True))
+    loop.close()
+    return results
+
+
+def bench_render(message: dict, rounds: int) -> dict[str, list[float]]:
+    results = {"JSONResponse": _time(lambda: JSONResponse(message), rounds)}
+    if fastjson.orjson is not None:
+        results["FastJSONResponse (orjson)"] = _time(lambda: FastJSONResponse(message), rounds)
+    orjson, fastjson.orjson = fastjson.orjson, None
+    try:
+        results["FastJSONResponse (stdlib)"] = _time(lambda: FastJSONResponse(message), rounds)
+    finally:
+        fastjson.orjson = orjson
+    return results
+
+
+def _report(results: dict[str, list[float]]):
+    for name, timings in results.items():
+        print(f"{name:>28}: median {statistics.median(timings) * 1000:8.2f} ms  max {max(timings) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    message = payload(args.rows)
+    size = len(fastjson.dumps_bytes(message))
+    print(f"sockets={args.sockets} rows={args.rows} message={size / 1024:.0f} KiB orjson={fastjson.orjson is not None}")
+    print("Broadcast to every socket:")
+    _report(bench_broadcast(args.sockets, message, args.rounds))
+    print("Render one HTTP response:")
+    _report(bench_render(message, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark GET /api/pool against a large household.
+
+Seeds a throwaway SQLite database with one household, 5k items and 50k
+session rows, then reports the number of SQL statements and the latency
+of the pool endpoint.
+
+    cd backend
+    python -m benchmarks.bench_pool [--items 5000] [--session-rows 50000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import get_current_household
+from app.database import Base, get_async_db, get_db
+from app.main import app
+from app.models import Household, Item, ShoppingSession, SessionItem
+from app.pool_cache import pool_cache
+from app.stats import rebuild_item_stats
+
+
+def seed(db, n_items: int, n_session_rows: int) -> Household:
+    household = Household(token="BENC-HMRK")
+    db.add(household)
+    db.commit()
+    db.refresh(household)
+
+    db.execute(insert(Item), [
+        {"name": f"Item {i}", "household_id": household.id} for i in range(n_items)
+    ])
+    item_ids = [row[0] for row in db.query(Item.id).all()]
+
+    rows_per_session = 25
+    n_sessions = n_session_rows // rows_per_session
+    now = datetime.utcnow()
+    db.execute(insert(ShoppingSession), [
+        {"household_id": household.id, "completed_at": now - timedelta(days=i % 365)}
+        for i in range(n_sessions)
+    ])
+    session_ids = [row[0] for row in db.query(ShoppingSession.id).all()]
+
+    rng = random.Random(42)
+    session_rows = []
+    for session_id in session_ids:
+        for item_id in rng.sample(item_ids, rows_per_session):
+            checked_at = now - timedelta(days=rng.randint(0, 365))
+            session_rows.append({
+                "session_id": session_id,
+                "item_id": item_id,
+                "item_name": f"Item {item_id}",
+                "checked": True,
+                "checked_at": checked_at,
+            })
+    db.execute(insert(SessionItem), session_rows)
+    rebuild_item_stats(db, household.id)
+    db.commit()
+    return household
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--session-rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # The pool endpoint reads through the async engine
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        db = Session()
+        household = seed(db, args.items, args.session_rows)
+
+        statements = 0
+
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            nonlocal statements
+            statements += 1
+
+        def _override_get_db():
+            yield db
+
+        async def _override_get_async_db():
+            async with AsyncSession() as async_db:
+                yield async_db
+
+        app.dependency_overrides[get_db] = _override_get_db
+        app.dependency_overrides[get_async_db] = _override_get_async_db
+        app.dependency_overrides[get_current_household] = lambda: household
+
+        timings = []
+        with TestClient(app) as client:
+            for _ in range(args.repeat):
+                # Measure the uncached path
+                pool_cache.clear()
+                statements = 0
+                start = time.perf_counter()
+                resp = client.get("/api/pool")
+                timings.append(time.perf_counter() - start)
+                resp.raise_for_status()
+
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+
+    print(f"items={args.items} session_rows={args.session_rows} repeat={args.repeat}")
+    print(f"statements per request: {statements}")
+    print(f"latency median: {statistics.median(timings) * 1000:.1f} ms")
+    print(f"latency p95:    {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark write throughput of the SQLite pragma profiles.
+
+For each profile, seeds a throwaway database with a few households and
+their lists, then has several threads toggle list rows in small
+transactions the way concurrent households do (update + change log entry
++ commit). Reports commits per second and commit latency.
+
+    cd backend
+    python -m benchmarks.bench_sqlite [--threads 4] [--commits 500] [--profiles wal,durable,off]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.changes import record_list_changes
+from app.database import SQLITE_PROFILES, Base, apply_sqlite_pragmas, sqlite_pragmas
+from app.models import Household, Item, ShoppingListItem
+
+ITEMS_PER_HOUSEHOLD = 200
+
+
+def seed(db, n_households: int) -> dict[int, list[int]]:
+    db.execute(insert(Household), [{"token": f"BENC-{i:04d}"} for i in range(n_households)])
+    household_ids = [row[0] for row in db.query(Household.id)]
+    db.execute(insert(Item), [
+        {"name": f"Item {i}", "household_id": household_id}
+        for household_id in household_ids
+        for i in range(ITEMS_PER_HOUSEHOLD)
+    ])
+    db.execute(insert(ShoppingListItem).from_select(
+        ["item_id", "household_id"], db.query(Item.id, Item.household_id)
+    ))
+    db.commit()
+    rows: dict[int, list[int]] = {}
+    for list_item_id, household_id in db.query(ShoppingListItem.id, ShoppingListItem.household_id):
+        rows.setdefault(household_id, []).append(list_item_id)
+    return rows
+
+
+def run(profile: str, threads: int, commits: int) -> tuple[float, list[float], int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        apply_sqlite_pragmas(engine, sqlite_pragmas(profile, ""))
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with Session() as db:
+            rows = seed(db, threads)
+
+        timings: list[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def worker(household_id: int, list_item_ids: list[int]):
+            nonlocal errors
+            rng = random.Random(household_id)
+            with Session() as db:
+                for _ in range(commits):
+                    list_item_id = rng.choice(list_item_ids)
+                    start = time.perf_counter()
+                    try:
+                        db.execute(update(ShoppingListItem).where(
+                            ShoppingListItem.id == list_item_id
+                        ).values(checked=~ShoppingListItem.checked))
+                        record_list_changes(db, household_id, upserted=[list_item_id])
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+                        with lock:
+                            errors += 1
+                        continue
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        timings.append(elapsed)
+
+        pool = [threading.Thread(target=worker, args=item) for item in rows.items()]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        total = time.perf_counter() - start
+        engine.dispose()
+    return total, timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=500, help="commits per thread")
+    parser.add_argument("--profiles", default=",".join(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} commits per thread={args.commits}")
+    for profile in args.profiles.split(","):
+        total, timings, errors = run(profile, args.threads, args.commits)
+        timings.sort()
+        print(
+            f"{profile:>8}: {len(timings) / total:8.0f} commits/s"
+            f"  median {statistics.median(timings) * 1000:6.2f} ms"
+            f"  p95 {timings[int(len(timings) * 0.95) - 1] * 1000:6.2f} ms"
+            f"  errors {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,103 @@
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
 import pytest
 from sqlalchemy import create_engine, event
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_async_sessionmaker, get_db
 from app.main import app
-from app.models import Household
+from app.models import (
+    Category, Household, Item, Recipe, RecipeItem, SessionItem, ShoppingListItem, ShoppingSession,
+)
 from app.auth import create_access_token, get_current_household
-
-# In-memory SQLite with StaticPool so all connections share the same database
+from app.auth_cache import auth_cache
+from app.pool_cache import pool_cache
+from app.routers import items as items_router, list as list_router, recipes as recipes_router, sessions as sessions_router
+from app.versions import versions
+from app.writer import WriteQueue, get_writer
+
+# A throwaway SQLite file shared by the sync engine (one connection, like
+# the request session) and the async engine the read endpoints use
+_db_path = Path(tempfile.mkdtemp()) / "test.db"
 engine = create_engine(
-    "sqlite://",
+    f"sqlite:///{_db_path}",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{_db_path}", poolclass=NullPool)
+
 
-# Enable WAL-like behaviour: SQLite needs PRAGMA foreign_keys per connection
+# SQLite needs PRAGMA foreign_keys per connection; WAL lets the async
+# engine read while the sync session holds a write transaction
 @event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
 def _set_sqlite_pragma(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
     cursor.close()
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+test_writer = WriteQueue(TestingSessionLocal)
+
+
+async def _override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+def _override_dependencies(db_session):
+    def _override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_async_db] = _override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: TestingAsyncSessionLocal
+    app.dependency_overrides[get_writer] = lambda: test_writer
 
 
 @pytest.fixture(autouse=True)
 def setup_database():
     """Create all tables before each test, drop after."""
     Base.metadata.create_all(bind=engine)
+    pool_cache.clear()
+    auth_cache.clear()
+    versions.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def sql_statements():
+    """Record every SQL statement sent to the test database.
+
+    Transaction control (the writer's BEGIN and per-unit savepoints) is
+    left out, so budgets count queries only.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK TO")):
+            statements.append(statement)
+
+    for e in (engine, async_engine.sync_engine):
+        event.listen(e, "before_cursor_execute", _record)
+    yield statements
+    for e in (engine, async_engine.sync_engine):
+        event.remove(e, "before_cursor_execute", _record)
+
+
 @pytest.fixture
 def db_session():
     session = TestingSessionLocal()
@@ -46,13 +110,7 @@ def db_session():
 @pytest.fixture
 def client(db_session):
     """TestClient with get_db overridden to use test DB."""
-    def _override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
-
-    app.dependency_overrides[get_db] = _override_get_db
+    _override_dependencies(db_session)
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -77,16 +135,10 @@ def auth_headers(household):
 @pytest.fixture
 def authed_client(db_session, household):
     """Client where get_current_household is overridden to return the test household."""
-    def _override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
-
     def _override_auth():
         return household
 
-    app.dependency_overrides[get_db] = _override_get_db
+    _override_dependencies(db_session)
     app.dependency_overrides[get_current_household] = _override_auth
     with TestClient(app) as c:
         yield c
@@ -106,3 +158,72 @@ def second_household(db_session):
 def second_auth_headers(second_household):
     token = create_access_token(data={"sub": str(second_household.id)})
     return {"Authorization": f"Bearer {token}"}
+
+
+SEEDED_ITEMS = 40
+
+
+@pytest.fixture
+def seeded(db_session, household):
+    """SEEDED_ITEMS items with categories, list rows, recipes and completed sessions."""
+    categories = [Category(name=f"Category {i}", household_id=household.id) for i in range(SEEDED_ITEMS // 4)]
+    db_session.add_all(categories)
+    db_session.flush()
+    items = [
+        Item(name=f"Item {i}", household_id=household.id, category_id=categories[i % len(categories)].id)
+        for i in range(SEEDED_ITEMS)
+    ]
+    db_session.add_all(items)
+    db_session.flush()
+
+    db_session.add_all(
+        ShoppingListItem(item_id=item.id, household_id=household.id, checked=i % 2 == 0)
+        for i, item in enumerate(items)
+    )
+    for r in range(SEEDED_ITEMS // 4):
+        recipe = Recipe(name=f"Recipe {r}", household_id=household.id)
+        db_session.add(recipe)
+        db_session.flush()
+        db_session.add_all(RecipeItem(recipe_id=recipe.id, item_id=item.id) for item in items[r::SEEDED_ITEMS // 4])
+    for s in range(SEEDED_ITEMS // 4):
+        session = ShoppingSession(household_id=household.id, completed_at=datetime.utcnow())
+        db_session.add(session)
+        db_session.flush()
+        db_session.add_all(
+            SessionItem(session_id=session.id, item_id=item.id, item_name=item.name, checked=True)
+            for item in items[s::SEEDED_ITEMS // 4]
+        )
+    db_session.commit()
+    return items
+
+
+@pytest.fixture
+def broadcasts(monkeypatch):
+    """Record the (type, data) of every update the routers broadcast."""
+    sent = []
+
+    async def _record(household_id, update_type, data):
+        # Must survive the trip through send_json
+        sent.append((update_type, json.loads(json.dumps(data))))
+
+    for module in (items_router, list_router, recipes_router, sessions_router):
+        monkeypatch.setattr(module, "broadcast_update", _record)
+    return sent
+
+
+def create_items(client, *names) -> list[int]:
+    return [client.post("/api/items", json={"name": name}).json()["id"] for name in names]
+
+
+def list_version(client) -> int:
+    return int(client.get("/api/list").headers["x-list-version"])
+
+
+def buy(client, *item_ids) -> dict:
+    """Put the items on the list, check them all and purchase."""
+    added = client.post("/api/list/add", json={"items": [
+        {"item_id": item_id, "quantity": 1} for item_id in item_ids
+    ]}).json()
+    for list_item in added:
+        client.put(f"/api/list/{list_item['id']}/check")
+    return client.post("/api/list/purchase").json()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from app.auth import create_access_token, get_household_from_jwt
+from app.auth_cache import AuthCache, CachedHousehold, auth_cache
+
+from .conftest import TestingAsyncSessionLocal
+
+
+def _household_selects(statements):
+    return [s for s in statements if "FROM households" in s]
+
+
+def test_repeated_requests_skip_lookup(client, auth_headers, sql_statements):
+    assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+    assert len(_household_selects(sql_statements)) == 1
+
+    sql_statements.clear()
+    resp = client.get("/api/auth/me", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["token"] == "AAAA-BBBB"
+    assert _household_selects(sql_statements) == []
+    assert auth_cache.stats()["hits"] >= 1
+
+
+def test_invalid_tokens_are_not_cached(client):
+    headers = {"Authorization": "Bearer not-a-jwt"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    assert auth_cache.stats()["entries"] == 0
+
+
+def test_deleted_household_is_forgotten(client, db_session, household, auth_headers):
+    assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+    assert auth_cache.stats()["entries"] == 1
+
+    db_session.delete(household)
+    db_session.commit()
+
+    assert auth_cache.stats()["entries"] == 0
+    assert client.get("/api/auth/me", headers=auth_headers).status_code == 401
+
+
+def test_expired_token_is_not_served():
+    cache = AuthCache(ttl=300)
+    household = CachedHousehold(1, "AAAA-BBBB", None)
+    cache.set("stale", household, exp=time.time() - 1)
+    cache.set("fresh", household, exp=time.time() + 60)
+
+    assert cache.get("stale") is None
+    assert cache.get("fresh") == household
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = AuthCache(max_entries=2)
+    for token in ("a", "b"):
+        cache.set(token, CachedHousehold(1, "AAAA-BBBB", None))
+    cache.get("a")
+    cache.set("c", CachedHousehold(2, "CCCC-DDDD", None))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_websocket_lookup_shares_cache(household):
+    token = create_access_token({"sub": str(household.id)}, expires_delta=timedelta(minutes=5))
+
+    async def lookup():
+        async with TestingAsyncSessionLocal() as db:
+            return await get_household_from_jwt(token, db)
+
+    hits = auth_cache.stats()["hits"]
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(lookup())
+        second = loop.run_until_complete(lookup())
+    finally:
+        loop.close()
+    assert first == second == CachedHousehold(household.id, household.token, household.created_at)
+    assert auth_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,145 @@
+from app.models import Item, SessionItem, ShoppingListItem
+
+from .conftest import create_items
+
+
+def _listed(client, *names):
+    item_ids = create_items(client, *names)
+    return client.post("/api/list/add", json={"items": [{"item_id": i} for i in item_ids]}).json()
+
+
+def _batch(client, *operations):
+    resp = client.post("/api/batch", json={"operations": list(operations)})
+    assert resp.status_code == 200
+    return resp.json()["results"]
+
+
+def test_batch_applies_operations_in_order(authed_client):
+    milk, bread = _listed(authed_client, "Milk", "Bread")
+    eggs = authed_client.post("/api/items", json={"name": "Eggs"}).json()["id"]
+
+    results = _batch(
+        authed_client,
+        {"op": "check", "list_item_id": milk["id"]},
+        {"op": "update", "list_item_id": milk["id"], "quantity": 3, "unit": "l"},
+        {"op": "remove", "list_item_id": bread["id"]},
+        {"op": "add", "item_id": eggs, "quantity": 6},
+    )
+    assert [r["status"] for r in results] == [200, 200, 200, 200]
+    assert results[0]["data"] == {"checked": True}
+    assert results[1]["data"] == {"quantity": 3, "unit": "l"}
+
+    rows = {li["item"]["name"]: li for li in authed_client.get("/api/list").json()}
+    assert set(rows) == {"Milk", "Eggs"}
+    assert (rows["Milk"]["checked"], rows["Milk"]["quantity"], rows["Milk"]["unit"]) == (True, 3, "l")
+    assert rows["Eggs"]["id"] == results[3]["data"]["list_item_id"]
+    assert rows["Eggs"]["quantity"] == 6
+
+
+def test_batch_failed_operation_does_not_stop_the_rest(authed_client):
+    (milk,) = _listed(authed_client, "Milk")
+    results = _batch(
+        authed_client,
+        {"op": "remove", "list_item_id": milk["id"]},
+        {"op": "check", "list_item_id": milk["id"]},
+        {"op": "check", "list_item_id": 9999},
+        {"op": "session_check", "session_item_id": 9999},
+        {"op": "add", "item_id": 9999},
+        {"op": "add", "item_id": milk["item_id"]},
+    )
+    assert [r["status"] for r in results] == [200, 404, 404, 404, 404, 200]
+    assert results[1]["detail"] == "List item not found"
+
+    (row,) = authed_client.get("/api/list").json()
+    assert row["item_id"] == milk["item_id"]
+    # SQLite may hand the removed row's id to the new one; the log must
+    # still end with an upsert for it
+    changes = authed_client.get("/api/list/changes", params={"since": 0}).json()
+    assert [li["id"] for li in changes["upserted"]] == [row["id"]]
+
+
+def test_batch_explicit_check_state_is_idempotent(authed_client):
+    (milk,) = _listed(authed_client, "Milk")
+    results = _batch(
+        authed_client,
+        {"op": "check", "list_item_id": milk["id"], "checked": True},
+        {"op": "check", "list_item_id": milk["id"], "checked": True},
+    )
+    assert [r["data"] for r in results] == [{"checked": True}, {"checked": True}]
+
+
+def test_batch_add_merges_into_updated_row(authed_client):
+    (milk,) = _listed(authed_client, "Milk")
+    results = _batch(
+        authed_client,
+        {"op": "update", "list_item_id": milk["id"], "quantity": 2},
+        {"op": "add", "item_id": milk["item_id"], "quantity": 1},
+        {"op": "check", "list_item_id": milk["id"]},
+    )
+    assert results[1]["data"] == {"list_item_id": milk["id"]}
+    (row,) = authed_client.get("/api/list").json()
+    assert (row["quantity"], row["checked"]) == (3, True)
+
+
+def test_batch_session_check(authed_client, db_session):
+    _listed(authed_client, "Milk")
+    session = authed_client.post("/api/session/start").json()
+    session_item_id = session["session_items"][0]["id"]
+
+    results = _batch(
+        authed_client,
+        {"op": "session_check", "session_item_id": session_item_id},
+        {"op": "session_check", "session_item_id": session_item_id, "checked": True},
+    )
+    assert results[0]["data"]["checked"] is True
+    assert results[1]["data"] == results[0]["data"]
+    db_session.expire_all()
+    assert db_session.get(SessionItem, session_item_id).checked is True
+
+
+def test_batch_is_scoped_to_household(authed_client, db_session, second_household):
+    theirs = Item(name="Milk", household_id=second_household.id)
+    db_session.add(theirs)
+    db_session.flush()
+    their_row = ShoppingListItem(household_id=second_household.id, item_id=theirs.id)
+    db_session.add(their_row)
+    db_session.commit()
+
+    results = _batch(
+        authed_client,
+        {"op": "check", "list_item_id": their_row.id},
+        {"op": "add", "item_id": theirs.id},
+    )
+    assert [r["status"] for r in results] == [404, 404]
+    db_session.refresh(their_row)
+    assert their_row.checked is False
+
+
+def test_batch_broadcasts_one_delta(authed_client, broadcasts):
+    milk, bread = _listed(authed_client, "Milk", "Bread")
+    broadcasts.clear()
+    _batch(
+        authed_client,
+        *[{"op": "check", "list_item_id": milk["id"]} for _ in range(5)],
+        {"op": "remove", "list_item_id": bread["id"]},
+    )
+    ((update_type, delta),) = broadcasts
+    assert update_type == "list_updated"
+    assert [(li["id"], li["checked"]) for li in delta["upserted"]] == [(milk["id"], True)]
+    assert delta["deleted"] == [bread["id"]]
+    assert delta["version"] == int(authed_client.get("/api/list").headers["x-list-version"])
+
+
+def test_batch_statement_count(authed_client, sql_statements):
+    rows = _listed(authed_client, *[f"Item {i}" for i in range(20)])
+    sql_statements.clear()
+    _batch(authed_client, *[{"op": "check", "list_item_id": li["id"]} for li in rows])
+
+    writes = [s for s in sql_statements if s.startswith(("INSERT", "UPDATE", "DELETE"))]
+    # One executemany for the toggles, one for the change log
+    assert len(writes) == 2
+
+
+def test_batch_rejects_unknown_operation(authed_client):
+    resp = authed_client.post("/api/batch", json={"operations": [{"op": "purchase"}]})
+    assert resp.status_code == 422
@@ -0,0 +1,99 @@
+from .conftest import list_version
+
+
+def _of_type(broadcasts, update_type):
+    return [data for sent_type, data in broadcasts if sent_type == update_type]
+
+
+def test_list_mutations_carry_deltas(authed_client, broadcasts):
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    start = list_version(authed_client)
+
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]}).json()[0]
+    authed_client.put(f"/api/list/{added['id']}/check")
+    authed_client.delete(f"/api/list/{added['id']}")
+
+    add, check, remove = _of_type(broadcasts, "list_updated")
+    assert add["from_version"] == start
+    assert [li["item"]["name"] for li in add["upserted"]] == ["Milk"]
+    assert check["from_version"] == add["version"]
+    assert [(li["id"], li["checked"]) for li in check["upserted"]] == [(added["id"], True)]
+    assert remove["from_version"] == check["version"]
+    assert remove["upserted"] == []
+    assert remove["deleted"] == [added["id"]]
+    assert remove["version"] == list_version(authed_client)
+
+
+def test_delta_matches_changes_endpoint(authed_client, broadcasts):
+    milk, bread = [authed_client.post("/api/items", json={"name": n}).json()["id"] for n in ("Milk", "Bread")]
+    start = list_version(authed_client)
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}, {"item_id": bread}]})
+
+    (delta,) = _of_type(broadcasts, "list_updated")
+    changes = authed_client.get("/api/list/changes", params={"since": start}).json()
+    assert delta["version"] == changes["version"]
+    assert sorted(delta["upserted"], key=lambda li: li["id"]) == sorted(changes["upserted"], key=lambda li: li["id"])
+
+
+def test_item_changes_broadcast_items_and_list_rows(authed_client, broadcasts):
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    broadcasts.clear()
+
+    authed_client.put(f"/api/items/{milk}", json={"name": "Oat milk"})
+    (items_delta,) = _of_type(broadcasts, "items_updated")
+    assert [i["name"] for i in items_delta["upserted"]] == ["Oat milk"]
+    (list_delta,) = _of_type(broadcasts, "list_updated")
+    assert [li["item"]["name"] for li in list_delta["upserted"]] == ["Oat milk"]
+
+    broadcasts.clear()
+    authed_client.post("/api/items/delete", json={"ids": [milk, 9999]})
+    (items_delta,) = _of_type(broadcasts, "items_updated")
+    assert items_delta == {"upserted": [], "deleted": [milk]}
+    (list_delta,) = _of_type(broadcasts, "list_updated")
+    assert len(list_delta["deleted"]) == 1
+
+
+def test_category_changes_broadcast_categories(authed_client, broadcasts):
+    category = authed_client.post("/api/categories", json={"name": "Dairy"}).json()
+    authed_client.put(f"/api/categories/{category['id']}", json={"name": "Milk & co"})
+    authed_client.delete(f"/api/categories/{category['id']}")
+
+    created, updated, deleted = _of_type(broadcasts, "categories_updated")
+    assert [c["name"] for c in created["upserted"]] == ["Dairy"]
+    assert [c["name"] for c in updated["upserted"]] == ["Milk & co"]
+    assert deleted == {"upserted": [], "deleted": [category["id"]]}
+
+
+def test_changes_off_the_list_skip_list_broadcast(authed_client, broadcasts):
+    category = authed_client.post("/api/categories", json={"name": "Dairy"}).json()
+    milk = authed_client.post("/api/items", json={"name": "Milk", "category_id": category["id"]}).json()["id"]
+    broadcasts.clear()
+
+    authed_client.put(f"/api/items/{milk}", json={"name": "Oat milk"})
+    authed_client.put(f"/api/categories/{category['id']}", json={"name": "Milk & co"})
+    authed_client.post("/api/items/delete", json={"ids": [milk]})
+
+    assert [sent_type for sent_type, _ in broadcasts] == ["items_updated", "categories_updated", "items_updated"]
+
+
+def test_merge_broadcasts_target_and_sources(authed_client, broadcasts):
+    milk, milk2 = [authed_client.post("/api/items", json={"name": n}).json()["id"] for n in ("Milk", "Milk 2")]
+    broadcasts.clear()
+    authed_client.post(f"/api/items/{milk}/merge", json={"source_ids": [milk2]})
+
+    (items_delta,) = _of_type(broadcasts, "items_updated")
+    assert [i["id"] for i in items_delta["upserted"]] == [milk]
+    assert items_delta["deleted"] == [milk2]
+
+
+def test_session_complete_broadcasts_removed_rows(authed_client, broadcasts):
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]}).json()[0]
+    session = authed_client.post("/api/session/start").json()
+    authed_client.put(f"/api/session/check/{session['session_items'][0]['id']}")
+    broadcasts.clear()
+
+    authed_client.post("/api/session/complete")
+    (delta,) = _of_type(broadcasts, "list_updated")
+    assert delta["deleted"] == [added["id"]]
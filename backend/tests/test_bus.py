@@ -0,0 +1,269 @@
+import asyncio
+import json
+
+import pytest
+
+from app.bus import LocalBus, RedisBus, RespConnection, SQLiteBus, create_bus
+from app.versions import ALL, LIST, DataVersions
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _recorder():
+    received = []
+
+    async def deliver(household_id, update_type, data):
+        received.append((household_id, update_type, data))
+
+    return received, deliver
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class FakeRedis:
+    """A stand-in server that speaks enough RESP for PUBLISH/SUBSCRIBE."""
+
+    def __init__(self):
+        self.subscribers: dict[bytes, set[asyncio.StreamWriter]] = {}
+        self.server: asyncio.Server | None = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        self.server.close()
+        for writers in self.subscribers.values():
+            for writer in writers:
+                writer.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        conn = RespConnection(reader, writer)
+        try:
+            while True:
+                command, *args = await conn.read()
+                if command.upper() == b"SUBSCRIBE":
+                    self.subscribers.setdefault(args[0], set()).add(writer)
+                    writer.write(b"*3\r\n$9\r\nsubscribe\r\n$%d\r\n%s\r\n:1\r\n" % (len(args[0]), args[0]))
+                elif command.upper() == b"PUBLISH":
+                    channel, message = args
+                    targets = self.subscribers.get(channel, set())
+                    for target in targets:
+                        target.write(b"*3\r\n$7\r\nmessage\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n" % (
+                            len(channel), channel, len(message), message,
+                        ))
+                    writer.write(b":%d\r\n" % len(targets))
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for writers in self.subscribers.values():
+                writers.discard(writer)
+
+
+def test_local_bus_delivers_in_process():
+    received, deliver = _recorder()
+    bus = LocalBus(deliver)
+    _run(bus.publish(1, "list_updated", {}))
+    assert received == [(1, "list_updated", {})]
+    assert bus.stats() == {"backend": "memory", "published": 1, "invalidated": 0, "received": 0, "failures": 0}
+
+
+def test_sqlite_bus_reaches_other_workers(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    sent, deliver_a = _recorder()
+    received, deliver_b = _recorder()
+    forgotten = []
+    worker_a = SQLiteBus(deliver_a, path, poll_ms=10, on_remote=forgotten.append)
+    worker_b = SQLiteBus(deliver_b, path, poll_ms=10, on_remote=forgotten.append)
+
+    async def scenario():
+        await worker_a.start()
+        await worker_b.start()
+        await worker_a.publish(1, "items_updated", {"upserted": [], "deleted": [5]})
+        await _wait_for(lambda: received)
+        # Give worker A a few polls to (not) pick up its own message
+        await asyncio.sleep(0.05)
+        await worker_a.stop()
+        await worker_b.stop()
+
+    _run(scenario())
+    assert sent == [(1, "items_updated", {"upserted": [], "deleted": [5]})]
+    assert received == sent
+    assert worker_a.stats()["received"] == 0
+    assert worker_b.stats()["received"] == 1
+    # Only worker B has to drop its caches
+    assert forgotten == [1]
+
+
+def test_sqlite_bus_skips_backlog(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    received, deliver = _recorder()
+
+    async def scenario():
+        old = SQLiteBus(deliver, path, poll_ms=10)
+        await old.publish(1, "list_updated", {})
+        await old.stop()
+        received.clear()
+
+        late = SQLiteBus(deliver, path, poll_ms=10)
+        await late.start()
+        await asyncio.sleep(0.05)
+        await late.stop()
+
+    _run(scenario())
+    assert received == []
+
+
+def test_changes_without_broadcast_invalidate_other_workers(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    _, deliver_a = _recorder()
+    received, deliver_b = _recorder()
+    forgotten = []
+    worker_a = SQLiteBus(deliver_a, path, poll_ms=10)
+    worker_b = SQLiteBus(deliver_b, path, poll_ms=10, on_remote=forgotten.append)
+    versions_a = DataVersions()
+    versions_a.listeners.append(worker_a.invalidate)
+
+    async def scenario():
+        await worker_a.start()
+        await worker_b.start()
+        # Sync handlers bump versions on a threadpool thread, async ones on the loop
+        await asyncio.to_thread(versions_a.bump, 1, "sessions")
+        versions_a.bump(2, "recipes")
+        await _wait_for(lambda: len(forgotten) == 2)
+        await worker_a.stop()
+        await worker_b.stop()
+
+    _run(scenario())
+    assert sorted(forgotten) == [1, 2]
+    # Nothing is sent to worker B's sockets
+    assert received == []
+    assert worker_a.stats()["invalidated"] == 2
+
+
+def test_remote_invalidations_are_not_sent_back():
+    sent = []
+    data_versions = DataVersions()
+    data_versions.listeners.append(sent.append)
+    data_versions.bump(1, "list", notify=False)
+    assert sent == []
+    assert data_versions.get(1, "list") == 1
+
+
+class _LinkedBus(LocalBus):
+    """A LocalBus that hands its messages straight to the other workers' buses."""
+
+    def __init__(self, deliver, on_remote):
+        super().__init__(deliver, on_remote=on_remote)
+        self.peers: list[LocalBus] = []
+
+    async def _send(self, message: str):
+        message = json.loads(message)
+        for peer in self.peers:
+            await peer._receive(message["origin"], message["household_id"], message["type"], message["data"])
+
+
+def test_etags_follow_other_workers_bumps():
+    _, deliver = _recorder()
+    workers = []
+    for _ in range(2):
+        data_versions = DataVersions()
+        bus = _LinkedBus(deliver, on_remote=lambda household_id, v=data_versions: v.bump(household_id, *ALL, notify=False))
+        data_versions.listeners.append(bus.invalidate)
+        workers.append((data_versions, bus))
+    (versions_a, bus_a), (versions_b, bus_b) = workers
+    bus_a.peers.append(bus_b)
+    bus_b.peers.append(bus_a)
+
+    async def scenario():
+        bus_a._loop = bus_b._loop = asyncio.get_running_loop()
+        # Each worker tags the same data differently
+        assert versions_a.etag(1, LIST) != versions_b.etag(1, LIST)
+        seen_by_b = versions_b.etag(1, LIST)
+        versions_a.bump(1, LIST)
+        await _wait_for(lambda: versions_b.etag(1, LIST) != seen_by_b)
+        await asyncio.sleep(0.02)
+
+    _run(scenario())
+    # B's bump came from the bus and was not echoed back to A
+    assert versions_a.get(1, LIST) == 1
+    assert versions_b.get(1, LIST) == 1
+    assert versions_b.get(2, LIST) == 0
+    assert bus_a.stats()["invalidated"] == 1
+    assert bus_b.stats()["invalidated"] == 0
+
+
+def test_redis_bus_reaches_other_workers():
+    server = FakeRedis()
+    sent, deliver_a = _recorder()
+    received, deliver_b = _recorder()
+
+    async def scenario():
+        url = await server.start()
+        worker_a = RedisBus(deliver_a, url)
+        worker_b = RedisBus(deliver_b, url)
+        for worker in (worker_a, worker_b):
+            await worker.start()
+            await asyncio.wait_for(worker.subscribed.wait(), 2)
+        await worker_a.publish(2, "list_updated", {"version": 3, "from_version": 2, "upserted": [], "deleted": [1]})
+        await _wait_for(lambda: received)
+        await asyncio.sleep(0.02)
+        stats = worker_a.stats(), worker_b.stats()
+        await worker_a.stop()
+        await worker_b.stop()
+        await server.stop()
+        return stats
+
+    stats_a, stats_b = _run(scenario())
+    assert sent == [(2, "list_updated", {"version": 3, "from_version": 2, "upserted": [], "deleted": [1]})]
+    assert received == sent
+    assert stats_a["received"] == 0
+    assert stats_b["received"] == 1
+
+
+def test_redis_bus_counts_unreachable_server():
+    received, deliver = _recorder()
+    bus = RedisBus(deliver, "redis://127.0.0.1:1")
+    _run(bus.publish(1, "list_updated", {}))
+    # Local sockets still get the update
+    assert received == [(1, "list_updated", {})]
+    assert bus.stats()["failures"] == 1
+
+
+def test_create_bus():
+    received, deliver = _recorder()
+    assert isinstance(create_bus(deliver, "memory"), LocalBus)
+    assert isinstance(create_bus(deliver, "redis", "redis://localhost:6379"), RedisBus)
+    assert create_bus(deliver, "sqlite", "sqlite:///./x/bus.db").path == "./x/bus.db"
+    with pytest.raises(ValueError):
+        create_bus(deliver, "kafka")
+
+
+def test_metrics_include_bus(client):
+    assert client.get("/api/metrics").json()["bus"]["backend"] == "memory"
+
+
+def test_remote_updates_invalidate_caches():
+    from app.pool_cache import pool_cache
+    from app.versions import LIST, versions
+    from app.websocket import bus
+
+    before = versions.get(7, LIST), pool_cache.version(7)
+    _run(bus._receive("another-worker", 7, "list_updated", {}))
+    assert versions.get(7, LIST) == before[0] + 1
+    assert pool_cache.version(7) == before[1] + 1
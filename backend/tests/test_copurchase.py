@@ -0,0 +1,118 @@
+from app import copurchase
+from app.copurchase import rebuild_copurchase
+from app.models import ItemNeighbor, ItemPair
+
+from .conftest import buy, create_items
+
+
+def _pairs(db_session):
+    db_session.expire_all()
+    return {(p.item_a, p.item_b): p.count for p in db_session.query(ItemPair)}
+
+
+def test_purchase_records_pairs(authed_client, db_session):
+    milk, bread, eggs = create_items(authed_client, "Milk", "Bread", "Eggs")
+    buy(authed_client, milk, bread)
+    buy(authed_client, milk, bread, eggs)
+
+    assert _pairs(db_session) == {
+        (milk, bread): 2,
+        (milk, eggs): 1,
+        (bread, eggs): 1,
+    }
+
+
+def test_complete_session_records_checked_only(authed_client, db_session):
+    milk, bread, eggs = create_items(authed_client, "Milk", "Bread", "Eggs")
+    authed_client.post("/api/list/add", json={"items": [
+        {"item_id": i, "quantity": 1} for i in (milk, bread, eggs)
+    ]})
+    session = authed_client.post("/api/session/start").json()
+    for si in session["session_items"]:
+        if si["item_id"] != eggs:
+            authed_client.put(f"/api/session/check/{si['id']}")
+    authed_client.post("/api/session/complete")
+
+    assert _pairs(db_session) == {(milk, bread): 1}
+
+
+def test_suggestions_from_current_list(authed_client):
+    milk, bread, eggs, soap = create_items(authed_client, "Milk", "Bread", "Eggs", "Soap")
+    buy(authed_client, milk, bread)
+    buy(authed_client, milk, bread, eggs)
+    buy(authed_client, soap)
+
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk, "quantity": 1}]})
+    resp = authed_client.get("/api/list/suggestions")
+    assert resp.status_code == 200
+    suggestions = resp.json()
+    assert [s["item"]["id"] for s in suggestions] == [bread, eggs]
+    assert [s["score"] for s in suggestions] == [2, 1]
+
+
+def test_suggestions_exclude_listed_items(authed_client):
+    milk, bread = create_items(authed_client, "Milk", "Bread")
+    buy(authed_client, milk, bread)
+
+    authed_client.post("/api/list/add", json={"items": [
+        {"item_id": milk, "quantity": 1},
+        {"item_id": bread, "quantity": 1},
+    ]})
+    assert authed_client.get("/api/list/suggestions").json() == []
+
+
+def test_suggestions_empty_list(authed_client):
+    assert authed_client.get("/api/list/suggestions").json() == []
+
+
+def test_delete_session_removes_pairs(authed_client, db_session):
+    milk, bread = create_items(authed_client, "Milk", "Bread")
+    first = buy(authed_client, milk, bread)
+    buy(authed_client, milk, bread)
+
+    authed_client.delete(f"/api/sessions/{first['id']}")
+    assert _pairs(db_session) == {(milk, bread): 1}
+
+    for session in authed_client.get("/api/sessions").json():
+        authed_client.delete(f"/api/sessions/{session['id']}")
+    assert _pairs(db_session) == {}
+    assert db_session.query(ItemNeighbor).count() == 0
+
+
+def test_delete_item_refills_neighbor_lists(authed_client, db_session):
+    milk, bread, eggs = create_items(authed_client, "Milk", "Bread", "Eggs")
+    buy(authed_client, milk, bread, eggs)
+
+    authed_client.delete(f"/api/items/{bread}")
+    assert _pairs(db_session) == {(milk, eggs): 1}
+    neighbors = {(n.item_id, n.neighbor_id) for n in db_session.query(ItemNeighbor)}
+    assert neighbors == {(milk, eggs), (eggs, milk)}
+
+
+def test_merge_rebuilds_target_pairs(authed_client, db_session):
+    milk, milk2, bread = create_items(authed_client, "Milk", "Milk 2", "Bread")
+    buy(authed_client, milk, bread)
+    buy(authed_client, milk2, bread)
+
+    authed_client.post(f"/api/items/{milk}/merge", json={"source_ids": [milk2]})
+    assert _pairs(db_session) == {(milk, bread): 2}
+
+
+def test_neighbor_lists_are_capped(authed_client, db_session, monkeypatch):
+    monkeypatch.setattr(copurchase, "NEIGHBORS_PER_ITEM", 2)
+    milk, *others = create_items(authed_client, "Milk", "A", "B", "C")
+    buy(authed_client, milk, *others)
+
+    db_session.expire_all()
+    assert db_session.query(ItemNeighbor).filter(ItemNeighbor.item_id == milk).count() == 2
+
+
+def test_rebuild_matches_incremental(authed_client, db_session, household):
+    milk, bread, eggs = create_items(authed_client, "Milk", "Bread", "Eggs")
+    buy(authed_client, milk, bread)
+    buy(authed_client, milk, bread, eggs)
+    incremental = _pairs(db_session)
+
+    rebuild_copurchase(db_session, household.id)
+    db_session.commit()
+    assert _pairs(db_session) == incremental
@@ -0,0 +1,91 @@
+import inspect
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.auth import get_current_household
+from app.database import apply_sqlite_pragmas, sqlite_pragmas
+from app.maintenance import DatabaseMaintenance
+from app.models import Item
+from app.routers import items as items_router, list as list_router, recipes as recipes_router, sessions as sessions_router
+
+
+def test_profiles():
+    assert sqlite_pragmas("off", "") == {}
+    wal = sqlite_pragmas("wal", "")
+    assert wal["journal_mode"] == "WAL"
+    assert wal["synchronous"] == "NORMAL"
+    assert wal["foreign_keys"] == "ON"
+    assert sqlite_pragmas("durable", "")["synchronous"] == "FULL"
+
+
+def test_pragma_overrides():
+    pragmas = sqlite_pragmas("wal", "cache_size=-64000, mmap_size = 0,")
+    assert pragmas["cache_size"] == "-64000"
+    assert pragmas["mmap_size"] == "0"
+    assert pragmas["journal_mode"] == "WAL"
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        sqlite_pragmas("fast", "")
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_pragmas_applied_on_connect(file_engine):
+    apply_sqlite_pragmas(file_engine, sqlite_pragmas("wal", ""))
+    assert _pragma(file_engine, "journal_mode") == "wal"
+    assert _pragma(file_engine, "synchronous") == 1
+    assert _pragma(file_engine, "foreign_keys") == 1
+    assert _pragma(file_engine, "temp_store") == 2
+    assert _pragma(file_engine, "busy_timeout") == 5000
+
+
+def test_maintenance_checkpoints_wal(file_engine):
+    apply_sqlite_pragmas(file_engine, sqlite_pragmas("wal", ""))
+    with file_engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+    maintenance = DatabaseMaintenance(interval=0)
+    result = maintenance.run_once(file_engine, "TRUNCATE")
+    assert result["busy"] == 0
+    stats = maintenance.stats()
+    assert stats["runs"] == 1
+    assert stats["last_checkpoint"] == result
+
+
+def test_maintenance_without_wal(file_engine):
+    result = DatabaseMaintenance(interval=0).run_once(file_engine)
+    assert result == {"busy": 0, "wal_frames": -1, "checkpointed": -1}
+
+
+@pytest.mark.parametrize("endpoint", [
+    list_router.get_shopping_list, list_router.get_pool, list_router.get_suggestions,
+    items_router.list_items, items_router.list_categories, recipes_router.list_recipes,
+    sessions_router.list_sessions, sessions_router.get_active_session,
+])
+def test_read_endpoints_skip_the_threadpool(endpoint):
+    assert inspect.iscoroutinefunction(endpoint)
+
+
+def test_auth_dependency_skips_the_threadpool():
+    assert inspect.iscoroutinefunction(get_current_household)
+
+
+def test_async_session_reads_committed_rows(client, auth_headers, db_session, household):
+    db_session.add(Item(name="Milk", household_id=household.id))
+    db_session.commit()
+    resp = client.get("/api/items", headers=auth_headers)
+    assert [i["name"] for i in resp.json()] == ["Milk"]
@@ -0,0 +1,83 @@
+import pytest
+
+from app.versions import DataVersions, versions
+
+
+def _etag(client, url):
+    resp = client.get(url)
+    assert resp.status_code == 200
+    return resp.headers["etag"]
+
+
+@pytest.mark.parametrize("url", ["/api/list", "/api/items", "/api/categories", "/api/recipes", "/api/sessions"])
+def test_read_endpoint_not_modified(authed_client, sql_statements, url):
+    resp = authed_client.get(url)
+    etag = resp.headers["etag"]
+    assert etag.startswith('W/"')
+    assert resp.headers["cache-control"] == "no-cache"
+
+    sql_statements.clear()
+    resp = authed_client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert not [s for s in sql_statements if "households" not in s]
+
+
+def test_list_mutation_changes_etag(authed_client):
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    before = _etag(authed_client, "/api/list")
+
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    after = _etag(authed_client, "/api/list")
+    assert after != before
+
+    resp = authed_client.get("/api/list", headers={"If-None-Match": before})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 1
+
+
+def test_item_rename_changes_embedding_collections(authed_client):
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    urls = ["/api/list", "/api/items", "/api/recipes", "/api/sessions"]
+    before = {url: _etag(authed_client, url) for url in urls}
+    categories = _etag(authed_client, "/api/categories")
+
+    authed_client.put(f"/api/items/{milk}", json={"name": "Oat milk"})
+    assert all(_etag(authed_client, url) != before[url] for url in urls)
+    assert _etag(authed_client, "/api/categories") == categories
+
+
+def test_category_change_changes_everything(authed_client):
+    category = authed_client.post("/api/categories", json={"name": "Dairy"}).json()["id"]
+    urls = ["/api/list", "/api/items", "/api/categories", "/api/recipes", "/api/sessions"]
+    before = {url: _etag(authed_client, url) for url in urls}
+
+    authed_client.put(f"/api/categories/{category}", json={"color": "#ffffff"})
+    assert all(_etag(authed_client, url) != before[url] for url in urls)
+
+
+def test_unrelated_mutation_keeps_etag(authed_client):
+    list_etag = _etag(authed_client, "/api/list")
+    authed_client.post("/api/recipes", json={"name": "Pancakes", "items": []})
+    assert _etag(authed_client, "/api/list") == list_etag
+
+
+def test_multiple_if_none_match_values(authed_client):
+    etag = _etag(authed_client, "/api/items")
+    resp = authed_client.get("/api/items", headers={"If-None-Match": f'W/"stale-1", {etag}'})
+    assert resp.status_code == 304
+
+
+def test_versions_are_per_household():
+    data_versions = DataVersions()
+    data_versions.bump(1, "list")
+    data_versions.bump(1, "list", "items")
+    assert data_versions.get(1, "list") == 2
+    assert data_versions.get(1, "items") == 1
+    assert data_versions.get(2, "list") == 0
+
+
+def test_etag_changes_across_restarts():
+    assert DataVersions().etag(1, "list") != DataVersions().etag(1, "list")
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from app import fastjson
+from app.fastjson import FastJSONResponse, dumps, dumps_bytes
+
+MESSAGE = {"type": "items_updated", "data": {"upserted": [{"id": 1, "name": "Mléko", "quantity": 1.5}], "deleted": []}}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        if fastjson.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(fastjson, "orjson", None)
+    return request.param
+
+
+def test_output_is_compact_utf8(encoder):
+    encoded = dumps_bytes(MESSAGE)
+    assert b" " not in encoded.replace("Mléko".encode(), b"")
+    assert "Mléko".encode() in encoded
+    assert json.loads(encoded) == MESSAGE
+    assert dumps(MESSAGE) == encoded.decode()
+
+
+def test_encoders_agree(monkeypatch):
+    if fastjson.orjson is None:
+        pytest.skip("orjson is not installed")
+    fast = dumps_bytes(MESSAGE)
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert dumps_bytes(MESSAGE) == fast
+
+
+def test_response_renders_with_fast_encoder(encoder):
+    response = FastJSONResponse(MESSAGE)
+    assert response.media_type == "application/json"
+    assert response.body == dumps_bytes(MESSAGE)
+
+
+def test_dict_routes_still_return_json(client):
+    resp = client.get("/api/metrics")
+    assert resp.headers["content-type"] == "application/json"
+    assert "websocket" in resp.json()
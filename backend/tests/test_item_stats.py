@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from app.models import Item, ItemStat, ShoppingSession, SessionItem
+from app.stats import rebuild_item_stats
+
+from .conftest import buy
+
+
+def _stats(db_session, item_id):
+    db_session.expire_all()
+    return db_session.query(ItemStat).filter(ItemStat.item_id == item_id).first()
+
+
+def test_purchase_records_stats(authed_client, db_session):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    buy(authed_client, item["id"])
+    buy(authed_client, item["id"])
+
+    stat = _stats(db_session, item["id"])
+    assert stat.purchase_count == 2
+    assert stat.last_purchased_at is not None
+    assert stat.ewma_interval_days is not None
+
+
+def test_complete_session_records_only_checked(authed_client, db_session):
+    a = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    b = authed_client.post("/api/items", json={"name": "Bread"}).json()
+    authed_client.post("/api/list/add", json={"items": [
+        {"item_id": a["id"], "quantity": 1},
+        {"item_id": b["id"], "quantity": 1},
+    ]})
+    session = authed_client.post("/api/session/start").json()
+    si = next(si for si in session["session_items"] if si["item_id"] == a["id"])
+    authed_client.put(f"/api/session/check/{si['id']}")
+    authed_client.post("/api/session/complete")
+
+    assert _stats(db_session, a["id"]).purchase_count == 1
+    assert _stats(db_session, b["id"]) is None
+
+
+def test_delete_session_rebuilds_stats(authed_client, db_session):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    first = buy(authed_client, item["id"])
+    buy(authed_client, item["id"])
+
+    authed_client.delete(f"/api/sessions/{first['id']}")
+    stat = _stats(db_session, item["id"])
+    assert stat.purchase_count == 1
+    assert stat.ewma_interval_days is None
+
+
+def test_merge_moves_stats_to_target(authed_client, db_session):
+    a = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    b = authed_client.post("/api/items", json={"name": "Milk 2"}).json()
+    buy(authed_client, a["id"])
+    buy(authed_client, b["id"])
+
+    authed_client.post(f"/api/items/{a['id']}/merge", json={"source_ids": [b["id"]]})
+    assert _stats(db_session, a["id"]).purchase_count == 2
+    assert _stats(db_session, b["id"]) is None
+
+
+def test_bulk_delete_removes_stats(authed_client, db_session):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    buy(authed_client, item["id"])
+
+    authed_client.post("/api/items/delete", json={"ids": [item["id"]]})
+    assert _stats(db_session, item["id"]) is None
+
+
+def test_delete_item_removes_stats(authed_client, db_session):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    buy(authed_client, item["id"])
+
+    authed_client.delete(f"/api/items/{item['id']}")
+    assert _stats(db_session, item["id"]) is None
+
+
+def test_rebuild_ewma_interval(db_session, household):
+    item = Item(name="Milk", household_id=household.id)
+    db_session.add(item)
+    db_session.commit()
+
+    start = datetime(2026, 1, 1)
+    for days in (0, 10, 30):
+        s = ShoppingSession(household_id=household.id, completed_at=start + timedelta(days=days))
+        db_session.add(s)
+        db_session.flush()
+        db_session.add(SessionItem(session_id=s.id, item_id=item.id, item_name="Milk",
+                                   checked=True, checked_at=start + timedelta(days=days)))
+    # Active sessions are not counted until completed
+    active = ShoppingSession(household_id=household.id)
+    db_session.add(active)
+    db_session.flush()
+    db_session.add(SessionItem(session_id=active.id, item_id=item.id, item_name="Milk",
+                               checked=True, checked_at=start + timedelta(days=40)))
+    db_session.commit()
+
+    assert rebuild_item_stats(db_session, household.id) == 1
+    db_session.commit()
+
+    stat = _stats(db_session, item.id)
+    assert stat.purchase_count == 3
+    assert stat.last_purchased_at == start + timedelta(days=30)
+    # intervals 10 and 20 days: 0.3 * 20 + 0.7 * 10
+    assert abs(stat.ewma_interval_days - 13.0) < 1e-6
@@ -1,3 +1,6 @@
+from app.models import Item, ItemStat
+
+
 def test_list_items_empty(authed_client):
     resp = authed_client.get("/api/items")
     assert resp.status_code == 200
@@ -121,6 +124,25 @@ def test_merge_items_redirects_shopping_list(authed_client, db_session):
     assert list_items[0]["item_id"] == item_a["id"]
 
 
+def test_merge_items_folds_list_rows(authed_client):
+    item_a = authed_client.post("/api/items", json={"name": "A"}).json()
+    item_b = authed_client.post("/api/items", json={"name": "B"}).json()
+    item_c = authed_client.post("/api/items", json={"name": "C"}).json()
+    authed_client.post("/api/list/add", json={"items": [
+        {"item_id": item_a["id"], "quantity": 1},
+        {"item_id": item_b["id"], "quantity": 2},
+        {"item_id": item_c["id"], "quantity": 3},
+    ]})
+
+    resp = authed_client.post(f"/api/items/{item_a['id']}/merge", json={"source_ids": [item_b["id"], item_c["id"]]})
+    assert resp.status_code == 200
+
+    list_items = authed_client.get("/api/list").json()
+    assert len(list_items) == 1
+    assert list_items[0]["item_id"] == item_a["id"]
+    assert list_items[0]["quantity"] == 6
+
+
 def test_merge_items_redirects_recipe_items(authed_client):
     item_a = authed_client.post("/api/items", json={"name": "A"}).json()
     item_b = authed_client.post("/api/items", json={"name": "B"}).json()
@@ -158,6 +180,22 @@ def test_merge_nonexistent_target(authed_client):
     assert resp.status_code == 404
 
 
+def test_merge_rejects_other_households_items(authed_client, db_session, second_household):
+    item = authed_client.post("/api/items", json={"name": "A"}).json()
+    foreign = Item(name="B", household_id=second_household.id)
+    db_session.add(foreign)
+    db_session.flush()
+    db_session.add(ItemStat(household_id=second_household.id, item_id=foreign.id, purchase_count=3))
+    db_session.commit()
+
+    resp = authed_client.post(f"/api/items/{item['id']}/merge", json={"source_ids": [foreign.id]})
+    assert resp.status_code == 404
+
+    db_session.expire_all()
+    assert db_session.get(Item, foreign.id) is not None
+    assert db_session.get(ItemStat, (second_household.id, foreign.id)).purchase_count == 3
+
+
 def test_merge_self_returns_item(authed_client):
     item = authed_client.post("/api/items", json={"name": "A"}).json()
     resp = authed_client.post(f"/api/items/{item['id']}/merge", json={"source_ids": [item["id"]]})
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.janitor import Janitor
+from app.models import Item, SessionItem, ShoppingListItem, ShoppingSession
+
+from .conftest import TestingSessionLocal
+
+
+def _item(db_session, household, name):
+    item = Item(name=name, household_id=household.id)
+    db_session.add(item)
+    db_session.commit()
+    return item
+
+
+def _add_orphans(db_session, *rows):
+    """Insert list rows pointing at missing items, bypassing the FK check."""
+    db_session.commit()
+    db_session.execute(text("PRAGMA foreign_keys=OFF"))
+    db_session.add_all(rows)
+    db_session.commit()
+    db_session.execute(text("PRAGMA foreign_keys=ON"))
+
+
+def test_get_list_is_read_only(authed_client, sql_statements):
+    sql_statements.clear()
+    assert authed_client.get("/api/list").status_code == 200
+    assert all(s.lstrip().upper().startswith("SELECT") for s in sql_statements)
+
+
+def test_get_list_skips_orphans(authed_client, db_session, household):
+    milk = _item(db_session, household, "Milk")
+    db_session.add(ShoppingListItem(item_id=milk.id, household_id=household.id))
+    _add_orphans(db_session, ShoppingListItem(item_id=9999, household_id=household.id))
+
+    list_items = authed_client.get("/api/list").json()
+    assert [li["item_id"] for li in list_items] == [milk.id]
+
+
+def test_sweep_removes_orphaned_list_items(db_session, household, second_household):
+    milk = _item(db_session, household, "Milk")
+    db_session.add(ShoppingListItem(item_id=milk.id, household_id=household.id))
+    _add_orphans(
+        db_session,
+        ShoppingListItem(item_id=9998, household_id=household.id),
+        ShoppingListItem(item_id=9999, household_id=second_household.id),
+    )
+
+    janitor = Janitor(interval=0)
+    assert janitor.run_once(TestingSessionLocal) == {
+        "orphaned_list_items": 2, "stale_sessions": 0, "compacted_list_changes": 2,
+    }
+    assert [li.item_id for li in db_session.query(ShoppingListItem)] == [milk.id]
+
+
+def test_sweep_removes_stale_sessions(db_session, household):
+    now = datetime.utcnow()
+    stale = ShoppingSession(household_id=household.id, started_at=now - timedelta(hours=30))
+    fresh = ShoppingSession(household_id=household.id, started_at=now - timedelta(hours=1))
+    busy = ShoppingSession(household_id=household.id, started_at=now - timedelta(hours=30))
+    done = ShoppingSession(
+        household_id=household.id, started_at=now - timedelta(days=10), completed_at=now - timedelta(days=10)
+    )
+    db_session.add_all([stale, fresh, busy, done])
+    db_session.flush()
+    db_session.add_all([
+        SessionItem(session_id=stale.id, item_name="Milk", checked=True, checked_at=now - timedelta(hours=29)),
+        # Started long ago, but still being shopped
+        SessionItem(session_id=busy.id, item_name="Milk", checked=True, checked_at=now - timedelta(hours=1)),
+        SessionItem(session_id=done.id, item_name="Milk"),
+    ])
+    db_session.commit()
+    kept = {fresh.id, busy.id, done.id}
+
+    janitor = Janitor(interval=0, stale_session_hours=24)
+    assert janitor.run_once(TestingSessionLocal) == {
+        "orphaned_list_items": 0, "stale_sessions": 1, "compacted_list_changes": 0,
+    }
+
+    db_session.expire_all()
+    assert {s.id for s in db_session.query(ShoppingSession)} == kept
+    assert sorted(si.session_id for si in db_session.query(SessionItem)) == sorted([busy.id, done.id])
+
+    stats = janitor.stats()
+    assert stats["runs"] == 1
+    assert stats["removed"] == {"orphaned_list_items": 0, "stale_sessions": 1, "compacted_list_changes": 0}
+
+
+def test_background_loop_runs_sweeps(monkeypatch):
+    janitor = Janitor(interval=0.01)
+    sweeps = []
+    monkeypatch.setattr(janitor, "run_once", lambda: sweeps.append(1))
+
+    async def _run():
+        janitor.start()
+        await asyncio.sleep(0.1)
+        await janitor.stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_run())
+    finally:
+        loop.close()
+    assert sweeps
+    assert janitor._task is None
+
+
+def test_metrics_include_janitor(client):
+    metrics = client.get("/api/metrics").json()
+    assert set(metrics["janitor"]) == {"runs", "failures", "removed", "last_run_at"}
@@ -50,6 +50,44 @@ def test_duplicate_quantity_aggregation(authed_client):
     assert list_items[0]["quantity"] == 5
 
 
+def test_add_unit_change_replaces_quantity(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    authed_client.post("/api/list/add", json={"items": [{"item_id": item["id"], "quantity": 2}]})
+    authed_client.post("/api/list/add", json={"items": [{"item_id": item["id"], "quantity": 1, "unit": "l"}]})
+    list_items = authed_client.get("/api/list").json()
+    assert len(list_items) == 1
+    assert list_items[0]["quantity"] == 1
+    assert list_items[0]["unit"] == "l"
+
+
+def test_add_repeated_item_in_one_request(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    authed_client.post("/api/list/add", json={"items": [{"item_id": item["id"], "quantity": 4}]})
+    resp = authed_client.post("/api/list/add", json={"items": [
+        {"item_id": item["id"], "quantity": 2},
+        {"item_id": item["id"], "quantity": 1, "unit": "l"},
+        {"item_id": item["id"], "quantity": 2, "unit": "l"},
+    ]})
+    assert resp.status_code == 200
+    list_items = authed_client.get("/api/list").json()
+    assert len(list_items) == 1
+    assert list_items[0]["quantity"] == 3
+    assert list_items[0]["unit"] == "l"
+
+
+def test_bulk_add_statement_count(authed_client, sql_statements):
+    ids = [authed_client.post("/api/items", json={"name": f"Item {i}"}).json()["id"] for i in range(40)]
+    authed_client.post("/api/list/add", json={"items": [{"item_id": i, "quantity": 1} for i in ids[:20]]})
+
+    sql_statements.clear()
+    resp = authed_client.post("/api/list/add", json={"items": [{"item_id": i, "quantity": 1} for i in ids]})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 40
+    writes = [s for s in sql_statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+    assert [w.split()[2] for w in writes] == ["shopping_list_items", "list_changes"]
+    assert len(sql_statements) <= 6
+
+
 def test_add_recipe_to_list(authed_client):
     item = authed_client.post("/api/items", json={"name": "Flour"}).json()
     recipe = authed_client.post("/api/recipes", json={
@@ -143,3 +181,83 @@ def test_list_household_isolation(client, household, second_household, auth_head
     resp2 = client.get("/api/list", headers=second_auth_headers)
     assert len(resp1.json()) == 1
     assert len(resp2.json()) == 0
+
+
+def _recipe(client, name, *ingredients):
+    return client.post("/api/recipes", json={
+        "name": name,
+        "items": [{"item_id": i, "quantity": q, "unit": u} for i, q, u in ingredients],
+    }).json()
+
+
+def test_add_plan_aggregates_recipes(authed_client):
+    flour = authed_client.post("/api/items", json={"name": "Flour"}).json()["id"]
+    eggs = authed_client.post("/api/items", json={"name": "Eggs"}).json()["id"]
+    milk = authed_client.post("/api/items", json={"name": "Milk"}).json()["id"]
+    pancakes = _recipe(authed_client, "Pancakes", (flour, 200, "g"), (eggs, 2, "x"), (milk, 0.5, "l"))
+    cake = _recipe(authed_client, "Cake", (flour, 300, "g"), (eggs, 4, "x"))
+
+    resp = authed_client.post("/api/list/add-plan", json={"recipes": [
+        {"recipe_id": pancakes["id"], "servings": 2},
+        {"recipe_id": cake["id"]},
+    ]})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 3
+
+    by_item = {li["item_id"]: li for li in authed_client.get("/api/list").json()}
+    assert by_item[flour]["quantity"] == 700
+    assert by_item[flour]["unit"] == "g"
+    assert by_item[eggs]["quantity"] == 8
+    assert by_item[milk]["quantity"] == 1
+    assert by_item[milk]["from_recipe_id"] == pancakes["id"]
+
+
+def test_add_plan_merges_into_existing_list(authed_client):
+    flour = authed_client.post("/api/items", json={"name": "Flour"}).json()["id"]
+    authed_client.post("/api/list/add", json={"items": [{"item_id": flour, "quantity": 100, "unit": "g"}]})
+    pancakes = _recipe(authed_client, "Pancakes", (flour, 200, "g"))
+
+    authed_client.post("/api/list/add-plan", json={"recipes": [{"recipe_id": pancakes["id"]}]})
+    list_items = authed_client.get("/api/list").json()
+    assert len(list_items) == 1
+    assert list_items[0]["quantity"] == 300
+
+
+def test_add_plan_unknown_recipe(authed_client):
+    flour = authed_client.post("/api/items", json={"name": "Flour"}).json()["id"]
+    pancakes = _recipe(authed_client, "Pancakes", (flour, 200, "g"))
+    resp = authed_client.post("/api/list/add-plan", json={"recipes": [
+        {"recipe_id": pancakes["id"]},
+        {"recipe_id": 9999},
+    ]})
+    assert resp.status_code == 404
+    assert authed_client.get("/api/list").json() == []
+
+
+def test_add_plan_rejects_non_positive_servings(authed_client):
+    resp = authed_client.post("/api/list/add-plan", json={"recipes": [{"recipe_id": 1, "servings": 0}]})
+    assert resp.status_code == 422
+
+
+def test_add_plan_single_commit_and_broadcast(authed_client, sql_statements, monkeypatch):
+    from app.routers import list as list_router
+
+    broadcasts = []
+
+    async def _record(household_id, update_type, data):
+        broadcasts.append(update_type)
+
+    monkeypatch.setattr(list_router, "broadcast_update", _record)
+    item_ids = [authed_client.post("/api/items", json={"name": f"Item {i}"}).json()["id"] for i in range(30)]
+    recipes = [
+        _recipe(authed_client, f"Recipe {r}", *[(i, 1, "x") for i in item_ids[r::3]])
+        for r in range(7)
+    ]
+
+    sql_statements.clear()
+    resp = authed_client.post("/api/list/add-plan", json={"recipes": [{"recipe_id": r["id"]} for r in recipes]})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 30
+    # Includes building the broadcast delta
+    assert len(sql_statements) <= 8
+    assert broadcasts == ["list_updated"]
@@ -0,0 +1,181 @@
+from app.changes import compact
+from app.models import ListChange, ListChangeFloor
+
+from .conftest import create_items, list_version
+
+
+def _changes(client, since, **params):
+    resp = client.get("/api/list/changes", params={"since": since, **params})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_changes_after_add_update_delete(authed_client):
+    milk, bread = create_items(authed_client, "Milk", "Bread")
+    start = list_version(authed_client)
+    assert _changes(authed_client, start) == {"version": start, "reset": False, "upserted": [], "deleted": []}
+
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}, {"item_id": bread}]}).json()
+    changes = _changes(authed_client, start)
+    assert changes["version"] > start
+    assert sorted(li["item_id"] for li in changes["upserted"]) == [milk, bread]
+    assert changes["deleted"] == []
+
+    after_add = changes["version"]
+    authed_client.put(f"/api/list/{added[0]['id']}", json={"quantity": 5})
+    authed_client.delete(f"/api/list/{added[1]['id']}")
+    changes = _changes(authed_client, after_add)
+    assert [(li["id"], li["quantity"]) for li in changes["upserted"]] == [(added[0]["id"], 5)]
+    assert changes["deleted"] == [added[1]["id"]]
+    assert changes["version"] == list_version(authed_client)
+
+
+def test_latest_change_per_row_wins(authed_client):
+    (milk,) = create_items(authed_client, "Milk")
+    start = list_version(authed_client)
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]}).json()
+    authed_client.put(f"/api/list/{added[0]['id']}/check")
+    authed_client.delete(f"/api/list/{added[0]['id']}")
+
+    changes = _changes(authed_client, start)
+    assert changes["upserted"] == []
+    assert changes["deleted"] == [added[0]["id"]]
+
+
+def test_bulk_deletes_leave_tombstones(authed_client):
+    milk, bread, eggs, soap = create_items(authed_client, "Milk", "Bread", "Eggs", "Soap")
+    added = authed_client.post("/api/list/add", json={"items": [
+        {"item_id": i} for i in (milk, bread, eggs, soap)
+    ]}).json()
+    ids = {li["item_id"]: li["id"] for li in added}
+
+    start = list_version(authed_client)
+    authed_client.put(f"/api/list/{ids[milk]}/check")
+    authed_client.post("/api/list/purchase")
+    authed_client.post("/api/list/remove", json={"ids": [ids[bread]]})
+    authed_client.delete(f"/api/items/{eggs}")
+    authed_client.post("/api/items/delete", json={"ids": [soap]})
+
+    changes = _changes(authed_client, start)
+    assert changes["upserted"] == []
+    assert sorted(changes["deleted"]) == sorted(ids.values())
+
+
+def test_clear_and_session_complete_leave_tombstones(authed_client):
+    milk, bread = create_items(authed_client, "Milk", "Bread")
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}, {"item_id": bread}]}).json()
+    session = authed_client.post("/api/session/start").json()
+    start = list_version(authed_client)
+    milk_session_item = next(si for si in session["session_items"] if si["item_id"] == milk)
+    authed_client.put(f"/api/session/check/{milk_session_item['id']}")
+    authed_client.post("/api/session/complete")
+    assert _changes(authed_client, start)["deleted"] == [added[0]["id"]]
+
+    authed_client.delete("/api/list")
+    assert sorted(_changes(authed_client, start)["deleted"]) == sorted(li["id"] for li in added)
+
+
+def test_item_changes_touch_list_rows(authed_client):
+    (milk,) = create_items(authed_client, "Milk")
+    category = authed_client.post("/api/categories", json={"name": "Dairy"}).json()["id"]
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]}).json()
+
+    start = list_version(authed_client)
+    authed_client.put(f"/api/items/{milk}", json={"name": "Oat milk"})
+    changes = _changes(authed_client, start)
+    assert [li["item"]["name"] for li in changes["upserted"]] == ["Oat milk"]
+
+    start = changes["version"]
+    authed_client.post("/api/items/set-category", json={"item_ids": [milk], "category_id": category})
+    authed_client.put(f"/api/categories/{category}", json={"name": "Milk & co"})
+    changes = _changes(authed_client, start)
+    assert [li["item"]["category"]["name"] for li in changes["upserted"]] == ["Milk & co"]
+
+    start = changes["version"]
+    authed_client.delete(f"/api/categories/{category}")
+    changes = _changes(authed_client, start)
+    assert [li["id"] for li in changes["upserted"]] == [added[0]["id"]]
+    assert changes["upserted"][0]["item"]["category"] is None
+
+
+def test_merge_folds_rows_in_log(authed_client):
+    milk, milk2 = create_items(authed_client, "Milk", "Milk 2")
+    added = authed_client.post("/api/list/add", json={"items": [{"item_id": milk}, {"item_id": milk2}]}).json()
+    start = list_version(authed_client)
+    authed_client.post(f"/api/items/{milk}/merge", json={"source_ids": [milk2]})
+
+    changes = _changes(authed_client, start)
+    assert [(li["id"], li["quantity"]) for li in changes["upserted"]] == [(added[0]["id"], 2)]
+    assert changes["deleted"] == [added[1]["id"]]
+
+
+def test_future_version_resets(authed_client):
+    (milk,) = create_items(authed_client, "Milk")
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    changes = _changes(authed_client, 10_000)
+    assert changes["reset"] is True
+    assert [li["item_id"] for li in changes["upserted"]] == [milk]
+
+
+def test_compaction_waits_for_known_clients(authed_client, db_session, household):
+    milk, bread = create_items(authed_client, "Milk", "Bread")
+    start = list_version(authed_client)
+    _changes(authed_client, start, client_id="phone")
+    _changes(authed_client, start, client_id="laptop")
+
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    middle = list_version(authed_client)
+    authed_client.post("/api/list/add", json={"items": [{"item_id": bread}]})
+
+    # Both clients are still at `start`, so nothing can go
+    assert compact(db_session) == 0
+    db_session.commit()
+
+    _changes(authed_client, middle, client_id="phone")
+    assert compact(db_session) == 0
+    _changes(authed_client, middle, client_id="laptop")
+    assert compact(db_session) == 1
+    db_session.commit()
+
+    assert db_session.query(ListChangeFloor).filter_by(household_id=household.id).one().version == middle
+    # Still a delta for everyone at or after the floor...
+    changes = _changes(authed_client, middle)
+    assert changes["reset"] is False
+    assert [li["item_id"] for li in changes["upserted"]] == [bread]
+    # ...and a full reset for anyone older
+    changes = _changes(authed_client, start)
+    assert changes["reset"] is True
+    assert sorted(li["item_id"] for li in changes["upserted"]) == sorted([milk, bread])
+
+
+def test_compaction_without_clients_keeps_version(authed_client, db_session):
+    (milk,) = create_items(authed_client, "Milk")
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    version = list_version(authed_client)
+
+    assert compact(db_session) == 1
+    db_session.commit()
+    assert db_session.query(ListChange).count() == 0
+    assert list_version(authed_client) == version
+    assert _changes(authed_client, version)["reset"] is False
+
+    authed_client.post("/api/list/add", json={"items": [{"item_id": milk}]})
+    assert list_version(authed_client) > version
+
+
+def test_polling_without_changes_does_not_write(authed_client, sql_statements):
+    start = list_version(authed_client)
+    _changes(authed_client, start, client_id="phone")
+
+    sql_statements.clear()
+    _changes(authed_client, start, client_id="phone")
+    assert all(s.lstrip().upper().startswith("SELECT") for s in sql_statements)
+
+
+def test_changes_are_per_household(authed_client, db_session, second_household):
+    from app.changes import record_list_changes
+
+    start = list_version(authed_client)
+    record_list_changes(db_session, second_household.id, deleted=[123])
+    db_session.commit()
+    assert _changes(authed_client, start)["deleted"] == []
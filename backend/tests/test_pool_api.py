@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from app.models import Item, ShoppingSession, SessionItem
+from app.stats import rebuild_item_stats
 
 
 def test_pool_empty(authed_client):
@@ -46,6 +47,8 @@ def test_pool_frequency_score_capped(authed_client, db_session, household):
                          checked=True, checked_at=now - timedelta(days=60))
         db_session.add(si)
     db_session.commit()
+    rebuild_item_stats(db_session, household.id)
+    db_session.commit()
 
     pool = authed_client.get("/api/pool").json()
     assert len(pool) == 1
@@ -72,6 +75,8 @@ def test_pool_recency_score(authed_client, db_session, household):
                      checked=True, checked_at=checked_at)
     db_session.add(si)
     db_session.commit()
+    rebuild_item_stats(db_session, household.id)
+    db_session.commit()
 
     pool = authed_client.get("/api/pool").json()
     assert len(pool) == 1
@@ -96,6 +101,8 @@ def test_pool_outside_30_day_window_zero_recency(authed_client, db_session, hous
                      checked=True, checked_at=now - timedelta(days=60))
     db_session.add(si)
     db_session.commit()
+    rebuild_item_stats(db_session, household.id)
+    db_session.commit()
 
     pool = authed_client.get("/api/pool").json()
     # freq=1, freq_score=0.1, recency=0 → score = 0.06
@@ -128,6 +135,8 @@ def test_pool_sorted_desc(authed_client, db_session, household):
         db_session.add(SessionItem(session_id=s2.id, item_id=item_b.id, item_name="B",
                                    checked=True, checked_at=now - timedelta(days=2)))
     db_session.commit()
+    rebuild_item_stats(db_session, household.id)
+    db_session.commit()
 
     pool = authed_client.get("/api/pool").json()
     assert len(pool) == 2
@@ -148,6 +157,8 @@ def test_pool_max_50(authed_client, db_session, household):
         db_session.add(SessionItem(session_id=s.id, item_id=item.id, item_name=f"Item{i}",
                                    checked=True, checked_at=now))
     db_session.commit()
+    rebuild_item_stats(db_session, household.id)
+    db_session.commit()
 
     pool = authed_client.get("/api/pool").json()
     assert len(pool) == 50
@@ -163,3 +174,51 @@ def test_pool_household_isolation(client, household, second_household, auth_head
 
     assert len(client.get("/api/pool", headers=auth_headers).json()) == 1
     assert len(client.get("/api/pool", headers=second_auth_headers).json()) == 0
+
+
+def _complete_trip(client, item_id):
+    client.post("/api/list/add", json={"items": [{"item_id": item_id, "quantity": 1}]})
+    session = client.post("/api/session/start").json()
+    client.put(f"/api/session/check/{session['session_items'][0]['id']}")
+    client.post("/api/session/complete")
+
+
+def test_pool_cache_hit(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    _complete_trip(authed_client, item["id"])
+
+    before = authed_client.get("/api/metrics").json()["pool_cache"]
+    first = authed_client.get("/api/pool").json()
+    second = authed_client.get("/api/pool").json()
+    after = authed_client.get("/api/metrics").json()["pool_cache"]
+
+    assert first == second
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_pool_cache_invalidated_by_session_complete(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    _complete_trip(authed_client, item["id"])
+    assert authed_client.get("/api/pool").json()[0]["frequency"] == 1
+
+    _complete_trip(authed_client, item["id"])
+    assert authed_client.get("/api/pool").json()[0]["frequency"] == 2
+
+
+def test_pool_cache_invalidated_by_item_rename(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    _complete_trip(authed_client, item["id"])
+    authed_client.get("/api/pool")
+
+    authed_client.put(f"/api/items/{item['id']}", json={"name": "Oat milk"})
+    assert authed_client.get("/api/pool").json()[0]["item"]["name"] == "Oat milk"
+
+
+def test_pool_cache_invalidated_by_delete(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    _complete_trip(authed_client, item["id"])
+    authed_client.get("/api/pool")
+
+    authed_client.post("/api/items/delete", json={"ids": [item["id"]]})
+    assert authed_client.get("/api/pool").json() == []
@@ -0,0 +1,42 @@
+from app.pool_cache import PoolCache
+
+
+def test_get_miss_then_hit():
+    cache = PoolCache()
+    assert cache.get(1) is None
+    cache.set(1, cache.version(1), ["a"])
+    assert cache.get(1) == ["a"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_invalidate_drops_entry():
+    cache = PoolCache()
+    cache.set(1, cache.version(1), ["a"])
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+
+def test_stale_version_not_cached():
+    cache = PoolCache()
+    version = cache.version(1)
+    cache.invalidate(1)  # a mutation commits while the pool is being computed
+    cache.set(1, version, ["stale"])
+    assert cache.get(1) is None
+
+
+def test_lru_eviction():
+    cache = PoolCache(max_entries=2)
+    for household_id in (1, 2):
+        cache.set(household_id, 0, [household_id])
+    cache.get(1)
+    cache.set(3, 0, [3])
+    assert cache.get(2) is None
+    assert cache.get(1) == [1]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = PoolCache(ttl=0)
+    cache.set(1, 0, ["a"])
+    assert cache.get(1) is None
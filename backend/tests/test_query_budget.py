@@ -0,0 +1,89 @@
+"""Collection endpoints load their response graph in a fixed number of queries."""
+import pytest
+
+from app.models import Item, ShoppingListItem
+
+
+def _count(client, db_session, sql_statements, method, url, **kwargs):
+    """Number of SELECTs a request issues; writes are not part of the budget."""
+    # Start from a cold identity map, like a fresh request session would
+    db_session.expire_all()
+    sql_statements.clear()
+    resp = client.request(method, url, **kwargs)
+    assert resp.status_code == 200, resp.text
+    return sum(s.lstrip().upper().startswith("SELECT") for s in sql_statements)
+
+
+@pytest.mark.parametrize("method,url,budget", [
+    ("GET", "/api/list", 3),
+    ("GET", "/api/items", 2),
+    ("GET", "/api/recipes", 3),
+    ("GET", "/api/sessions", 3),
+    ("GET", "/api/pool", 2),
+])
+def test_read_budget(authed_client, db_session, sql_statements, seeded, method, url, budget):
+    assert _count(authed_client, db_session, sql_statements, method, url) <= budget
+
+
+def test_list_item_update_budget(authed_client, db_session, sql_statements, seeded):
+    list_item_id = authed_client.get("/api/list").json()[0]["id"]
+    assert _count(
+        authed_client, db_session, sql_statements, "PUT", f"/api/list/{list_item_id}", json={"quantity": 3}
+    ) <= 6
+
+
+def test_recipe_write_budget(authed_client, db_session, sql_statements, seeded):
+    payload = {"name": "Big", "items": [{"item_id": item.id} for item in seeded]}
+    created = _count(authed_client, db_session, sql_statements, "POST", "/api/recipes", json=payload)
+    assert created <= 3
+
+    recipe_id = authed_client.get("/api/recipes").json()[0]["id"]
+    updated = _count(authed_client, db_session, sql_statements, "PUT", f"/api/recipes/{recipe_id}", json=payload)
+    assert updated <= 4
+
+
+def test_session_lifecycle_budget(authed_client, db_session, sql_statements, seeded):
+    assert _count(authed_client, db_session, sql_statements, "POST", "/api/session/start") <= 5
+    assert _count(authed_client, db_session, sql_statements, "GET", "/api/session/active") <= 3
+    assert _count(authed_client, db_session, sql_statements, "POST", "/api/session/complete") <= 6
+
+
+def test_purchase_budget(authed_client, db_session, sql_statements, seeded):
+    assert _count(authed_client, db_session, sql_statements, "POST", "/api/list/purchase") <= 8
+
+
+@pytest.fixture
+def long_list(db_session, household):
+    items = [Item(name=f"Item {i}", household_id=household.id) for i in range(300)]
+    db_session.add_all(items)
+    db_session.flush()
+    db_session.add_all(
+        ShoppingListItem(item_id=item.id, household_id=household.id, checked=True)
+        for item in items
+    )
+    db_session.commit()
+    return items
+
+
+def _statements(client, db_session, sql_statements, method, url):
+    """All statements a request issues, reads and writes alike."""
+    db_session.expire_all()
+    sql_statements.clear()
+    resp = client.request(method, url)
+    assert resp.status_code == 200, resp.text
+    return len(sql_statements), resp.json()
+
+
+def test_session_start_snapshot_statements(authed_client, db_session, sql_statements, long_list):
+    count, session = _statements(authed_client, db_session, sql_statements, "POST", "/api/session/start")
+    assert len(session["session_items"]) == 300
+    assert session["session_items"][0]["item_name"] == "Item 0"
+    assert count <= 6
+
+
+def test_purchase_snapshot_statements(authed_client, db_session, sql_statements, long_list):
+    count, session = _statements(authed_client, db_session, sql_statements, "POST", "/api/list/purchase")
+    assert len(session["session_items"]) == 300
+    # Independent of the list length: the item pairs, neighbours and stats
+    # are each written with one statement too
+    assert count <= 15
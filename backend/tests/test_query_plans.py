@@ -0,0 +1,69 @@
+"""Hot queries must search an index instead of scanning a whole table."""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from .conftest import engine
+
+
+@pytest.fixture
+def executed():
+    """Record every statement with its parameters."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT INTO SESSION_ITEMS")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _record)
+
+
+def _scans(statement, parameters) -> list[str]:
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [detail for *_, detail in plan if re.match(r"SCAN (?!CONSTANT ROW)", detail)]
+
+
+def _assert_no_scans(executed):
+    recorded = list(executed)
+    executed.clear()
+    scans = {statement: scans for statement, scans in ((s, _scans(s, p)) for s, p in recorded) if scans}
+    assert not scans, "\n\n".join(f"{scans}\n{statement}" for statement, scans in scans.items())
+
+
+@pytest.mark.parametrize("method,url", [
+    ("GET", "/api/list"),
+    ("GET", "/api/list/changes?since=0"),
+    ("GET", "/api/items"),
+    ("GET", "/api/categories"),
+    ("GET", "/api/recipes"),
+    ("GET", "/api/sessions"),
+    ("GET", "/api/pool"),
+    ("GET", "/api/list/suggestions"),
+    ("POST", "/api/list/purchase"),
+    ("POST", "/api/session/start"),
+    ("GET", "/api/session/active"),
+])
+def test_hot_queries_use_indexes(authed_client, executed, seeded, method, url):
+    executed.clear()
+    resp = authed_client.request(method, url)
+    assert resp.status_code == 200, resp.text
+    assert executed
+    _assert_no_scans(executed)
+
+
+def test_mutations_use_indexes(authed_client, executed, seeded):
+    item, other = seeded[0], seeded[1]
+    executed.clear()
+    responses = [
+        authed_client.post("/api/session/start"),
+        authed_client.post("/api/session/complete"),
+        authed_client.post(f"/api/items/{item.id}/merge", json={"source_ids": [other.id]}),
+        authed_client.delete(f"/api/categories/{item.category_id}"),
+        authed_client.delete(f"/api/items/{item.id}"),
+    ]
+    assert [resp.status_code for resp in responses] == [200] * len(responses), [resp.text for resp in responses]
+    _assert_no_scans(executed)
@@ -86,3 +86,16 @@ def test_recipe_household_isolation(client, household, second_household, auth_he
     client.post("/api/recipes", json={"name": "H1 Recipe"}, headers=auth_headers)
     assert len(client.get("/api/recipes", headers=auth_headers).json()) == 1
     assert len(client.get("/api/recipes", headers=second_auth_headers).json()) == 0
+
+
+def test_delete_recipe_keeps_list_rows(authed_client):
+    item = authed_client.post("/api/items", json={"name": "Milk"}).json()
+    recipe = authed_client.post("/api/recipes", json={
+        "name": "R1", "items": [{"item_id": item["id"], "quantity": 1}]
+    }).json()
+    authed_client.post(f"/api/list/add-recipe/{recipe['id']}")
+
+    resp = authed_client.delete(f"/api/recipes/{recipe['id']}")
+    assert resp.status_code == 200
+    (row,) = authed_client.get("/api/list").json()
+    assert row["from_recipe_id"] is None
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import scoring
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+
+
+def _reference(frequency, last_added, now=NOW):
+    """The original per-item loop from get_pool."""
+    recency = 0.0
+    if last_added and last_added > now - timedelta(days=30):
+        recency = max(0, (30 - (now - last_added).days) / 30)
+    return recency * 0.4 + min(frequency / 10, 1.0) * 0.6
+
+
+def _score(frequencies, last_added, **kwargs):
+    return scoring.score(
+        np.asarray(frequencies, dtype=np.float64), scoring.to_timestamps(last_added), NOW, **kwargs
+    )
+
+
+def test_matches_reference_loop():
+    cases = [
+        (1, NOW - timedelta(days=10)),
+        (15, NOW - timedelta(days=60)),
+        (3, NOW - timedelta(days=29, hours=23)),
+        (3, NOW - timedelta(days=30)),
+        (0, NOW - timedelta(hours=1)),
+        (4, None),
+    ]
+    scores = _score([f for f, _ in cases], [d for _, d in cases])
+    for (frequency, last_added), value in zip(cases, scores):
+        assert abs(value - _reference(frequency, last_added)) < 1e-9
+
+
+def test_custom_weights_and_window():
+    scores = _score([10], [NOW - timedelta(days=5)], recency_weight=1.0, frequency_weight=0.0, window_days=10)
+    assert abs(scores[0] - 0.5) < 1e-9
+
+
+def test_top_k_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert scoring.top_k(scores, 3).tolist() == [1, 3, 2]
+
+
+def test_top_k_fewer_than_k():
+    scores = np.array([0.2, 0.8])
+    assert scoring.top_k(scores, 50).tolist() == [1, 0]
+
+
+def test_top_k_empty():
+    assert scoring.top_k(np.array([]), 5).tolist() == []
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock
 from app.websocket import ConnectionManager
@@ -42,21 +43,243 @@ def test_connection_manager_broadcast():
     mgr = ConnectionManager()
     ws1 = AsyncMock()
     ws2 = AsyncMock()
-    loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
     loop.run_until_complete(mgr.connect(ws1, 1))
     loop.run_until_complete(mgr.connect(ws2, 1))
     loop.run_until_complete(mgr.broadcast(1, {"type": "test"}))
-    ws1.send_json.assert_called_once_with({"type": "test"})
-    ws2.send_json.assert_called_once_with({"type": "test"})
+    _close_loop(loop)
+    assert _sent(ws1) == _sent(ws2) == [{"type": "test"}]
+    # Encoded once for both sockets
+    assert ws1.send_text.call_args.args[0] is ws2.send_text.call_args.args[0]
 
 
 def test_connection_manager_household_isolation():
     mgr = ConnectionManager()
     ws1 = AsyncMock()
     ws2 = AsyncMock()
-    loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
     loop.run_until_complete(mgr.connect(ws1, 1))
     loop.run_until_complete(mgr.connect(ws2, 2))
     loop.run_until_complete(mgr.broadcast(1, {"type": "test"}))
-    ws1.send_json.assert_called_once()
-    ws2.send_json.assert_not_called()
+    _close_loop(loop)
+    ws1.send_text.assert_called_once()
+    ws2.send_text.assert_not_called()
+
+
+def _close_loop(loop):
+    """Cancel what is still running (idle socket writers) and close the loop."""
+    for task in asyncio.all_tasks(loop):
+        task.cancel()
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+
+def _publish_burst(mgr, *updates):
+    """Publish the updates back to back and wait for the window to flush."""
+    async def burst():
+        for household_id, update_type, data in updates:
+            await mgr.publish(household_id, update_type, data)
+        # Let the socket writers catch up
+        await asyncio.sleep(mgr.coalesce_window * 2 + 0.01)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(burst())
+    finally:
+        _close_loop(loop)
+
+
+def _connected(mgr, household_id):
+    ws = AsyncMock()
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(mgr.connect(ws, household_id))
+    loop.close()
+    return ws
+
+
+def _sent(ws):
+    return [json.loads(call.args[0]) for call in ws.send_text.call_args_list]
+
+
+def test_publish_coalesces_same_type():
+    mgr = ConnectionManager(coalesce_ms=10)
+    ws = _connected(mgr, 1)
+    _publish_burst(
+        mgr,
+        (1, "items_updated", {"upserted": [{"id": 1, "name": "Milk"}], "deleted": []}),
+        (1, "list_updated", {"version": 2, "from_version": 0, "upserted": [{"id": 10}, {"id": 11}], "deleted": []}),
+        (1, "items_updated", {"upserted": [{"id": 1, "name": "Oat milk"}, {"id": 2, "name": "Eggs"}], "deleted": []}),
+        (1, "list_updated", {"version": 4, "from_version": 2, "upserted": [{"id": 12}], "deleted": [10]}),
+        (1, "items_updated", {"upserted": [], "deleted": [2]}),
+    )
+
+    assert _sent(ws) == [
+        {"type": "items_updated", "data": {"upserted": [{"id": 1, "name": "Oat milk"}], "deleted": [2]}},
+        {"type": "list_updated", "data": {
+            "version": 4, "from_version": 0, "upserted": [{"id": 11}, {"id": 12}], "deleted": [10],
+        }},
+    ]
+    assert mgr.stats() == {
+        "coalesce_ms": 10, "published": 5, "sent": 2, "coalesced": 3, "pruned": 0,
+        "dropped": 0, "overflow_disconnects": 0, "connections": 1, "queued": 0, "max_queued": 0,
+    }
+
+
+def test_publish_keeps_households_apart():
+    mgr = ConnectionManager(coalesce_ms=10)
+    ws1 = _connected(mgr, 1)
+    ws2 = _connected(mgr, 2)
+    _publish_burst(
+        mgr,
+        (1, "items_updated", {"upserted": [], "deleted": [1]}),
+        (2, "items_updated", {"upserted": [], "deleted": [2]}),
+    )
+    assert _sent(ws1) == [{"type": "items_updated", "data": {"upserted": [], "deleted": [1]}}]
+    assert _sent(ws2) == [{"type": "items_updated", "data": {"upserted": [], "deleted": [2]}}]
+
+
+def test_publish_does_not_merge_version_gaps():
+    mgr = ConnectionManager(coalesce_ms=10)
+    ws = _connected(mgr, 1)
+    first = {"version": 2, "from_version": 1, "upserted": [{"id": 10}], "deleted": []}
+    unrelated = {"version": 7, "from_version": 5, "upserted": [], "deleted": [10]}
+    _publish_burst(mgr, (1, "list_updated", first), (1, "list_updated", unrelated))
+    assert [m["data"] for m in _sent(ws)] == [first, unrelated]
+
+
+def test_publish_merges_out_of_order_versions():
+    mgr = ConnectionManager(coalesce_ms=10)
+    ws = _connected(mgr, 1)
+    _publish_burst(
+        mgr,
+        (1, "list_updated", {"version": 3, "from_version": 2, "upserted": [{"id": 10, "quantity": 2}], "deleted": []}),
+        (1, "list_updated", {"version": 2, "from_version": 1, "upserted": [{"id": 10, "quantity": 1}], "deleted": []}),
+    )
+    assert _sent(ws) == [{"type": "list_updated", "data": {
+        "version": 3, "from_version": 1, "upserted": [{"id": 10, "quantity": 2}], "deleted": [],
+    }}]
+
+
+def test_publish_refetch_ping_absorbs_deltas():
+    mgr = ConnectionManager(coalesce_ms=10)
+    ws = _connected(mgr, 1)
+    _publish_burst(
+        mgr,
+        (1, "items_updated", {"upserted": [{"id": 1}], "deleted": []}),
+        (1, "items_updated", {}),
+    )
+    assert _sent(ws) == [{"type": "items_updated", "data": {}}]
+
+
+def test_publish_without_window_sends_immediately():
+    mgr = ConnectionManager(coalesce_ms=0)
+    ws = _connected(mgr, 1)
+    _publish_burst(mgr, (1, "items_updated", {"upserted": [], "deleted": [1]}), (1, "items_updated", {"upserted": [], "deleted": [2]}))
+    assert len(_sent(ws)) == 2
+    assert mgr.stats()["coalesced"] == 0
+
+
+def test_publish_skips_households_without_sockets():
+    mgr = ConnectionManager(coalesce_ms=10)
+    _publish_burst(mgr, (1, "items_updated", {"upserted": [], "deleted": [1]}))
+    assert mgr.stats()["published"] == 0
+    assert mgr._pending == {}
+
+
+def test_metrics_include_websocket(client):
+    metrics = client.get("/api/metrics").json()
+    assert set(metrics["websocket"]) == {
+        "coalesce_ms", "published", "sent", "coalesced", "pruned",
+        "dropped", "overflow_disconnects", "connections", "queued", "max_queued",
+    }
+
+
+async def _stall(message):
+    await asyncio.sleep(10)
+
+
+def test_broadcast_is_not_held_up_by_a_stalled_socket():
+    mgr = ConnectionManager(send_timeout=0.05)
+    stalled, failing, healthy = AsyncMock(), AsyncMock(), AsyncMock()
+    stalled.send_text.side_effect = _stall
+    failing.send_text.side_effect = RuntimeError("connection reset")
+    loop = asyncio.new_event_loop()
+    try:
+        for ws in (stalled, failing, healthy):
+            loop.run_until_complete(mgr.connect(ws, 1))
+        started = loop.time()
+        loop.run_until_complete(mgr.broadcast(1, {"type": "test"}))
+        elapsed = loop.time() - started
+        loop.run_until_complete(asyncio.sleep(0.2))
+    finally:
+        _close_loop(loop)
+
+    assert elapsed < 0.05
+    assert _sent(healthy) == [{"type": "test"}]
+    assert set(mgr.active_connections[1]) == {healthy}
+    stalled.close.assert_called_once()
+    failing.close.assert_called_once()
+    assert mgr.stats()["pruned"] == 2
+
+
+def _overflow(mgr, *messages):
+    """Connect a stalled socket, broadcast the messages and return it."""
+    ws = AsyncMock()
+    ws.send_text.side_effect = _stall
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(mgr.connect(ws, 1))
+
+        async def send():
+            for message in messages:
+                await mgr.broadcast(1, message)
+            await asyncio.sleep(0.01)
+
+        loop.run_until_complete(send())
+        stats = mgr.stats()
+    finally:
+        _close_loop(loop)
+    return ws, stats
+
+
+def test_overflow_collapses_queue_into_refetch_markers():
+    mgr = ConnectionManager(queue_size=3)
+    messages = [{"type": "list_updated", "data": {"version": v}} for v in range(1, 5)]
+    messages.insert(2, {"type": "items_updated", "data": {"upserted": [], "deleted": [1]}})
+    ws, stats = _overflow(mgr, *messages)
+
+    # The fourth message overflowed the queue of 3 and collapsed it into
+    # markers; the list marker is now in flight and the fifth was queued
+    connection = mgr.active_connections[1][ws]
+    assert [json.loads(text) for _, text in connection.outbox] == [
+        {"type": "items_updated", "data": {}},
+        {"type": "list_updated", "data": {"version": 4}},
+    ]
+    assert _sent(ws) == [{"type": "list_updated", "data": {}}]
+    assert stats["dropped"] == 2
+    assert stats["max_queued"] == 2
+
+
+def test_overflow_can_disconnect_slow_clients():
+    mgr = ConnectionManager(queue_size=2, overflow_policy="disconnect")
+    # Broadcasts after the overflow no longer reach the dropped socket
+    ws, stats = _overflow(mgr, *({"type": "list_updated", "data": {"version": v}} for v in range(1, 9)))
+
+    assert mgr.active_connections == {}
+    ws.close.assert_called_once_with(code=1013)
+    assert stats["overflow_disconnects"] == 1
+    assert stats["dropped"] == 3
+    assert not mgr._closing
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        ConnectionManager(overflow_policy="block")
+
+
+def test_disconnect_after_prune_is_harmless():
+    mgr = ConnectionManager()
+    ws = _connected(mgr, 1)
+    mgr.disconnect(ws, 1)
+    mgr.disconnect(ws, 1)
+    assert mgr.active_connections == {}
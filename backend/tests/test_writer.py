@@ -0,0 +1,149 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Item, SessionItem, ShoppingListItem, ShoppingSession
+from app.writer import WriteQueue
+
+from .conftest import TestingSessionLocal
+
+
+def _add_item(db, household_id, name):
+    item = Item(name=name, household_id=household_id)
+    db.add(item)
+    db.flush()
+    return item.id
+
+
+def _fail(db, household_id, name):
+    _add_item(db, household_id, name)
+    raise HTTPException(status_code=404, detail="Not found")
+
+
+def _names(db_session, household):
+    db_session.expire_all()
+    return sorted(name for (name,) in db_session.query(Item.name).filter(Item.household_id == household.id))
+
+
+def test_units_are_committed_in_one_group(db_session, household):
+    writer = WriteQueue(TestingSessionLocal, max_batch=5, max_wait_ms=1000)
+    futures = [writer.submit(_add_item, household.id, f"Item {i}") for i in range(5)]
+
+    ids = [future.result(timeout=5) for future in futures]
+    writer.stop()
+
+    assert len(set(ids)) == 5
+    assert _names(db_session, household) == [f"Item {i}" for i in range(5)]
+    stats = writer.stats()
+    assert stats["batches"] == 1
+    assert stats["largest_batch"] == 5
+    assert stats["queue_depth"] == 0
+
+
+def test_failing_unit_does_not_sink_its_group(db_session, household):
+    writer = WriteQueue(TestingSessionLocal, max_batch=3, max_wait_ms=1000)
+    ok = writer.submit(_add_item, household.id, "Milk")
+    failing = writer.submit(_fail, household.id, "Ghost")
+    other = writer.submit(_add_item, household.id, "Bread")
+
+    assert ok.result(timeout=5)
+    assert other.result(timeout=5)
+    with pytest.raises(HTTPException):
+        failing.result(timeout=5)
+    writer.stop()
+
+    assert _names(db_session, household) == ["Bread", "Milk"]
+    stats = writer.stats()
+    assert stats["batches"] == 1
+    assert stats["retried_batches"] == 0
+    assert stats["failures"] == 1
+
+
+def _add_dangling_list_row(db, household_id):
+    # The foreign key is only checked at commit
+    db.execute(text("PRAGMA defer_foreign_keys=ON"))
+    db.add(ShoppingListItem(item_id=9999, household_id=household_id))
+
+
+def test_failing_commit_applies_units_one_by_one(db_session, household):
+    writer = WriteQueue(TestingSessionLocal, max_batch=2, max_wait_ms=1000)
+    ok = writer.submit(_add_item, household.id, "Milk")
+    failing = writer.submit(_add_dangling_list_row, household.id)
+
+    assert ok.result(timeout=5)
+    with pytest.raises(IntegrityError):
+        failing.result(timeout=5)
+    writer.stop()
+
+    assert _names(db_session, household) == ["Milk"]
+    stats = writer.stats()
+    assert stats["retried_batches"] == 1
+    assert stats["failures"] == 1
+
+
+def _load_name(db, item_id):
+    return db.get(Item, item_id).name
+
+
+def _rename_in_bulk(db, item_id, name):
+    db.query(Item).filter(Item.id == item_id).update({"name": name}, synchronize_session=False)
+    return db.get(Item, item_id).name
+
+
+def test_units_do_not_see_each_others_objects(db_session, household):
+    item = Item(name="Milk", household_id=household.id)
+    db_session.add(item)
+    db_session.commit()
+    writer = WriteQueue(TestingSessionLocal, max_batch=2, max_wait_ms=1000)
+    loaded = writer.submit(_load_name, item.id)
+    renamed = writer.submit(_rename_in_bulk, item.id, "Oat milk")
+
+    assert loaded.result(timeout=5) == "Milk"
+    assert renamed.result(timeout=5) == "Oat milk"
+    writer.stop()
+    assert writer.stats()["batches"] == 1
+
+
+def test_stop_applies_queued_units(db_session, household):
+    writer = WriteQueue(TestingSessionLocal, max_batch=100, max_wait_ms=1000)
+    futures = [writer.submit(_add_item, household.id, name) for name in ("Eggs", "Ham")]
+    writer.stop()
+
+    assert all(future.done() for future in futures)
+    assert _names(db_session, household) == ["Eggs", "Ham"]
+
+
+def test_toggle_check_goes_through_writer(authed_client, db_session, household):
+    item = Item(name="Milk", household_id=household.id)
+    db_session.add(item)
+    db_session.commit()
+    list_item = ShoppingListItem(item_id=item.id, household_id=household.id)
+    db_session.add(list_item)
+    db_session.commit()
+
+    response = authed_client.put(f"/api/list/{list_item.id}/check")
+    assert response.json() == {"checked": True}
+    db_session.expire_all()
+    assert db_session.get(ShoppingListItem, list_item.id).checked
+
+    assert authed_client.put("/api/list/9999/check").status_code == 404
+
+
+def test_session_check_goes_through_writer(authed_client, db_session, household):
+    item = Item(name="Milk", household_id=household.id)
+    session = ShoppingSession(household_id=household.id)
+    db_session.add_all([item, session])
+    db_session.commit()
+    session_item = SessionItem(session_id=session.id, item_id=item.id, item_name="Milk")
+    db_session.add(session_item)
+    db_session.commit()
+
+    response = authed_client.put(f"/api/session/check/{session_item.id}")
+    assert response.json()["checked"] is True
+    assert response.json()["checked_at"]
+    assert authed_client.put("/api/session/check/9999").status_code == 404
+
+
+def test_metrics_include_writer(authed_client):
+    assert "queue_depth" in authed_client.get("/api/metrics").json()["writer"]
@@ -50,14 +50,18 @@ export const items = {
 
 export const shoppingList = {
   get: () => api.get('/api/list'),
+  changes: (since, clientId) => api.get('/api/list/changes', { params: { since, client_id: clientId } }),
   add: (items) => api.post('/api/list/add', { items }),
   update: (id, data) => api.put(`/api/list/${id}`, data),
   remove: (id) => api.delete(`/api/list/${id}`),
   addRecipe: (recipeId) => api.post(`/api/list/add-recipe/${recipeId}`),
+  addPlan: (recipes) => api.post('/api/list/add-plan', { recipes }),
   bulkRemove: (ids) => api.post('/api/list/remove', { ids }),
   clear: () => api.delete('/api/list'),
   toggleCheck: (id) => api.put(`/api/list/${id}/check`),
   purchase: () => api.post('/api/list/purchase'),
+  batch: (operations) => api.post('/api/batch', { operations }),
+  suggestions: (limit = 10) => api.get('/api/list/suggestions', { params: { limit } }),
 }
 
 export const pool = {
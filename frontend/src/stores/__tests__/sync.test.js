@@ -4,6 +4,7 @@ import { vi } from 'vitest'
 vi.mock('../../services/api', () => ({
   shoppingList: {
     toggleCheck: vi.fn(),
+    batch: vi.fn(),
   },
 }))
 
@@ -76,4 +77,20 @@ describe('sync store', () => {
     const store = useSyncStore()
     expect(() => store.disconnect()).not.toThrow()
   })
+
+  it('replayQueue sends the queue in chunks and removes only what was sent', async () => {
+    const actions = Array.from({ length: 501 }, (_, i) => ({ id: i + 1, type: 'toggle_check', itemId: i + 1 }))
+    getQueuedActions.mockResolvedValue([...actions, { id: 1000, type: 'unknown' }])
+    shoppingList.batch.mockResolvedValueOnce({}).mockRejectedValueOnce(new Error('offline'))
+    const store = useSyncStore()
+
+    await store.replayQueue()
+
+    expect(shoppingList.batch).toHaveBeenCalledTimes(2)
+    expect(shoppingList.batch.mock.calls[0][0]).toHaveLength(500)
+    expect(shoppingList.batch.mock.calls[1][0]).toHaveLength(1)
+    expect(removeFromQueue).toHaveBeenCalledTimes(500)
+    expect(removeFromQueue).not.toHaveBeenCalledWith(501)
+    expect(removeFromQueue).not.toHaveBeenCalledWith(1000)
+  })
 })
@@ -3,8 +3,19 @@ import { ref, computed } from 'vue'
 import { shoppingList, items as itemsApi, categories as categoriesApi, recipes as recipesApi, pool as poolApi, sessions as sessionsApi } from '../services/api'
 import { nameCompare } from '../utils/sort'
 
+function getClientId() {
+  let clientId = localStorage.getItem('clientId')
+  if (!clientId) {
+    clientId = crypto.randomUUID()
+    localStorage.setItem('clientId', clientId)
+  }
+  return clientId
+}
+
 export const useListStore = defineStore('list', () => {
   const listItems = ref([])
+  // Change log version listItems reflects; null until the first full fetch
+  const listVersion = ref(null)
   const items = ref([])
   const categories = ref([])
   const recipes = ref([])
@@ -91,6 +102,66 @@ export const useListStore = defineStore('list', () => {
   async function fetchList() {
     const response = await shoppingList.get()
     listItems.value = response.data
+    const version = response.headers['x-list-version']
+    if (version !== undefined) listVersion.value = Number(version)
+  }
+
+  // Catch up with the server by replaying only the rows changed since the
+  // last known version, falling back to a full fetch when there is none.
+  async function syncList() {
+    if (listVersion.value === null) return fetchList()
+
+    const { data } = await shoppingList.changes(listVersion.value, getClientId())
+    if (data.reset) {
+      listItems.value = data.upserted
+    } else {
+      applyListChanges(data.upserted, data.deleted)
+    }
+    listVersion.value = data.version
+  }
+
+  function applyListChanges(upserted, deleted) {
+    if (!upserted.length && !deleted.length) return
+    const byId = new Map(listItems.value.map(li => [li.id, li]))
+    for (const id of deleted) byId.delete(id)
+    for (const li of upserted) byId.set(li.id, li)
+    listItems.value = [...byId.values()]
+  }
+
+  // Apply a list_updated broadcast. Deltas only apply on top of the exact
+  // version they were made from; anything else means we missed one.
+  function applyListDelta(delta) {
+    if (delta?.version === undefined) return syncList()
+    if (listVersion.value !== null && delta.version <= listVersion.value) return
+    if (delta.from_version !== listVersion.value) return syncList()
+    applyListChanges(delta.upserted, delta.deleted)
+    listVersion.value = delta.version
+  }
+
+  function applyItemsDelta(delta) {
+    if (!delta?.upserted) return fetchItems()
+    const byId = new Map(items.value.map(i => [i.id, i]))
+    for (const id of delta.deleted) byId.delete(id)
+    for (const item of delta.upserted) byId.set(item.id, item)
+    items.value = [...byId.values()]
+  }
+
+  function applyCategoriesDelta(delta) {
+    if (!delta?.upserted) return fetchCategories()
+    const byId = new Map(categories.value.map(c => [c.id, c]))
+    for (const id of delta.deleted) byId.delete(id)
+    for (const category of delta.upserted) byId.set(category.id, category)
+    categories.value = [...byId.values()]
+
+    // Items embed their category
+    for (const item of items.value) {
+      if (delta.deleted.includes(item.category_id)) {
+        item.category_id = null
+        item.category = null
+      } else if (byId.has(item.category_id)) {
+        item.category = byId.get(item.category_id)
+      }
+    }
   }
 
   async function fetchItems() {
@@ -300,7 +371,12 @@ export const useListStore = defineStore('list', () => {
     uncheckedGroupedByCategory,
     checkedItems,
     itemsGroupedByCategory,
+    listVersion,
     fetchList,
+    syncList,
+    applyListDelta,
+    applyItemsDelta,
+    applyCategoriesDelta,
     fetchItems,
     fetchCategories,
     fetchRecipes,
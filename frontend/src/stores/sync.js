@@ -28,6 +28,11 @@ export const useSyncStore = defineStore('sync', () => {
 
     ws.value.onopen = () => {
       connected.value = true
+      // Pick up whatever changed while we were disconnected
+      const listStore = useListStore()
+      listStore.syncList().catch(() => {})
+      listStore.fetchItems().catch(() => {})
+      listStore.fetchCategories().catch(() => {})
     }
 
     ws.value.onclose = () => {
@@ -49,32 +54,58 @@ export const useSyncStore = defineStore('sync', () => {
     const listStore = useListStore()
 
     switch (message.type) {
+      // Messages carry the changed rows; list rows that embed a changed
+      // item or category arrive in their own list_updated delta.
       case 'list_updated':
-        listStore.fetchList()
+        listStore.applyListDelta(message.data)
         break
       case 'items_updated':
-        listStore.fetchItems()
-        listStore.fetchList()
+        listStore.applyItemsDelta(message.data)
         break
       case 'categories_updated':
-        listStore.fetchCategories()
-        listStore.fetchList()
+        listStore.applyCategoriesDelta(message.data)
         break
     }
   }
 
+  // Offline queue action -> POST /api/batch operation
+  function toOperation(action) {
+    switch (action.type) {
+      case 'toggle_check':
+        return { op: 'check', list_item_id: action.itemId, checked: action.checked ?? null }
+      case 'update_quantity':
+        return { op: 'update', list_item_id: action.itemId, quantity: action.quantity, unit: action.unit ?? null }
+      case 'add_item':
+        return { op: 'add', item_id: action.itemId, quantity: action.quantity ?? 1, unit: action.unit ?? 'x' }
+      case 'remove_item':
+        return { op: 'remove', list_item_id: action.itemId }
+      case 'session_check':
+        return { op: 'session_check', session_item_id: action.itemId, checked: action.checked ?? null }
+    }
+    return null
+  }
+
+  // BatchRequest.operations accepts at most this many per request
+  const BATCH_LIMIT = 500
+
   async function replayQueue() {
     const actions = await getQueuedActions()
-    for (const action of actions) {
+    const replayable = actions.filter(action => toOperation(action))
+    for (let start = 0; start < replayable.length; start += BATCH_LIMIT) {
+      const chunk = replayable.slice(start, start + BATCH_LIMIT)
       try {
-        if (action.type === 'toggle_check') {
-          await shoppingList.toggleCheck(action.itemId)
-        }
-        await removeFromQueue(action.id)
+        // One round trip and one transaction per chunk. Operations that
+        // fail (e.g. the row is gone) won't succeed later either.
+        await shoppingList.batch(chunk.map(toOperation))
       } catch {
-        break
+        return
+      }
+      // Only what was sent leaves the queue
+      for (const action of chunk) {
+        await removeFromQueue(action.id)
       }
     }
+    await useListStore().syncList().catch(() => {})
   }
 
   function setupOfflineDetection() {
@@ -97,5 +128,5 @@ export const useSyncStore = defineStore('sync', () => {
     }
   }
 
-  return { ws, connected, offline, connect, disconnect, setupOfflineDetection }
+  return { ws, connected, offline, connect, disconnect, replayQueue, setupOfflineDetection }
 })